@@ -0,0 +1,533 @@
+"""
+Threshold alerts on the realtime hashprice, delivered by webhook.
+
+A subscription watches one metric of each snapshot, "hashprice_rt"
+(USD / PH / day) or "pct_vs_7d" (realtime vs the 7-day hashprice, in %),
+and fires when the value crosses its threshold going "above" or "below".
+
+Subscriptions are kept in per-(metric, direction) indexes sorted by
+threshold, so a tick only bisects for the thresholds lying between the
+previous and the new value; the cost is O(log n + fired), not O(n).
+
+Hysteresis: a subscription that fired is disarmed until the value has
+retreated past threshold -/+ hysteresis, so a value hovering around a
+threshold alerts once. Each index also keeps its re-arm levels sorted,
+which makes re-arming a bisect as well. On the first tick after start,
+subscriptions already past their threshold are marked fired without
+alerting.
+
+Triggered events are grouped by webhook URL, at most BATCH_SIZE per POST,
+and the POSTs go out concurrently from a thread pool behind a circuit
+breaker per webhook host, off the snapshot refresh thread.
+
+    python hashprice_alerts.py bench --subscriptions 100000
+
+evaluates random subscriptions against a local webhook receiver.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from hashprice_breaker import CircuitOpenError, breaker
+from hashprice_metrics import Counter, STAGE_SECONDS
+from hashprice_sources import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+ALERTS_DB = os.getenv("HASHPRICE_ALERTS_DB", os.path.join(DATA_DIR, "alerts.sqlite"))
+
+METRICS = ("hashprice_rt", "pct_vs_7d")
+DIRECTIONS = ("above", "below")
+
+# Default re-arm distance per metric: USD / PH / day, percentage points.
+DEFAULT_HYSTERESIS = {"hashprice_rt": 0.5, "pct_vs_7d": 1.0}
+
+BATCH_SIZE = int(os.getenv("HASHPRICE_ALERT_BATCH", "500"))
+WORKERS = int(os.getenv("HASHPRICE_ALERT_WORKERS", "16"))
+TIMEOUT = 5
+RETRIES = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    hysteresis REAL NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+ALERTS_FIRED = Counter(
+    "hashprice_alerts_fired_total",
+    "Alert subscriptions triggered, by metric and direction.",
+    ["metric", "direction"],
+)
+WEBHOOK_REQUESTS = Counter(
+    "hashprice_alert_webhook_requests_total",
+    "Alert webhook POSTs by result (ok / fail / open).",
+    ["result"],
+)
+
+
+class Subscription:
+    __slots__ = ("id", "url", "metric", "direction", "threshold", "hysteresis")
+
+    def __init__(self, id, url, metric, direction, threshold, hysteresis=None):
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise ValueError("url must be http(s)")
+        threshold = float(threshold)
+        hysteresis = DEFAULT_HYSTERESIS[metric] if hysteresis is None else float(hysteresis)
+        if threshold != threshold or abs(threshold) == float("inf"):
+            raise ValueError("threshold must be a finite number")
+        if not 0 <= hysteresis < float("inf"):
+            raise ValueError("hysteresis must be a non-negative number")
+
+        self.id = id
+        self.url = url
+        self.metric = metric
+        self.direction = direction
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+
+    @property
+    def rearm_level(self):
+        if self.direction == "above":
+            return self.threshold - self.hysteresis
+        return self.threshold + self.hysteresis
+
+    def to_json(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Index:
+    """
+    Subscriptions of one (metric, direction), as parallel lists sorted by
+    threshold and by re-arm level.
+    """
+
+    def __init__(self, direction):
+        self.direction = direction
+        self.levels, self.ids = [], []
+        self.rearm_levels, self.rearm_ids = [], []
+
+    def load(self, subs):
+        by_level = sorted(subs, key=lambda s: s.threshold)
+        self.levels = [s.threshold for s in by_level]
+        self.ids = [s.id for s in by_level]
+        by_rearm = sorted(subs, key=lambda s: s.rearm_level)
+        self.rearm_levels = [s.rearm_level for s in by_rearm]
+        self.rearm_ids = [s.id for s in by_rearm]
+
+    def add(self, sub):
+        i = bisect_right(self.levels, sub.threshold)
+        self.levels.insert(i, sub.threshold)
+        self.ids.insert(i, sub.id)
+        i = bisect_right(self.rearm_levels, sub.rearm_level)
+        self.rearm_levels.insert(i, sub.rearm_level)
+        self.rearm_ids.insert(i, sub.id)
+
+    def remove(self, sub):
+        for levels, ids, level in (
+            (self.levels, self.ids, sub.threshold),
+            (self.rearm_levels, self.rearm_ids, sub.rearm_level),
+        ):
+            i = bisect_left(levels, level)
+            while ids[i] != sub.id:
+                i += 1
+            del levels[i], ids[i]
+
+    def crossed(self, prev, value):
+        """
+        (fire, rearm): ids whose threshold the move prev -> value crossed
+        in this index's direction, and ids whose re-arm level it crossed
+        going back.
+        """
+        if self.direction == "above":
+            if value > prev:
+                return self.ids[bisect_right(self.levels, prev):bisect_right(self.levels, value)], ()
+            if value < prev:
+                return (), self.rearm_ids[bisect_left(self.rearm_levels, value):bisect_left(self.rearm_levels, prev)]
+        else:
+            if value < prev:
+                return self.ids[bisect_left(self.levels, value):bisect_left(self.levels, prev)], ()
+            if value > prev:
+                return (), self.rearm_ids[bisect_right(self.rearm_levels, prev):bisect_right(self.rearm_levels, value)]
+        return (), ()
+
+    def past(self, value):
+        # Ids already at or beyond their threshold at `value`.
+        if self.direction == "above":
+            return self.ids[:bisect_right(self.levels, value)]
+        return self.ids[bisect_left(self.levels, value):]
+
+    def is_past(self, sub, value):
+        return value >= sub.threshold if self.direction == "above" else value <= sub.threshold
+
+
+class AlertStore:
+    """
+    Subscriptions persisted in SQLite, over one connection per store.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or ALERTS_DB
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        # Called with self._lock held.
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                yield conn
+
+    def signature(self):
+        # SQLite's data_version changes when another connection, i.e.
+        # another worker, commits; this store's own writes leave it alone.
+        with self._lock:
+            return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def all(self):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, url, metric, direction, threshold, hysteresis FROM subscriptions"
+            ).fetchall()
+        return [Subscription(*row) for row in rows]
+
+    def add(self, url, metric, direction, threshold, hysteresis=None):
+        sub = Subscription(None, url, metric, direction, threshold, hysteresis)
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO subscriptions (url, metric, direction, threshold, hysteresis, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (sub.url, sub.metric, sub.direction, sub.threshold, sub.hysteresis, time.time()),
+            )
+            sub.id = cur.lastrowid
+        return sub
+
+    def remove(self, sub_id):
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM subscriptions WHERE id = ?", (sub_id,)).rowcount > 0
+
+
+class WebhookDispatcher:
+    """
+    Posts alert batches concurrently: {"events": [...]} per webhook URL, at
+    most `batch_size` events per request, retried RETRIES times. Each
+    webhook host has its own circuit breaker, so a dead receiver costs one
+    refused call per batch instead of a timeout.
+    """
+
+    def __init__(self, workers=WORKERS, batch_size=BATCH_SIZE, timeout=TIMEOUT, session=None):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="alert-webhook")
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=64, pool_maxsize=self._pool._max_workers)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def _post(self, url, events):
+        name = f"webhook:{urlsplit(url).netloc}"
+        body = json.dumps({"events": events}, separators=(",", ":"))
+        for attempt in range(RETRIES + 1):
+            try:
+                with breaker(name):
+                    r = self.session().post(
+                        url, data=body, timeout=self.timeout, headers={"Content-Type": "application/json"},
+                    )
+                    r.raise_for_status()
+            except CircuitOpenError:
+                WEBHOOK_REQUESTS.inc(result="open")
+                return False
+            except Exception:
+                WEBHOOK_REQUESTS.inc(result="fail")
+                if attempt < RETRIES:
+                    time.sleep(0.2 * 2 ** attempt)
+                continue
+            WEBHOOK_REQUESTS.inc(result="ok")
+            return True
+        return False
+
+    def dispatch(self, events):
+        """
+        Queue `events` (dicts with a "url" key, removed before sending).
+        Returns the futures, one per POST.
+        """
+        by_url = {}
+        for event in events:
+            by_url.setdefault(event.pop("url"), []).append(event)
+
+        futures = []
+        for url, batch in by_url.items():
+            for start in range(0, len(batch), self.batch_size):
+                futures.append(self._pool.submit(self._post, url, batch[start:start + self.batch_size]))
+        return futures
+
+
+class AlertEngine:
+    """
+    Evaluates every subscription against each snapshot. Use on_snapshot as
+    a SnapshotCache listener.
+
+    With several workers sharing `store` (see hashprice_shared), all of
+    them evaluate, so their armed state stays current, but only the worker
+    holding the lock file next to the database delivers. Subscriptions
+    changed by another process are picked up on the next snapshot.
+    """
+
+    def __init__(self, store=None, dispatcher=None):
+        self.store = store or AlertStore()
+        self.dispatcher = dispatcher or WebhookDispatcher()
+        self._lock = threading.Lock()
+        self._subs = {}
+        self._indexes = {(m, d): _Index(d) for m in METRICS for d in DIRECTIONS}
+        self._fired = set()
+        self._values = {}
+        self._leader_fd = None
+        self._signature = None
+        self.reload()
+
+    def __len__(self):
+        return len(self._subs)
+
+    def reload(self):
+        self._signature = self.store.signature()
+        subs = self.store.all()
+        with self._lock:
+            self._subs = {s.id: s for s in subs}
+            for (metric, direction), index in self._indexes.items():
+                index.load([s for s in subs if s.metric == metric and s.direction == direction])
+            self._fired = {sid for sid in self._fired if sid in self._subs}
+
+    def subscribe(self, url, metric, direction, threshold, hysteresis=None):
+        sub = self.store.add(url, metric, direction, threshold, hysteresis)
+        with self._lock:
+            self._subs[sub.id] = sub
+            index = self._indexes[(sub.metric, sub.direction)]
+            index.add(sub)
+            value = self._values.get(sub.metric)
+            if value is not None and index.is_past(sub, value):
+                self._fired.add(sub.id)
+        return sub
+
+    def unsubscribe(self, sub_id):
+        removed = self.store.remove(sub_id)
+        with self._lock:
+            sub = self._subs.pop(sub_id, None)
+            if sub is not None:
+                self._indexes[(sub.metric, sub.direction)].remove(sub)
+                self._fired.discard(sub_id)
+        return removed
+
+    def get(self, sub_id):
+        return self._subs.get(sub_id)
+
+    def evaluate(self, values):
+        """
+        Apply a tick ({metric: value}) and return the triggered
+        Subscriptions, updating armed state.
+        """
+        triggered = []
+        with self._lock, STAGE_SECONDS.time(stage="alerts_evaluate"):
+            for metric, value in values.items():
+                if value is None or value != value:
+                    continue
+                prev = self._values.get(metric)
+                self._values[metric] = value
+                for direction in DIRECTIONS:
+                    index = self._indexes[(metric, direction)]
+                    if prev is None:
+                        self._fired.update(index.past(value))
+                        continue
+                    fire, rearm = index.crossed(prev, value)
+                    self._fired.difference_update(rearm)
+                    fired = [sid for sid in fire if sid not in self._fired]
+                    if fired:
+                        self._fired.update(fired)
+                        ALERTS_FIRED.inc(len(fired), metric=metric, direction=direction)
+                        triggered += [self._subs[sid] for sid in fired]
+        return triggered
+
+    def is_leader(self):
+        if fcntl is None:
+            return True
+        if self._leader_fd is None:
+            fd = os.open(f"{self.store.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._leader_fd = fd
+        return True
+
+    def on_snapshot(self, snapshot):
+        if self.store.signature() != self._signature:
+            self.reload()
+
+        data = snapshot.data
+        triggered = self.evaluate({metric: data.get(metric) for metric in METRICS})
+        if not triggered or not self.is_leader():
+            return []
+
+        base = {
+            "version": snapshot.version,
+            "timestamp": data["timestamp"],
+            "hashprice_rt": data["hashprice_rt"],
+            "hashprice_7d": data["hashprice_7d"],
+            "pct_vs_7d": data["pct_vs_7d"],
+        }
+        events = [
+            dict(
+                base,
+                url=sub.url,
+                subscription=sub.id,
+                metric=sub.metric,
+                direction=sub.direction,
+                threshold=sub.threshold,
+                value=data[sub.metric],
+            )
+            for sub in triggered
+        ]
+        return self.dispatcher.dispatch(events)
+
+
+def bench(subscriptions=100_000, ticks=50, receivers=100):
+    """
+    Evaluate `subscriptions` random subscriptions over `ticks` random-walk
+    ticks, delivering to a local receiver; prints per-tick evaluation time
+    and delivery throughput.
+    """
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from types import SimpleNamespace
+
+    received = []
+
+    class Receiver(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append(len(json.loads(body)["events"]))
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    store = AlertStore(os.path.join(tempfile.mkdtemp(), "alerts.sqlite"))
+    rng = random.Random(7)
+    with store._transaction() as conn:
+        conn.executemany(
+            "INSERT INTO subscriptions (url, metric, direction, threshold, hysteresis, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    f"{url}/hook/{rng.randrange(receivers)}",
+                    metric,
+                    rng.choice(DIRECTIONS),
+                    rng.uniform(30, 70) if metric == "hashprice_rt" else rng.uniform(-30, 30),
+                    DEFAULT_HYSTERESIS[metric],
+                    0.0,
+                )
+                for metric in (rng.choice(METRICS) for _ in range(subscriptions))
+            ],
+        )
+
+    start = time.perf_counter()
+    engine = AlertEngine(store, WebhookDispatcher())
+    print(f"loaded {len(engine)} subscriptions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    hashprice, hashprice_7d = 50.0, 50.0
+    timings, futures = [], []
+    start = time.perf_counter()
+    for version in range(1, ticks + 1):
+        hashprice *= 1 + rng.gauss(0, 0.02)
+        hashprice_7d += (hashprice - hashprice_7d) / 7
+        snapshot = SimpleNamespace(version=version, data={
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "hashprice_rt": hashprice,
+            "hashprice_7d": hashprice_7d,
+            "pct_vs_7d": (hashprice / hashprice_7d - 1) * 100,
+        })
+        tick = time.perf_counter()
+        batch = engine.on_snapshot(snapshot)
+        timings.append(time.perf_counter() - tick)
+        futures += batch
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    fired = sum(received)
+    server.shutdown()
+
+    timings.sort()
+    print(f"{ticks} ticks: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+          f"max {timings[-1] * 1000:.2f} ms per tick (evaluate + queue)")
+    print(f"{fired} alerts in {len(received)} POSTs delivered in {elapsed:.2f} s "
+          f"({fired / elapsed:,.0f} alerts/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hashprice alert subscriptions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("bench", help="evaluate random subscriptions against a local webhook receiver")
+    b.add_argument("--subscriptions", type=int, default=100_000)
+    b.add_argument("--ticks", type=int, default=50)
+    b.add_argument("--receivers", type=int, default=100, help="distinct webhook URLs")
+
+    args = parser.parse_args(argv)
+    if args.command == "bench":
+        bench(args.subscriptions, args.ticks, args.receivers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Fleet backtest over the Coin Metrics hashprice_1d history.
+
+A fleet is a dict (or JSON file) like:
+
+    {
+      "name": "2021 buildout",
+      "machines": [
+        {"model": "S19j Pro", "ths": 100, "jth": 29.5, "count": 500,
+         "deploy": "2021-06-01", "retire": "2025-06-01"}
+      ],
+      "power_price": [{"from": "2021-01-01", "price": 0.045},
+                      {"from": "2023-01-01", "price": 0.06}],
+      "uptime": 0.97,
+      "pool_fee": 0.02,
+      "curtail": "unprofitable",
+      "curtail_below": 40.0
+    }
+
+power_price is a flat $/kWh or a step schedule. "curtail": "unprofitable"
+switches a model off on days where its revenue would not cover its power,
+and curtail_below switches the whole fleet off on days when hashprice_1d
+(USD / PH / day) is below the threshold.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Scenario sweeps at or above this size use a process pool.
+PARALLEL_MIN_SCENARIOS = 4
+
+_WORKER_MARKET = None
+
+
+def load_fleet(path):
+    with open(path) as f:
+        fleet = json.load(f)
+    fleet.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return fleet
+
+
+def market_from_frame(df, start=None, end=None):
+    """
+    The only inputs a backtest needs: day (datetime64[D]) and hashprice_1d.
+    Kept as plain arrays so they are cheap to ship to worker processes.
+    """
+    days = df["time"].to_numpy().astype("datetime64[D]")
+    hashprice = df["hashprice_1d"].to_numpy(dtype="float64")
+
+    mask = np.ones(len(days), dtype=bool)
+    if start:
+        mask &= days >= np.datetime64(start, "D")
+    if end:
+        mask &= days <= np.datetime64(end, "D")
+    return {"days": days[mask], "hashprice_1d": hashprice[mask]}
+
+
+def power_price_series(schedule, days):
+    if isinstance(schedule, (int, float)):
+        return np.full(len(days), float(schedule))
+
+    steps = sorted(schedule, key=lambda s: s["from"])
+    starts = np.array([np.datetime64(s["from"], "D") for s in steps])
+    prices = np.array([float(s["price"]) for s in steps])
+
+    # Before the first step the first price applies.
+    index = np.searchsorted(starts, days, side="right") - 1
+    return prices[np.clip(index, 0, len(prices) - 1)]
+
+
+def backtest(fleet, market):
+    """
+    Daily P&L of `fleet` over `market` (from market_from_frame()).
+
+    Everything is computed as [machine, day] arrays in one pass. Returns
+    (daily DataFrame, summary dict).
+    """
+    days = market["days"]
+    hashprice = market["hashprice_1d"]
+    machines = fleet["machines"]
+    if not machines:
+        raise ValueError("fleet has no machines")
+
+    uptime = float(fleet.get("uptime", 1.0))
+    pool_fee = float(fleet.get("pool_fee", 0.0))
+    price = power_price_series(fleet.get("power_price", 0.05), days)
+
+    far_future = np.datetime64("9999-12-31", "D")
+    deploy = np.array([np.datetime64(m.get("deploy", "1970-01-01"), "D") for m in machines])
+    retire = np.array([np.datetime64(m["retire"], "D") if m.get("retire") else far_future for m in machines])
+    ths = np.array([float(m["ths"]) * int(m.get("count", 1)) for m in machines])
+    kw = np.array([float(m["ths"]) * float(m["jth"]) * int(m.get("count", 1)) / 1000.0 for m in machines])
+
+    active = (days[None, :] >= deploy[:, None]) & (days[None, :] < retire[:, None])
+    ph = (ths / 1000.0)[:, None] * active
+
+    revenue = ph * hashprice[None, :] * uptime * (1.0 - pool_fee)
+    power_cost = (kw[:, None] * active) * 24.0 * uptime * price[None, :]
+
+    curtailed = np.zeros_like(active)
+    if fleet.get("curtail") == "unprofitable":
+        curtailed |= active & (revenue < power_cost)
+    if fleet.get("curtail_below") is not None:
+        curtailed |= active & (hashprice < float(fleet["curtail_below"]))[None, :]
+
+    running = ~curtailed
+    revenue = revenue * running
+    power_cost = power_cost * running
+
+    daily = pd.DataFrame({
+        "time": days,
+        "hashprice_1d": hashprice,
+        "power_price": price,
+        "ph_deployed": ph.sum(axis=0),
+        "ph_curtailed": (ph * curtailed).sum(axis=0),
+        "revenue": revenue.sum(axis=0),
+        "power_cost": power_cost.sum(axis=0),
+    })
+    daily["profit"] = daily["revenue"] - daily["power_cost"]
+    daily["cumulative_profit"] = daily["profit"].cumsum()
+
+    return daily, summarize(fleet, daily)
+
+
+def summarize(fleet, daily):
+    live = daily[daily["ph_deployed"] > 0]
+    cumulative = daily["cumulative_profit"].to_numpy()
+    drawdown = float((np.maximum.accumulate(cumulative) - cumulative).max()) if len(cumulative) else 0.0
+
+    revenue = float(live["revenue"].sum())
+    power_cost = float(live["power_cost"].sum())
+    profit = revenue - power_cost
+
+    return {
+        "name": fleet.get("name", "fleet"),
+        "start": str(live["time"].iloc[0].date()) if len(live) else None,
+        "end": str(live["time"].iloc[-1].date()) if len(live) else None,
+        "days": int(len(live)),
+        "revenue": revenue,
+        "power_cost": power_cost,
+        "profit": profit,
+        "margin_pct": (profit / revenue * 100.0) if revenue else 0.0,
+        "profitable_days": int((live["profit"] > 0).sum()),
+        "curtailed_ph_days": float(live["ph_curtailed"].sum()),
+        "best_day": float(live["profit"].max()) if len(live) else 0.0,
+        "worst_day": float(live["profit"].min()) if len(live) else 0.0,
+        "max_drawdown": drawdown,
+    }
+
+
+def _init_worker(market):
+    global _WORKER_MARKET
+    _WORKER_MARKET = market
+
+
+def _run_in_worker(fleet):
+    return backtest(fleet, _WORKER_MARKET)[1]
+
+
+def run_scenarios(fleets, market, processes=None):
+    """
+    Summaries for many fleet scenarios. Large sweeps are spread over a
+    process pool; the market arrays are sent to each worker once.
+    """
+    if len(fleets) < PARALLEL_MIN_SCENARIOS or processes == 1:
+        return [backtest(fleet, market)[1] for fleet in fleets]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(market,)) as pool:
+        return list(pool.map(_run_in_worker, fleets))
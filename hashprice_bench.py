@@ -0,0 +1,421 @@
+"""
+Offline benchmarks for the engine and webapp hot paths.
+
+Runs every stage against a local btc.csv fixture served by an in-process
+HTTP stand-in (which also answers for CoinGecko / Coinbase), so results do
+not depend on the network. Timings and peak traced memory are compared with
+the stored baseline:
+
+    python hashprice_bench.py                    # run and diff against baseline
+    python hashprice_bench.py --add-stages       # record stages missing from the baseline
+    python hashprice_bench.py --save-baseline    # re-record every stage
+    python hashprice_bench.py --check            # exit 1 on regressions
+    python hashprice_bench.py --record           # refresh the fixture from upstream
+
+Existing entries are only ever replaced by --save-baseline, in a commit of
+its own, so a feature change cannot hide its own regression.
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(REPO_DIR, "benchmarks")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+FIXTURE_PATH = os.getenv("HASHPRICE_BENCH_FIXTURE", os.path.join("data", "bench", "btc.csv"))
+
+FIXTURE_PRICE = 65000.0
+
+# Realtime network payloads served for each hashprice_providers provider.
+NETWORK_FIXTURES = {
+    "mempool-difficulty": {"currentDifficulty": 1.2e14, "currentHashrate": 8.5e20},
+    "hashrateindex-hashrate": {"hashrate_1d": 850.0},
+    "mempool-hashrate": {"currentDifficulty": 1.2e14, "currentHashrate": 8.5e20},
+    "mempool-height": 920000,
+    "mempool-fees": [{"blockVSize": 997000, "medianFee": 3.1}] * 8,
+}
+
+# A stage is flagged when its median time or peak memory grows by more
+# than this fraction over the baseline.
+REGRESSION_THRESHOLD = 0.20
+
+
+def write_synthetic_fixture(path, seed=7):
+    """
+    A deterministic stand-in for Coin Metrics btc.csv: the same date range,
+    the five columns the engine reads, early rows without a price, and enough
+    filler columns to make parsing realistically wide.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2009-01-03", "2026-10-01", freq="D")
+    n = len(days)
+
+    columns = {"time": days.strftime("%Y-%m-%d")}
+    for i in range(120):
+        columns[f"Metric{i:03d}"] = rng.random(n) * 1000
+
+    halvings = np.array(["2012-11-28", "2016-07-09", "2020-05-11", "2024-04-20"], dtype="datetime64[D]")
+    epoch = np.searchsorted(halvings, days.to_numpy().astype("datetime64[D]"), side="right")
+    df = pd.DataFrame(columns)
+    df["PriceUSD"] = np.exp(np.cumsum(rng.normal(0.002, 0.03, n))) * 0.1
+    df["HashRate"] = np.exp(np.linspace(0, np.log(8e8), n)) * (1 + rng.normal(0, 0.05, n))
+    df["IssTotNtv"] = 7200.0 / 2.0 ** epoch * (1 + rng.normal(0, 0.05, n))
+    df["FeeTotNtv"] = rng.random(n) * 20
+    df.loc[:570, "PriceUSD"] = np.nan
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path, index=False)
+
+
+def ensure_fixture(path, record=False):
+    if record:
+        import requests
+        from hashprice_engine import COINMETRICS_CSV
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        r = requests.get(COINMETRICS_CSV, timeout=60)
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            f.write(r.content)
+    elif not os.path.exists(path):
+        write_synthetic_fixture(path)
+    return path
+
+
+def _byte_range(spec, size):
+    # (first, last) for a single "bytes=a-b", "bytes=a-" or "bytes=-n" range,
+    # None when it cannot be satisfied.
+    first, _, last = spec.partition("=")[2].partition("-")
+    if not first:
+        first, last = max(0, size - int(last)), size - 1
+    else:
+        first, last = int(first), min(int(last) if last else size - 1, size - 1)
+    return (first, last) if first <= last and first < size else None
+
+
+class StandIn:
+    """
+    Serves the fixture at /btc.csv, fixed quotes at /coingecko, /coinbase
+    and NETWORK_FIXTURES at /network/<provider>.
+
+    With ranges=True, /btc.csv honours single-range Range headers (206 with
+    Content-Range, or 416); otherwise Range is ignored like a server without
+    support. With validators=True it carries an ETag and Last-Modified and
+    answers a matching If-None-Match / If-Modified-Since with 304. Every
+    request is appended to `requests` as (path, Range header); load()
+    replaces the file being served.
+    """
+
+    def __init__(self, fixture, ranges=False, validators=False):
+        self.load(fixture)
+        stand_in = self
+        requests = self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, Nagle +
+            # delayed ACK add ~40 ms to keep-alive requests.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                requests.append((self.path, self.headers.get("Range")))
+                validated = {}
+                if self.path.startswith("/btc.csv"):
+                    payload, content_type = stand_in.body, "text/csv"
+                    if validators:
+                        if self.not_modified():
+                            return
+                        validated = {"ETag": stand_in.etag, "Last-Modified": stand_in.last_modified}
+                    if ranges and self.headers.get("Range"):
+                        self.send_partial(payload, content_type)
+                        return
+                elif self.path.startswith("/coingecko"):
+                    payload = json.dumps({"bitcoin": {"usd": FIXTURE_PRICE}}).encode()
+                    content_type = "application/json"
+                elif self.path.startswith("/coinbase"):
+                    payload = json.dumps({"data": {"amount": str(FIXTURE_PRICE)}}).encode()
+                    content_type = "application/json"
+                elif self.path.startswith("/network/") and self.path[9:] in NETWORK_FIXTURES:
+                    payload = json.dumps(NETWORK_FIXTURES[self.path[9:]]).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in validated.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def not_modified(self):
+                etag = self.headers.get("If-None-Match")
+                since = self.headers.get("If-Modified-Since")
+                if etag is not None:
+                    match = etag == stand_in.etag
+                else:
+                    match = since is not None and since == stand_in.last_modified
+                if match:
+                    self.send_response(304)
+                    self.send_header("ETag", stand_in.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                return match
+
+            def send_partial(self, payload, content_type):
+                span = _byte_range(self.headers["Range"], len(payload))
+                if span is None:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(payload)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                first, last = span
+                self.send_response(206)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Range", f"bytes {first}-{last}/{len(payload)}")
+                self.send_header("Content-Length", str(last - first + 1))
+                self.end_headers()
+                self.wfile.write(payload[first:last + 1])
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def load(self, fixture):
+        with open(fixture, "rb") as f:
+            self.body = f.read()
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"'
+        self.last_modified = formatdate(os.path.getmtime(fixture), usegmt=True)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def measure(fn, repeat):
+    """
+    Median / min wall time over `repeat` runs, then one extra run under
+    tracemalloc for the peak.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "peak_mb": round(peak / 1e6, 3),
+    }
+
+
+def cold_start(*flags):
+    """
+    A fresh interpreter importing everything `hashprice_cli --fast` needs.
+    """
+    subprocess.run(
+        [sys.executable, *flags, "-c", "import hashprice_cli, hashprice_fast, hashprice_providers"],
+        cwd=REPO_DIR,
+        check=True,
+    )
+
+
+def point_at(url):
+    """
+    Point the engine, the fast path and the network providers at a StandIn.
+    """
+    import hashprice_engine as engine
+    import hashprice_fast
+    from hashprice_providers import PROVIDERS
+
+    for module in (engine, hashprice_fast):
+        module.COINMETRICS_CSV = url + "/btc.csv"
+        module.PRICE_SOURCES = [
+            ("CoinGecko", url + "/coingecko"),
+            ("Coinbase", url + "/coinbase"),
+        ]
+    # Providers sharing an upstream URL keep sharing one stand-in path.
+    paths = {}
+    for provider in PROVIDERS:
+        provider.url = f"{url}/network/{paths.setdefault(provider.url, provider.name)}"
+
+
+def isolate(directory):
+    """
+    Point every file the engine, the store, alerts and the series persist at
+    `directory`, so a run never overwrites production state in data/ (the
+    last-known-good price and data above all). Also exported as
+    HASHPRICE_DATA_DIR for modules imported later.
+    """
+    import hashprice_alerts
+    import hashprice_engine as engine
+    import hashprice_fast
+    import hashprice_series
+    import hashprice_store
+
+    os.environ["HASHPRICE_DATA_DIR"] = directory
+    engine.LAST_GOOD_PRICE = hashprice_fast.LAST_GOOD_PRICE = os.path.join(directory, "last_good_price.json")
+    engine.LAST_GOOD_DATA = hashprice_fast.LAST_GOOD_DATA = os.path.join(directory, "last_good_coinmetrics.csv")
+    engine.HEADER_CACHE = hashprice_fast.HEADER_CACHE = os.path.join(directory, "coinmetrics_header.csv")
+    hashprice_store.STORE_PATH = os.path.join(directory, "coinmetrics.sqlite")
+    hashprice_alerts.ALERTS_DB = os.path.join(directory, "alerts.sqlite")
+    hashprice_series.SERIES_PATH = os.path.join(directory, "hashprice.series")
+
+
+def run(fixture, repeat=5):
+    import hashprice_engine as engine
+    import hashprice_fast
+    from hashprice_projection import inputs_from_frame, project
+    from hashprice_rolling import RollingMetrics
+    from hashprice_series import load_series, write_series
+
+    # Before webapp is imported: it opens its stores at import.
+    isolate(tempfile.mkdtemp(prefix="hashprice-bench-"))
+    stand_in = StandIn(fixture)
+    point_at(stand_in.url)
+
+    import webapp
+    from fastapi.testclient import TestClient
+
+    raw = engine.load_raw(fixture)
+    df = engine.add_derived(raw)
+    data = engine.build_result(df, FIXTURE_PRICE)
+    snapshot = webapp.SNAPSHOT.refresh()
+    series_path = os.path.join(tempfile.mkdtemp(), "bench.series")
+    write_series(df, series_path)
+    projection_inputs = inputs_from_frame(df, data)
+
+    stages = {
+        "parse_csv": lambda: engine.load_raw(fixture),
+        "derive_columns": lambda: engine.add_derived(raw),
+        "rolling_metrics": lambda: RollingMetrics.from_frame(df),
+        "load_series": lambda: load_series(series_path),
+        "series_build_result": lambda: engine.build_result(load_series(series_path), FIXTURE_PRICE),
+        "projection_10k": lambda: project(projection_inputs, paths=10_000, processes=1),
+        "fetch_data_http": lambda: engine.fetch_data("full"),
+        "fetch_live_price": lambda: engine.fetch_live_price(),
+        "calculate": lambda: engine.calculate("full"),
+        "calculate_difficulty": lambda: engine.calculate_difficulty(),
+        "fast_calculate": lambda: hashprice_fast.calculate(),
+        "fast_cold_start": cold_start,
+        "fast_cold_start_no_site": lambda: cold_start("-S"),
+        "build_trend": lambda: webapp.build_trend(data, 56),
+        "render_dashboard": lambda: webapp.render_dashboard(snapshot, "green", webapp.BRANDS.get(webapp.BRANDS.default_slug())),
+    }
+
+    results = {}
+    try:
+        for name, fn in stages.items():
+            results[name] = measure(fn, repeat)
+
+        with TestClient(webapp.app) as client:
+            client.get("/")
+            results["get_dashboard"] = measure(lambda: client.get("/"), repeat * 20)
+            results["get_api_hashprice"] = measure(lambda: client.get("/api/v1/hashprice"), repeat * 20)
+    finally:
+        stand_in.close()
+
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Print a diff table and return the names of regressed stages.
+    """
+    regressions = []
+    print(f"{'Stage':<20} {'Median ms':>10} {'Base ms':>10} {'Δ time':>8} {'Peak MB':>9} {'Base MB':>9} {'Δ mem':>8}")
+    print("-" * 80)
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            print(f"{name:<20} {r['median_ms']:>10.2f} {'—':>10} {'':>8} {r['peak_mb']:>9.2f} {'—':>9}")
+            continue
+
+        dt = r["median_ms"] / b["median_ms"] - 1.0 if b["median_ms"] else 0.0
+        dm = r["peak_mb"] / b["peak_mb"] - 1.0 if b["peak_mb"] else 0.0
+        flag = ""
+        if dt > threshold or dm > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<20} {r['median_ms']:>10.2f} {b['median_ms']:>10.2f} {dt:>+8.0%} "
+            f"{r['peak_mb']:>9.2f} {b['peak_mb']:>9.2f} {dm:>+8.0%}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline hashprice benchmarks")
+    parser.add_argument("--fixture", default=FIXTURE_PATH, help="btc.csv fixture (synthesized if missing)")
+    parser.add_argument("--record", action="store_true", help="download the upstream btc.csv as the fixture first")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--add-stages", action="store_true", help="add stages missing from the baseline, keep the rest")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any stage regressed")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    fixture = ensure_fixture(args.fixture, args.record)
+    results = run(fixture, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("stages", {})
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline or args.add_stages:
+        if args.save_baseline:
+            stages = results
+        else:
+            stages = dict(baseline, **{name: r for name, r in results.items() if name not in baseline})
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"python": sys.version.split()[0], "repeat": args.repeat, "stages": stages},
+                f, indent=2, sort_keys=True,
+            )
+            f.write("\n")
+        added = len(stages) - len(baseline) if args.add_stages else len(stages)
+        print(f"\nBaseline written to {args.baseline} ({added} stages recorded)")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
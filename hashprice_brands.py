@@ -0,0 +1,113 @@
+import glob
+import json
+import os
+import threading
+import time
+
+BRANDS_DIR = os.getenv("HASHPRICE_BRANDS_DIR", "brands")
+DEFAULT_BRAND = os.getenv("BRAND", "beardminer")
+
+# How often a request may trigger a stat() scan of BRANDS_DIR.
+RELOAD_CHECK_SECONDS = 2.0
+
+
+class BrandRegistry:
+    """
+    All brands/*.json configs, keyed by file name (brands/clutch.json -> "clutch").
+
+    Besides "name" and "ascii", a config may list "hosts" it should answer
+    for. Otherwise a host whose first DNS label is a brand slug
+    (clutch.example.com) maps to that brand, and anything else falls back to
+    the default brand. Adding, editing or removing a file is picked up on the
+    next check without a restart; `version` changes whenever it is.
+    """
+
+    def __init__(self, directory=BRANDS_DIR, default=DEFAULT_BRAND):
+        self.directory = directory
+        self.default = default
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._brands = {}
+        self._hosts = {}
+        self._signature = None
+        self._checked = 0.0
+
+        self.reload()
+
+    @property
+    def brands(self):
+        return self._brands
+
+    def _scan(self):
+        signature = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            try:
+                signature.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def reload(self):
+        """
+        Re-read the brand files if any were added, changed or removed.
+        Returns True when the registry changed.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            signature = self._scan()
+            if signature == self._signature:
+                return False
+
+            brands = {}
+            for path, _ in signature:
+                slug = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    with open(path) as f:
+                        brands[slug] = json.load(f)
+                except (OSError, ValueError):
+                    # Half-written during a deploy: keep serving the previous
+                    # version and retry on the next check.
+                    if slug in self._brands:
+                        brands[slug] = self._brands[slug]
+                    signature = None
+
+            hosts = {}
+            for slug, config in brands.items():
+                for host in config.get("hosts", []):
+                    hosts[host.lower()] = slug
+
+            self._signature = signature
+            if brands == self._brands and hosts == self._hosts:
+                return False
+
+            self._brands = brands
+            self._hosts = hosts
+            self.version += 1
+            return True
+
+    def maybe_reload(self):
+        if time.monotonic() - self._checked >= RELOAD_CHECK_SECONDS:
+            self.reload()
+
+    def get(self, slug):
+        self.maybe_reload()
+        return self._brands.get(slug)
+
+    def default_slug(self):
+        if self.default in self._brands:
+            return self.default
+        return next(iter(sorted(self._brands)), None)
+
+    def resolve_host(self, host):
+        self.maybe_reload()
+
+        host = (host or "").split(":")[0].lower()
+        if host in self._hosts:
+            return self._hosts[host]
+
+        label = host.split(".")[0]
+        if label in self._brands:
+            return label
+
+        return self.default_slug()
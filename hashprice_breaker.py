@@ -0,0 +1,164 @@
+import os
+import random
+import threading
+import time
+
+from hashprice_metrics import Counter, Gauge
+
+# Consecutive failures that open a breaker, and the open period before the
+# first half-open probe. Each failed probe doubles the period (with jitter)
+# up to MAX_OPEN_SECONDS.
+FAILURE_THRESHOLD = int(os.getenv("HASHPRICE_BREAKER_FAILURES", "3"))
+BASE_OPEN_SECONDS = float(os.getenv("HASHPRICE_BREAKER_OPEN", "10"))
+MAX_OPEN_SECONDS = float(os.getenv("HASHPRICE_BREAKER_MAX_OPEN", "600"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    Closed: calls go through and consecutive failures are counted. After
+    `failure_threshold` of them the breaker opens and calls are refused
+    immediately (CircuitOpenError) for a jittered, exponentially growing
+    period. Then exactly one caller is let through as a half-open probe: its
+    success closes the breaker, its failure re-opens it for longer.
+
+    Use allow() / record_success() / record_failure() directly, or the
+    breaker as a context manager around the call.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=FAILURE_THRESHOLD,
+        base_open_seconds=BASE_OPEN_SECONDS,
+        max_open_seconds=MAX_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = base_open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.retry_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        """
+        True if a call may proceed now. Never blocks.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def available(self):
+        """
+        True if allow() would let a call through now, without claiming the
+        half-open probe. For filtering providers before dispatching work.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() >= self.retry_at
+            return not self._probing
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        # "Equal jitter": half the backoff is fixed, half random, so replicas
+        # that failed together do not all probe at the same instant.
+        backoff = min(self.max_open_seconds, self.base_open_seconds * 2 ** self.opened)
+        self.retry_at = time.monotonic() + backoff / 2 + random.uniform(0, backoff / 2)
+        self.opened += 1
+        self.state = OPEN
+        self._probing = False
+        BREAKER_OPENS.inc(provider=self.name)
+
+    def retry_in(self):
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.retry_at - time.monotonic())
+
+    def __enter__(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open (retry in {self.retry_in():.0f}s)")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.record_success()
+        elif not issubclass(exc_type, CircuitOpenError):
+            self.record_failure()
+        return False
+
+    def status(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker(name):
+    """
+    The process-wide breaker for provider `name`, created on first use.
+    """
+    with _BREAKERS_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name)
+        return _BREAKERS[name]
+
+
+def breaker_states():
+    with _BREAKERS_LOCK:
+        return {name: b.status() for name, b in _BREAKERS.items()}
+
+
+BREAKER_OPENS = Counter(
+    "hashprice_breaker_opens_total",
+    "Times a provider circuit breaker opened.",
+    ["provider"],
+)
+Gauge(
+    "hashprice_breaker_state",
+    "Provider circuit breaker state (0 closed, 1 half-open, 2 open).",
+    ["provider"],
+    fn=lambda: {(name,): STATE_VALUES[s["state"]] for name, s in breaker_states().items()},
+)
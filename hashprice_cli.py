@@ -1,30 +1,357 @@
-from hashprice_engine import calculate
+import argparse
+import sys
+import time
 
-def print_dashboard():
-    data = calculate()
+# hashprice_engine (pandas, requests) is imported inside the commands that
+# need it, so --fast runs never pay for it.
+
+def print_dashboard(mode=None, series=None):
+    from hashprice_engine import calculate
+
+    df = None
+    if series:
+        from hashprice_series import load_series
+
+        df = load_series(series)
+    data = calculate(mode, df)
     trend = data['trend']
-    max_val = trend['hashprice_1d'].max()
+    print_result(data, zip(trend['time'].dt.strftime('%Y-%m-%d'), trend['hashprice_1d']))
+
+def print_fast_dashboard(mode=None):
+    from hashprice_fast import calculate
+
+    data = calculate(mode)
+    print_result(data, data['trend'])
+    timings = data['timings']
+    print("-" * 60)
+    clock = "wall" if timings['startup_clock'] == "wall" else "CPU"
+    print(f"Cold start {timings['startup_ms']:.0f} ms {clock} (interpreter + imports, excl. network) · fetch + compute {timings['fetch_ms']:,.0f} ms")
+
+def dashboard_lines(data, trend):
+    trend = list(trend)
+    max_val = max(value for _, value in trend)
+
+    lines = [
+        "",
+        "BITCOIN HASHPRICE DASHBOARD",
+        f"Last Updated: {data['timestamp']}",
+        "-" * 60,
+        f"BTC Spot Price     : ${data['spot']:,.2f}",
+        f"Realtime Hashprice : ${data['hashprice_rt']:.2f}   ▲ {data['pct_vs_7d']:+.2f}% vs 7D",
+        "",
+        f"1-Day Raw          : ${data['hashprice_1d']:.2f}",
+        f"7-Day Smoothed     : ${data['hashprice_7d']:.2f}",
+        "-" * 60,
+        "Recent Trend (1-Day Raw + Realtime Today):",
+    ]
+    for day, value in trend:
+        length = int((value / max_val) * 40)
+        bar = "░" * length
+        lines.append(f"{day} | {bar} ${value:.2f}")
+
+    length = int((data['hashprice_rt'] / max_val) * 40)
+    bar = "░" * length
+    lines.append("-" * 60)
+    lines.append(f"{data['timestamp'][:10]} | {bar} ${data['hashprice_rt']:.2f}")
+    return lines
+
+def print_result(data, trend):
+    for line in dashboard_lines(data, trend):
+        print(line)
+    for name, fetched in sorted(data.get('stale', {}).items()):
+        print(f"STALE {name}: upstream unavailable, last known good from {time.strftime('%Y-%m-%d %H:%M', time.localtime(fetched))}")
+
+class LiveScreen:
+    """
+    Keeps a block of lines on a terminal and, on each draw(), rewrites only
+    the lines that differ from the previous draw (ANSI cursor addressing).
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lines = None
+
+    def draw(self, lines):
+        out = []
+        previous = self.lines
+        if previous is None:
+            # Hide the cursor and start from a clear screen.
+            out.append("\x1b[?25l\x1b[2J")
+            previous = []
+
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                out.append(f"\x1b[{row + 1};1H\x1b[2K{line}")
+        for row in range(len(lines), len(previous)):
+            out.append(f"\x1b[{row + 1};1H\x1b[2K")
+        self.lines = list(lines)
+        if not out:
+            return
+
+        out.append(f"\x1b[{len(lines) + 1};1H")
+        self.stream.write("".join(out))
+        self.stream.flush()
+
+    def close(self):
+        if self.lines is not None:
+            self.stream.write("\x1b[?25h")
+            self.stream.flush()
+
+def watch(mode=None, price_interval=None, data_interval=None, tick=1.0, series=None):
+    """
+    Keep one process running: the dataset is refreshed every data_interval
+    and the spot price every price_interval by a SnapshotCache, and the
+    screen is redrawn each tick from the cached snapshot. On a terminal only
+    changed lines are rewritten; otherwise each new snapshot is printed.
+    With `series` the dataset is re-read from that hashprice_series export
+    instead of fetched from Coin Metrics.
+    """
+    from functools import partial
+
+    from hashprice_engine import fetch_data
+    from hashprice_snapshot import DATA_INTERVAL, PRICE_INTERVAL, SnapshotCache
+
+    if series:
+        from hashprice_series import load_series
+
+        load = partial(load_series, series)
+    else:
+        load = partial(fetch_data, mode)
+
+    cache = SnapshotCache(
+        data_interval=data_interval or DATA_INTERVAL,
+        price_interval=price_interval or PRICE_INTERVAL,
+        fetch_data=load,
+    )
+    cache.get()
+    cache.start()
+
+    screen = LiveScreen() if sys.stdout.isatty() else None
+    shown = None
+    try:
+        while True:
+            snapshot = cache.get()
+            if screen or snapshot.version != shown:
+                trend = snapshot.data['trend']
+                lines = dashboard_lines(
+                    snapshot.data, zip(trend['time'].dt.strftime('%Y-%m-%d'), trend['hashprice_1d'])
+                )
+                status = f"Snapshot v{snapshot.version} · {int(snapshot.age)}s old"
+                if cache.is_stale(snapshot):
+                    status += f" · STALE ({cache.last_error or 'serving last known good data'})"
+                lines += ["-" * 60, status]
+
+                if screen:
+                    screen.draw(lines)
+                else:
+                    print("\n".join(lines), flush=True)
+                shown = snapshot.version
+            time.sleep(tick)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.stop()
+        if screen:
+            screen.close()
+
+def print_difficulty(mode=None):
+    from hashprice_engine import calculate_difficulty
+
+    data = calculate_difficulty(mode=mode)
 
     print()
-    print("BITCOIN HASHPRICE DASHBOARD")
+    print("BITCOIN HASHPRICE (DIFFICULTY MODEL)")
     print("Last Updated:", data['timestamp'])
     print("-" * 60)
     print(f"BTC Spot Price     : ${data['spot']:,.2f}")
-    print(f"Realtime Hashprice : ${data['hashprice_rt']:.2f}   ▲ {data['pct_vs_7d']:+.2f}% vs 7D")
+    print(f"Difficulty         : {data['difficulty']:,.0f}")
+    print(f"Block Height       : {data['height']:,}")
+    print(f"Subsidy + Fees     : {data['subsidy_btc']:.3f} + {data['fee_btc_per_block']:.3f} BTC / block")
+    print(f"Implied Hashrate   : {data['implied_hashrate_ph']:,.0f} PH/s")
+    print(f"Realtime Hashprice : ${data['hashprice']:.2f}")
+    check = data.get('cross_check')
+    if check:
+        print("-" * 60)
+        print(f"Coin Metrics RT    : ${check['coinmetrics_rt']:.2f}   ({data['hashprice'] - check['coinmetrics_rt']:+.2f}, {check['diff_pct']:+.2f}%)")
+        print(f"CM Hashrate        : {check['coinmetrics_hashrate_ph']:,.0f} PH/s")
+
+def print_parse_profile(source=None):
+    from hashprice_engine import profile_parse
+
+    stats = profile_parse(source)
+    print(f"Rows parsed        : {stats['rows']:,}")
+    print(f"Parse time         : {stats['seconds'] * 1000:,.1f} ms")
+    print(f"Peak memory        : {stats['peak_mb']:,.1f} MB")
+
+def run_backtest(args):
+    from hashprice_backtest import load_fleet, market_from_frame, backtest, run_scenarios
+    from hashprice_engine import fetch_data
+    from hashprice_grid import parse_axis
+
+    fleets = [load_fleet(path) for path in args.fleets]
+    if args.power_sweep:
+        fleets = [
+            dict(fleet, name=f"{fleet['name']} @ ${price:.4f}/kWh", power_price=float(price))
+            for fleet in fleets
+            for price in parse_axis(args.power_sweep, "--power-sweep")
+        ]
+
+    market = market_from_frame(fetch_data(), args.start, args.end)
+
+    if len(fleets) == 1:
+        daily, summary = backtest(fleets[0], market)
+        if args.daily_csv:
+            daily.to_csv(args.daily_csv, index=False)
+        summaries = [summary]
+    else:
+        summaries = run_scenarios(fleets, market, args.processes)
+
     print()
-    print(f"1-Day Raw          : ${data['hashprice_1d']:.2f}")
-    print(f"7-Day Smoothed     : ${data['hashprice_7d']:.2f}")
-    print("-" * 60)
-    print("Recent Trend (1-Day Raw + Realtime Today):")
-    for _, row in trend.iterrows():
-        length = int((row['hashprice_1d'] / max_val) * 40)
-        bar = "░" * length
-        print(f"{row['time'].date()} | {bar} ${row['hashprice_1d']:.2f}")
+    print("FLEET BACKTEST")
+    print("-" * 96)
+    print(f"{'Scenario':<34} {'Days':>6} {'Revenue':>14} {'Power':>14} {'Profit':>14} {'Margin':>8}")
+    for s in summaries:
+        print(
+            f"{s['name'][:34]:<34} {s['days']:>6} ${s['revenue']:>13,.0f} "
+            f"${s['power_cost']:>13,.0f} ${s['profit']:>13,.0f} {s['margin_pct']:>7.1f}%"
+        )
+    if len(summaries) == 1:
+        s = summaries[0]
+        print("-" * 96)
+        print(f"Period             : {s['start']} → {s['end']}")
+        print(f"Profitable days    : {s['profitable_days']:,} / {s['days']:,}")
+        print(f"Curtailed PH-days  : {s['curtailed_ph_days']:,.1f}")
+        print(f"Best / worst day   : ${s['best_day']:,.2f} / ${s['worst_day']:,.2f}")
+        print(f"Max drawdown       : ${s['max_drawdown']:,.2f}")
 
-    length = int((data['hashprice_rt'] / max_val) * 40)
-    bar = "░" * length
+def run_projection(args):
+    from hashprice_engine import calculate, fetch_data
+    from hashprice_projection import inputs_from_frame, project
+
+    if args.series:
+        from hashprice_series import load_series
+
+        df = load_series(args.series)
+    else:
+        # The model resamples years of history, so always the full CSV.
+        df = fetch_data("full")
+    data = calculate(df=df)
+    result = project(
+        inputs_from_frame(df, data), paths=args.paths, horizon=args.horizon, model=args.model,
+        seed=args.seed, processes=args.processes,
+    )
+    start = result['start']
+
+    print()
+    print(f"HASHPRICE PROJECTION ({result['model'].upper()}, {result['paths']:,} PATHS)")
+    print("Last Updated:", data['timestamp'])
+    print("-" * 60)
+    print(f"Start              : ${start['hashprice']:.2f} / PH / day on {start['today']}")
+    print(f"Spot / Hashrate    : ${start['spot']:,.2f} / {start['hashrate_ph']:,.0f} PH/s")
+    halving = result['halving']
+    note = "" if halving['in_horizon'] else " (beyond horizon)"
+    print(f"Next Halving       : block {halving['height']:,} ~ {halving['date']}, in {halving['days']:,} days{note}")
+    print("-" * 60)
+    print(f"{'Days':>6} {'p5':>9} {'p25':>9} {'p50':>9} {'p75':>9} {'p95':>9}")
+    marks = dict(result['horizons'])
+    marks.setdefault(str(result['horizon_days']), {
+        name: band[-1] for name, band in result['bands'].items()
+    })
+    for days, band in marks.items():
+        print(f"{days:>6} " + " ".join(f"{'$' + format(band[p], '.2f'):>9}" for p in ("p5", "p25", "p50", "p75", "p95")))
     print("-" * 60)
-    print(f"{data['timestamp'][:10]} | {bar} ${data['hashprice_rt']:.2f}")
+    print(f"P(below today at {result['horizon_days']} days): {result['prob_below_current'] * 100:.1f}%")
+    print(f"Simulated in {result['seconds']:.2f} s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bitcoin hashprice dashboard")
+    parser.add_argument(
+        "--profile-parse", metavar="SOURCE", nargs="?", const="",
+        help="parse the Coin Metrics CSV (default: upstream URL) and report time and peak memory",
+    )
+    parser.add_argument(
+        "--tail", action="store_true",
+        help="fetch only the end of the Coin Metrics CSV via HTTP Range requests",
+    )
+    parser.add_argument(
+        "--series", metavar="PATH",
+        help="read Coin Metrics from a hashprice_series export instead of fetching it",
+    )
+
+    parser.add_argument(
+        "--fast", action="store_true",
+        help="pandas-free fast-start path (stdlib csv + urllib); reports cold-start time",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="stay running and redraw in place; data (or --series) and price refresh on their own intervals",
+    )
+    parser.add_argument("--price-interval", type=float, metavar="SECONDS", help="with --watch: spot price refresh interval")
+    parser.add_argument("--data-interval", type=float, metavar="SECONDS", help="with --watch: Coin Metrics refresh interval")
+    parser.add_argument(
+        "--difficulty", action="store_true",
+        help="compute realtime hashprice from difficulty, subsidy and fees, without the Coin Metrics CSV",
+    )
+    parser.add_argument(
+        "--cross-check", action="store_true",
+        help="with --difficulty, also fetch Coin Metrics (honours --tail) and compare",
+    )
+
+    commands = parser.add_subparsers(dest="command")
+
+    bt = commands.add_parser("backtest", help="run fleet(s) against the full Coin Metrics history")
+    bt.add_argument("fleets", nargs="+", metavar="FLEET.json", help="fleet definition(s), see hashprice_backtest")
+    bt.add_argument("--start", help="first day (YYYY-MM-DD)")
+    bt.add_argument("--end", help="last day (YYYY-MM-DD)")
+    bt.add_argument("--power-sweep", metavar="PRICES", help="re-run each fleet at flat $/kWh prices, a,b,c or start:stop:step")
+    bt.add_argument("--processes", type=int, help="worker processes for scenario sweeps")
+    bt.add_argument("--daily-csv", metavar="PATH", help="write daily P&L (single scenario only)")
+
+    pj = commands.add_parser("project", help="Monte Carlo percentile bands of future hashprice (honours --series)")
+    pj.add_argument("--horizon", type=int, default=365, metavar="DAYS", help="days ahead (default 365)")
+    pj.add_argument("--paths", type=int, default=100_000, help="simulated paths (default 100,000)")
+    pj.add_argument("--model", choices=("bootstrap", "gbm"), default="bootstrap", help="daily price returns: resampled history or lognormal")
+    pj.add_argument("--seed", type=int, default=20090103, help="random seed; the same seed gives the same bands")
+    pj.add_argument("--processes", type=int, help="worker processes (default: all cores, 1 for none)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "backtest":
+        run_backtest(args)
+        return
+
+    if args.command == "project":
+        try:
+            run_projection(args)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    if args.profile_parse is not None:
+        print_parse_profile(args.profile_parse or None)
+        return
+
+    mode = "tail" if args.tail else None
+
+    if args.watch and args.fast:
+        # --fast only saves cold-start time, which a watch pays once.
+        parser.error("--watch cannot be combined with --fast")
+    if args.watch and args.difficulty:
+        parser.error("--watch cannot be combined with --difficulty")
+
+    if args.difficulty:
+        print_difficulty((mode or "full") if args.cross_check else None)
+        return
+
+    if args.watch:
+        watch(mode, args.price_interval, args.data_interval, series=args.series)
+        return
+
+    if args.fast:
+        print_fast_dashboard(mode)
+        return
+
+    print_dashboard(mode, args.series)
 
 if __name__ == "__main__":
-    print_dashboard()
+    main()
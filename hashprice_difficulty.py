@@ -0,0 +1,85 @@
+"""
+Hashprice from first principles: difficulty, block height and a fee
+estimate, with no Coin Metrics history.
+
+Expected blocks per day at difficulty D for hashrate H (H/s) is
+H * 86400 / (D * 2**32), so one PH/s earns
+
+    (subsidy + fees per block) * 86400 * 1e15 / (D * 2**32)   BTC / day
+
+which is what hashprice() returns in USD at the given spot price. All of
+this is plain arithmetic, cheap enough to recompute on every price tick.
+"""
+
+COIN = 100_000_000
+INITIAL_SUBSIDY = 50 * COIN
+HALVING_INTERVAL = 210_000
+TARGET_SPACING = 600
+BLOCKS_PER_DAY = 86400 // TARGET_SPACING
+
+# (height, date) of the fourth halving, the anchor for estimate_height().
+HALVING_ANCHOR = (840_000, "2024-04-20")
+
+
+def block_subsidy(height):
+    """
+    Subsidy in satoshis for a block at `height`, as consensus computes it
+    (a right shift per halving, zero after 64 halvings).
+    """
+    halvings = int(height) // HALVING_INTERVAL
+    if halvings >= 64:
+        return 0
+    return INITIAL_SUBSIDY >> halvings
+
+
+def halving_info(height):
+    height = int(height)
+    epoch = height // HALVING_INTERVAL
+    next_height = (epoch + 1) * HALVING_INTERVAL
+    return {
+        "epoch": epoch,
+        "subsidy_btc": block_subsidy(height) / COIN,
+        "next_halving_height": next_height,
+        "blocks_to_halving": next_height - height,
+        "days_to_halving": (next_height - height) / BLOCKS_PER_DAY,
+    }
+
+
+def estimate_height(day):
+    """
+    Approximate block height on `day` (anything numpy.datetime64 accepts)
+    from the last halving at the target spacing, for when no height
+    provider is available. Blocks usually come slightly faster than the
+    target, so this runs a little behind.
+    """
+    import numpy as np
+
+    days = (np.datetime64(day, "D") - np.datetime64(HALVING_ANCHOR[1], "D")).astype(int)
+    return HALVING_ANCHOR[0] + int(days) * BLOCKS_PER_DAY
+
+
+def implied_hashrate_ph(difficulty):
+    # Hashes per block at this difficulty, spread over the target spacing.
+    return difficulty * 2 ** 32 / TARGET_SPACING / 1e15
+
+
+def hashprice(difficulty, height, price, fee_btc_per_block=0.0):
+    """
+    USD / PH / day at `difficulty` and spot `price` for blocks at `height`.
+    """
+    if difficulty <= 0:
+        raise ValueError("difficulty must be positive")
+
+    subsidy_btc = block_subsidy(height) / COIN
+    btc_per_ph_day = (subsidy_btc + fee_btc_per_block) * 86400 * 1e15 / (difficulty * 2 ** 32)
+
+    return {
+        "hashprice": btc_per_ph_day * price,
+        "btc_per_ph_day": btc_per_ph_day,
+        "difficulty": float(difficulty),
+        "height": int(height),
+        "subsidy_btc": subsidy_btc,
+        "fee_btc_per_block": float(fee_btc_per_block),
+        "implied_hashrate_ph": implied_hashrate_ph(difficulty),
+        "spot": float(price),
+    }
@@ -1,25 +1,166 @@
+import io
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed, wait
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 import pytz
+from hashprice_breaker import CircuitOpenError, breaker
+from hashprice_metrics import CSV_BYTES, CSV_ROWS, PRICE_REQUESTS, PRICE_SECONDS, STAGE_SECONDS
+from hashprice_difficulty import BLOCKS_PER_DAY, hashprice as difficulty_hashprice
+from hashprice_providers import fetch_network
+from hashprice_sources import (
+    COINMETRICS_CSV,
+    COLUMNS,
+    HEADER_CACHE,
+    HEADER_PROBE_BYTES,
+    LAST_GOOD_DATA,
+    LAST_GOOD_PRICE,
+    PRICE_SOURCES,
+    PRICE_TIMEOUT,
+    TAIL_BYTES,
+    TAIL_MIN_ROWS,
+    content_range_start as _content_range_start,
+    load_header as _load_header,
+    load_price_file as _load_price_file,
+    parse_price as _parse_price,
+    save_header as _save_header,
+    save_price_file as _save_price_file,
+    write_atomic as _write_atomic,
+)
 
 PACIFIC = pytz.timezone("US/Pacific")
 
-COINMETRICS_CSV = "https://raw.githubusercontent.com/coinmetrics/data/master/csv/btc.csv"
+# Explicit dtypes skip pandas' type inference. float64 (not float32) so the
+# derived hashprice columns stay bit-identical to the full-frame parse.
+DTYPES = {col: "float64" for col in COLUMNS[1:]}
 
-def fetch_data():
+# Rows per parser chunk; with usecols the tokenizer discards the other
+# Coin Metrics columns, so only this many pruned rows are live at once.
+PARSE_CHUNK_ROWS = 4096
+
+# Tail fetch (fetch_data(mode="tail")), see fetch_tail() and the sizes in
+# hashprice_sources.
+FETCH_MODE = os.getenv("HASHPRICE_FETCH_MODE", "full")
+
+# "first": the first valid quote wins. "median": wait for every provider
+# (bounded by PRICE_TIMEOUT) and take the median of the valid quotes.
+PRICE_MODE = os.getenv("HASHPRICE_PRICE_MODE", "first")
+
+# In "first" mode the historically fastest provider gets this long on its own
+# before the others are queried too, so the common case costs one request.
+PRICE_HEDGE_SECONDS = float(os.getenv("HASHPRICE_PRICE_HEDGE", "0.25"))
+
+# Keep-alive connections to the price APIs, shared across calls and threads.
+PRICE_SESSION = requests.Session()
+PRICE_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_PRICE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="price")
+
+_PRICE_STATS_LOCK = threading.Lock()
+PRICE_STATS = {}
+
+# Upstream failures trip per-provider breakers (hashprice_breaker); while one
+# is open that provider is skipped without waiting on its timeout.
+COINMETRICS_BREAKER = breaker("coinmetrics")
+
+class _CountingReader:
     """
-    Pull daily network + economics from Coin Metrics public CSV.
-    We use:
-      - PriceUSD (daily close-ish)
-      - HashRate (network hashrate, Coin Metrics)
-      - IssTotNtv (BTC issuance)
-      - FeeTotNtv (BTC fees)
+    File-like wrapper that records bytes read and the time spent blocked in
+    read(), i.e. waiting on the download rather than parsing.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self.stream.read(size)
+        self.seconds += time.perf_counter() - start
+        self.bytes += len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def _open_stream(source):
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        r = requests.get(source, timeout=30, stream=True)
+        r.raise_for_status()
+        r.raw.decode_content = True
+        return _CountingReader(r.raw), r.close
+    if isinstance(source, (str, os.PathLike)):
+        f = open(source, "rb")
+        return _CountingReader(f), f.close
+    return _CountingReader(source), None
+
+def load_raw(source=None):
+    """
+    Read the Coin Metrics CSV (URL, path or open file) and prune it to
+    COLUMNS, dropping incomplete rows.
+
+    The body is streamed and parsed chunk by chunk with only COLUMNS
+    materialized, so peak memory no longer scales with the hundreds of
+    columns Coin Metrics publishes.
+    """
+    start = time.perf_counter()
+    stream, close = _open_stream(source or COINMETRICS_CSV)
+    rows = 0
+    try:
+        chunks = []
+        reader = pd.read_csv(
+            stream,
+            usecols=COLUMNS,
+            dtype=DTYPES,
+            chunksize=PARSE_CHUNK_ROWS,
+        )
+        for chunk in reader:
+            rows += len(chunk)
+            chunk["time"] = pd.to_datetime(chunk["time"], format="%Y-%m-%d", errors="coerce")
+            chunks.append(chunk.dropna())
+    finally:
+        if close:
+            close()
+
+    STAGE_SECONDS.observe(stream.seconds, stage="download")
+    STAGE_SECONDS.observe(time.perf_counter() - start - stream.seconds, stage="parse")
+    CSV_BYTES.observe(stream.bytes)
+    CSV_ROWS.observe(rows)
+
+    df = pd.concat(chunks)[COLUMNS]
+    return df.sort_values("time")
+
+def profile_parse(source=None):
+    """
+    Parse `source` with load_raw() and report rows, wall time and peak
+    traced memory, e.g. to confirm the effect of parser changes.
+    """
+    import tracemalloc
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        df = load_raw(source)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"rows": len(df), "seconds": seconds, "peak_mb": peak / 1e6}
+
+def add_derived(df):
+    """
+    Add the revenue / hashprice columns to a pruned frame from load_raw().
     """
-    df = pd.read_csv(COINMETRICS_CSV)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-    df = df[["time", "PriceUSD", "HashRate", "IssTotNtv", "FeeTotNtv"]].dropna()
-    df = df.sort_values("time")
+    df = df.copy()
 
     # IMPORTANT:
     # The dashboard historically used: HashRate_PH = HashRate / 1000
@@ -37,36 +178,277 @@ def fetch_data():
 
     return df.dropna()
 
-def fetch_live_price():
-    sources = [
-        ("CoinGecko", "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"),
-        ("Coinbase", "https://api.coinbase.com/v2/prices/spot?currency=USD"),
-    ]
+def _range_get(url, start=None, end=None, suffix=None):
+    # Byte offsets only make sense on the identity encoding.
+    spec = f"-{suffix}" if suffix is not None else f"{start}-{end}"
+    return requests.get(
+        url,
+        headers={"Range": f"bytes={spec}", "Accept-Encoding": "identity"},
+        timeout=30,
+        stream=True,
+    )
 
-    for _, url in sources:
+def _fetch_header(url):
+    """
+    Return the CSV header line via Range requests, or None when the server
+    does not honour Range.
+    """
+    size = HEADER_PROBE_BYTES
+    while True:
+        r = _range_get(url, 0, size - 1)
         try:
-            r = requests.get(url, timeout=8)
-            if r.status_code != 200:
-                continue
-            data = r.json()
-            if "bitcoin" in data and "usd" in data["bitcoin"]:
-                return float(data["bitcoin"]["usd"])
-            if "data" in data and "amount" in data["data"]:
-                return float(data["data"]["amount"])
-        except Exception:
+            if r.status_code != 206:
+                return None
+            body = r.content
+        finally:
+            r.close()
+
+        if b"\n" in body:
+            return body.split(b"\n", 1)[0] + b"\n"
+        if len(body) < size:
+            return body + b"\n"
+        size *= 4
+
+def fetch_tail(url=None, tail_bytes=TAIL_BYTES, min_rows=TAIL_MIN_ROWS, header_cache=None):
+    """
+    Fetch only the end of the Coin Metrics CSV with an HTTP Range request.
+
+    The header line is fetched once (also via Range) and cached on disk; each
+    refresh then pulls the last `tail_bytes`, discards the partial first row,
+    and parses header + tail. The window grows until at least `min_rows`
+    derived rows survive the 7-day warm-up. Falls back to the full download
+    when the server ignores Range. `header_cache` defaults to HEADER_CACHE.
+    """
+    url = url or COINMETRICS_CSV
+    header_cache = header_cache or HEADER_CACHE
+
+    header = _load_header(header_cache)
+    if header is None:
+        header = _fetch_header(url)
+        if header is None:
+            return add_derived(load_raw(url))
+        _save_header(header_cache, header)
+
+    header_refreshed = False
+    while True:
+        r = _range_get(url, suffix=tail_bytes)
+        try:
+            if r.status_code != 206:
+                # Range ignored: this is already the full file, header included.
+                r.raise_for_status()
+                r.raw.decode_content = True
+                return add_derived(load_raw(r.raw))
+            body = r.content
+            start = _content_range_start(r.headers.get("Content-Range"))
+        finally:
+            r.close()
+
+        # Align to a row boundary: the first line is either the header (the
+        # whole file fit) or a row cut mid-way.
+        body = body.split(b"\n", 1)[1] if b"\n" in body else b""
+
+        # A cached header from before Coin Metrics added a column would
+        # silently shift every field; re-fetch it once if the widths differ.
+        first_row = body.split(b"\n", 1)[0]
+        if first_row and first_row.count(b",") != header.count(b","):
+            if header_refreshed:
+                raise RuntimeError("Coin Metrics header does not match the CSV rows")
+            header = _fetch_header(url)
+            if header is None:
+                return add_derived(load_raw(url))
+            _save_header(header_cache, header)
+            header_refreshed = True
             continue
 
+        df = add_derived(load_raw(io.BytesIO(header + body)))
+        if len(df) >= min_rows or start == 0:
+            return df
+        tail_bytes *= 4
+
+def fetch_data(mode=None):
+    """
+    Pull daily network + economics from Coin Metrics public CSV.
+    We use:
+      - PriceUSD (daily close-ish)
+      - HashRate (network hashrate, Coin Metrics)
+      - IssTotNtv (BTC issuance)
+      - FeeTotNtv (BTC fees)
+
+    mode="full" (default) downloads the whole file; mode="tail" only pulls
+    the last few days with fetch_tail(). See hashprice_store for the
+    incremental, conditional-GET variant used by the webapp.
+    """
+    with STAGE_SECONDS.time(stage="fetch_data"), COINMETRICS_BREAKER:
+        if (mode or FETCH_MODE) == "tail":
+            return fetch_tail()
+        return add_derived(load_raw())
+
+def _record_price_stat(name, seconds=None, error=None):
+    with _PRICE_STATS_LOCK:
+        stats = PRICE_STATS.setdefault(
+            name, {"ok": 0, "fail": 0, "latency_ms": None, "last_error": None}
+        )
+        PRICE_REQUESTS.inc(provider=name, result="fail" if error is not None else "ok")
+        if error is not None:
+            stats["fail"] += 1
+            stats["last_error"] = f"{type(error).__name__}: {error}"
+            return
+        stats["ok"] += 1
+        PRICE_SECONDS.observe(seconds, provider=name)
+        ms = seconds * 1000.0
+        # Exponentially weighted, so a provider that gets slower loses its rank.
+        stats["latency_ms"] = ms if stats["latency_ms"] is None else 0.8 * stats["latency_ms"] + 0.2 * ms
+
+def _fetch_price_from(name, url):
+    with breaker(name):
+        start = time.perf_counter()
+        try:
+            r = PRICE_SESSION.get(url, timeout=PRICE_TIMEOUT)
+            r.raise_for_status()
+            price = _parse_price(r.json())
+        except Exception as e:
+            _record_price_stat(name, error=e)
+            raise
+        _record_price_stat(name, seconds=time.perf_counter() - start)
+    return price
+
+def price_sources_by_latency():
+    """
+    PRICE_SOURCES ordered fastest first by observed latency; providers with
+    no successful sample yet follow in their configured order.
+    """
+    def key(item):
+        index, (name, _) = item
+        latency = PRICE_STATS.get(name, {}).get("latency_ms")
+        return (latency is None, latency or 0.0, index)
+
+    return [source for _, source in sorted(enumerate(PRICE_SOURCES), key=key)]
+
+def price_provider_stats():
+    with _PRICE_STATS_LOCK:
+        return {name: dict(stats) for name, stats in PRICE_STATS.items()}
+
+def fetch_live_price(mode=None):
+    """
+    Query the price providers concurrently over pooled connections.
+
+    mode="first" returns the first valid quote and cancels whatever has not
+    started yet (already-running requests finish in the background, bounded
+    by PRICE_TIMEOUT). mode="median" returns the median of all valid quotes.
+    Providers whose circuit breaker is open are not queried.
+    """
+    with STAGE_SECONDS.time(stage="fetch_live_price"):
+        price = _fetch_live_price(mode or PRICE_MODE)
+    save_last_good_price(price)
+    return price
+
+def _fetch_live_price(mode):
+    sources = [source for source in price_sources_by_latency() if breaker(source[0]).available()]
+    if not sources:
+        raise CircuitOpenError("every price provider circuit is open")
+    deadline = time.monotonic() + PRICE_TIMEOUT
+
+    futures = []
+    if mode == "first" and PRICE_HEDGE_SECONDS > 0 and PRICE_STATS.get(sources[0][0], {}).get("latency_ms"):
+        first = _PRICE_POOL.submit(_fetch_price_from, *sources[0])
+        futures.append(first)
+        done, _ = wait([first], timeout=PRICE_HEDGE_SECONDS)
+        if done and not first.exception():
+            return first.result()
+        sources = sources[1:]
+    futures += [_PRICE_POOL.submit(_fetch_price_from, name, url) for name, url in sources]
+
+    prices = []
+    try:
+        for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+            if future.exception() is not None:
+                continue
+            if mode != "median":
+                return future.result()
+            prices.append(future.result())
+    except FutureTimeout:
+        pass
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if prices:
+        return float(statistics.median(prices))
+
     raise RuntimeError("Live price sources unavailable")
 
-def calculate():
-    df = fetch_data()
-    last = df.iloc[-1]
+def save_last_good_price(price):
+    _save_price_file(LAST_GOOD_PRICE, price)
+
+def last_good_price():
+    """
+    (price, fetched epoch) of the last successful fetch_live_price(), or None.
+    """
+    return _load_price_file(LAST_GOOD_PRICE)
+
+_LAST_GOOD_SAVED = {"key": None}
+
+def save_last_good_frame(df):
+    # Coin Metrics changes once a day; skip the rewrite when the frame is the
+    # one already saved by this process.
+    key = (LAST_GOOD_DATA, len(df), df["time"].iloc[-1]) if len(df) else None
+    if key is None or key == _LAST_GOOD_SAVED["key"]:
+        return
+    try:
+        body = df[COLUMNS].to_csv(index=False, date_format="%Y-%m-%d").encode()
+        _write_atomic(LAST_GOOD_DATA, body)
+        _LAST_GOOD_SAVED["key"] = key
+    except OSError:
+        pass
+
+def last_good_frame():
+    """
+    (derived frame, saved epoch) from the last save_last_good_frame(), or None.
+    """
+    try:
+        fetched = os.path.getmtime(LAST_GOOD_DATA)
+        return add_derived(load_raw(LAST_GOOD_DATA)), fetched
+    except (OSError, ValueError):
+        return None
+
+def build_result(df, live_price, metrics=None, stale=None, network=None):
+    """
+    Combine an already-fetched Coin Metrics frame with a live spot price.
+    Split out of calculate() so callers holding a cached frame (see
+    hashprice_snapshot) can re-price without re-downloading the CSV.
+
+    `metrics` is an optional hashprice_rolling.RollingMetrics over `df`; its
+    latest 7/30/90/365-day values are returned under "rolling". `stale` maps
+    "data" / "price" to the fetch time of a last-known-good value that is
+    being served because upstream failed; it is returned under "stale".
+
+    `network` is a hashprice_providers.fetch_network() result. Its live
+    hashrate and projected fees replace yesterday's Coin Metrics values in
+    the realtime hashprice; issuance still comes from Coin Metrics.
+
+    `df` may also be a hashprice_series.HashpriceSeries: only its last 14
+    rows are materialized.
+    """
     trend = df.tail(14).copy()
+    last = trend.iloc[-1]
+
+    network = network or {}
+    hashrate_ph = last["HashRate_PH"]
+    hashrate_source = "coinmetrics"
+    if "hashrate_ph" in network:
+        hashrate_ph = network["hashrate_ph"]["value"]
+        hashrate_source = network["hashrate_ph"]["provider"]
 
-    live_price = fetch_live_price()
+    btc_revenue = last["btc_revenue"]
+    fee_btc_day = last["FeeTotNtv"]
+    fee_source = "coinmetrics"
+    if "fee_btc_per_block" in network:
+        fee_btc_day = network["fee_btc_per_block"]["value"] * BLOCKS_PER_DAY
+        fee_source = network["fee_btc_per_block"]["provider"]
+        btc_revenue = last["IssTotNtv"] + fee_btc_day
 
     # Realtime hashprice = today's BTC revenue per PH * live BTC spot price.
-    realtime = (last["btc_revenue"] * live_price) / last["HashRate_PH"]
+    realtime = (btc_revenue * live_price) / hashrate_ph
 
     pct_vs_7d = ((realtime / last["hashprice_7d"]) - 1.0) * 100.0
 
@@ -90,4 +472,113 @@ def calculate():
         "fee_btc": float(last["FeeTotNtv"]),
         "fee_pct": float(fee_pct),
         "source_coinmetrics": COINMETRICS_CSV,
+        # Longer smoothing windows (NaN, i.e. None, until the window is full).
+        "rolling": {
+            k: (None if v != v else float(v)) for k, v in (metrics.latest() if metrics else {}).items()
+        },
+        "stale": {k: float(v) for k, v in (stale or {}).items()},
+        # What the realtime hashprice was computed from.
+        "realtime_inputs": {
+            "hashrate_ph": float(hashrate_ph),
+            "hashrate_source": hashrate_source,
+            "fee_btc_day": float(fee_btc_day),
+            "fee_source": fee_source,
+        },
+        "network_difficulty": network["difficulty"]["value"] if "difficulty" in network else None,
+        "network_height": int(network["height"]["value"]) if "height" in network else None,
+        # Cross-check: the same quantity from difficulty + subsidy schedule.
+        "hashprice_difficulty": _difficulty_hashprice(network, live_price, fee_btc_day / BLOCKS_PER_DAY),
     }
+
+def _difficulty_hashprice(network, live_price, fee_btc_per_block):
+    if "difficulty" not in network or "height" not in network:
+        return None
+    return difficulty_hashprice(
+        network["difficulty"]["value"], network["height"]["value"], live_price, fee_btc_per_block,
+    )["hashprice"]
+
+def calculate_difficulty(df=None, mode=None):
+    """
+    Realtime hashprice from difficulty, the halving schedule and the live fee
+    estimate (hashprice_difficulty) instead of the Coin Metrics CSV: one
+    price and three small provider requests, fetched concurrently.
+
+    With `df` (a fetch_data() frame), or mode="tail" / "full" to fetch one,
+    result["cross_check"] compares it with the Coin Metrics-derived value.
+    """
+    with STAGE_SECONDS.time(stage="calculate_difficulty"), ThreadPoolExecutor(max_workers=3) as pool:
+        price_job = pool.submit(fetch_live_price)
+        network_job = pool.submit(fetch_network, ("difficulty", "height", "fee_btc_per_block"))
+        data_job = pool.submit(fetch_data, mode) if df is None and mode else None
+
+        live_price = price_job.result()
+        network = network_job.result()
+        missing = [m for m in ("difficulty", "height") if m not in network]
+        if missing:
+            raise RuntimeError(f"no provider available for {', '.join(missing)}")
+
+        fee = network.get("fee_btc_per_block")
+        result = difficulty_hashprice(
+            network["difficulty"]["value"],
+            network["height"]["value"],
+            live_price,
+            fee["value"] if fee else 0.0,
+        )
+        result["timestamp"] = datetime.now(PACIFIC).strftime("%Y-%m-%d %H:%M:%S %Z")
+        result["sources"] = {metric: entry["provider"] for metric, entry in network.items()}
+
+        if data_job:
+            df = data_job.result()
+        if df is not None:
+            # The Coin Metrics value as calculate() reports it, from
+            # yesterday's hashrate and fees.
+            reference = build_result(df, live_price)["hashprice_rt"]
+            result["cross_check"] = {
+                "coinmetrics_rt": reference,
+                "diff_pct": (result["hashprice"] / reference - 1.0) * 100.0,
+                "coinmetrics_hashrate_ph": float(df["HashRate_PH"].iloc[-1]),
+            }
+
+    return result
+
+def calculate(mode=None, df=None):
+    """
+    Fetch, price and summarize. If Coin Metrics or every price provider is
+    unavailable, the last-known-good dataset / price is used instead and
+    result["stale"] says since when; raises only when there is none.
+
+    With `df` (a fetch_data() frame, or a hashprice_series.load_series()
+    series) Coin Metrics is not fetched; only the price and network are.
+    """
+    with STAGE_SECONDS.time(stage="calculate"), ThreadPoolExecutor(max_workers=3) as pool:
+        # The upstreams are independent; fetched together, the slowest one
+        # sets the latency instead of their sum.
+        data_job = pool.submit(fetch_data, mode) if df is None else None
+        price_job = pool.submit(fetch_live_price)
+        network_job = pool.submit(fetch_network)
+
+        stale = {}
+        if data_job:
+            try:
+                df = data_job.result()
+                save_last_good_frame(df)
+            except Exception:
+                saved = last_good_frame()
+                if saved is None:
+                    raise
+                df, stale["data"] = saved
+
+        try:
+            live_price = price_job.result()
+        except Exception:
+            saved = last_good_price()
+            if saved is None:
+                raise
+            live_price, stale["price"] = saved
+
+        try:
+            network = network_job.result()
+        except Exception:
+            network = {}
+
+        return build_result(df, live_price, stale=stale, network=network)
@@ -0,0 +1,426 @@
+"""
+Pandas-free fast path for the CLI dashboard.
+
+Streams the Coin Metrics CSV through the csv module into arrays, derives
+hashprice_1d / hashprice_7d with hashprice_rolling.RollingMean (which
+reproduces pandas' rolling mean bit for bit) and fetches the price and
+realtime network metrics with urllib. Only the standard library and the
+stdlib-only hashprice modules are imported, so a cron run spends its time
+on the network rather than on importing pandas and requests.
+
+calculate() returns the numbers hashprice_engine.calculate() does for the
+CLI's output, with "trend" as a list of (YYYY-MM-DD, hashprice_1d). They
+agree to the two decimals the CLI prints, not bit for bit: float() rounds
+every CSV field correctly, while pandas' default parser can be an ulp off,
+so derived values may differ by a few ulps (tests/test_fast.py).
+
+The cold start the CLI reports is interpreter startup plus these imports.
+The imports take ~25 ms; most of the rest is site-packages initialisation
+(.pth files of whatever else is installed), which no import order here can
+shorten: ~90 ms in total on the bench host. Nothing on this path needs
+site-packages, so cron entries can run `python -S hashprice_cli.py --fast`
+(~60 ms there; the timestamp then needs the system tz database).
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+from hashprice_difficulty import BLOCKS_PER_DAY
+from hashprice_rolling import RollingMean, divide
+from hashprice_sources import (
+    COINMETRICS_CSV,
+    COLUMNS,
+    HEADER_CACHE,
+    HEADER_PROBE_BYTES,
+    LAST_GOOD_DATA,
+    LAST_GOOD_PRICE,
+    PRICE_SOURCES,
+    PRICE_TIMEOUT,
+    TAIL_BYTES,
+    TAIL_MIN_ROWS,
+    content_range_start,
+    load_header,
+    load_price_file,
+    parse_price,
+    save_header,
+    save_price_file,
+)
+
+TREND_DAYS = 14
+TIMEOUT = 30
+
+
+def _get(url, headers=None, timeout=TIMEOUT):
+    from urllib.request import Request, urlopen
+
+    return urlopen(Request(url, headers=dict(headers or {}, **{"User-Agent": "hashprice-cli"})), timeout=timeout)
+
+
+def _is_day(value):
+    # The shape pandas' format="%Y-%m-%d" accepts, without strptime's cost.
+    return len(value) == 10 and value[4] == "-" and value[7] == "-" and value[:4].isdigit() \
+        and value[5:7].isdigit() and value[8:].isdigit()
+
+
+def _records(lines, width):
+    # Coin Metrics never quotes its numeric fields, so most lines are split
+    # directly (about twice as fast as csv.reader, and the columns after
+    # `width` are never split at all); anything quoted goes through csv.
+    for line in lines:
+        if '"' in line:
+            yield from csv.reader([line])
+        else:
+            yield line.rstrip("\r\n").split(",", width + 1)
+
+
+def read_columns(lines):
+    """
+    Parse Coin Metrics CSV text lines into (days, {column: array('d')}),
+    keeping only COLUMNS and complete rows, sorted by day; the same rows
+    hashprice_engine.load_raw() keeps.
+    """
+    lines = iter(lines)
+    header = next(csv.reader([next(lines)]))
+    index = [header.index(name) for name in COLUMNS]
+    width = max(index)
+
+    days = []
+    values = [array("d") for _ in COLUMNS[1:]]
+    for record in _records(lines, width):
+        if len(record) <= width:
+            continue
+        day = record[index[0]]
+        try:
+            row = [float(record[i]) for i in index[1:]]
+        except ValueError:
+            continue
+        if not _is_day(day) or any(v != v for v in row):
+            continue
+        days.append(day)
+        for column, v in zip(values, row):
+            column.append(v)
+
+    if any(days[i] > days[i + 1] for i in range(len(days) - 1)):
+        order = sorted(range(len(days)), key=days.__getitem__)
+        days = [days[i] for i in order]
+        values = [array("d", (column[i] for i in order)) for column in values]
+
+    return days, dict(zip(COLUMNS[1:], values))
+
+
+def derive(days, columns, keep=TREND_DAYS):
+    """
+    hashprice_engine.add_derived() over the parsed columns, returning only
+    the last `keep` complete rows as dicts.
+    """
+    revenue_mean, hashrate_mean = RollingMean(7), RollingMean(7)
+    rows = deque(maxlen=keep)
+
+    for day, price, hashrate, issuance, fees in zip(
+        days, columns["PriceUSD"], columns["HashRate"], columns["IssTotNtv"], columns["FeeTotNtv"]
+    ):
+        hashrate_ph = hashrate / 1000.0
+        btc_revenue = issuance + fees
+        usd_revenue = btc_revenue * price
+        hashprice_1d = divide(usd_revenue, hashrate_ph)
+        hashprice_7d = divide(revenue_mean.push(usd_revenue), hashrate_mean.push(hashrate_ph))
+        if hashprice_1d != hashprice_1d or hashprice_7d != hashprice_7d:
+            continue
+        rows.append({
+            "time": day,
+            "HashRate": hashrate,
+            "HashRate_PH": hashrate_ph,
+            "IssTotNtv": issuance,
+            "FeeTotNtv": fees,
+            "btc_revenue": btc_revenue,
+            "hashprice_1d": hashprice_1d,
+            "hashprice_7d": hashprice_7d,
+        })
+
+    return list(rows)
+
+
+def fetch_rows(url=None):
+    """
+    Stream the whole CSV and return derive()'s trend rows.
+    """
+    with _get(url or COINMETRICS_CSV) as response:
+        lines = io.TextIOWrapper(response, encoding="utf-8", newline="")
+        return derive(*read_columns(lines))
+
+
+def _range(url, spec):
+    from urllib.error import HTTPError
+
+    try:
+        response = _get(url, {"Range": f"bytes={spec}", "Accept-Encoding": "identity"})
+    except HTTPError as e:
+        if e.code == 416:
+            return None, b"", None
+        raise
+    with response:
+        return response.status, response.read(), response.headers.get("Content-Range")
+
+
+def _fetch_header(url):
+    size = HEADER_PROBE_BYTES
+    while True:
+        status, body, _ = _range(url, f"0-{size - 1}")
+        if status != 206:
+            return None
+        if b"\n" in body:
+            return body.split(b"\n", 1)[0] + b"\n"
+        if len(body) < size:
+            return body + b"\n"
+        size *= 4
+
+
+def fetch_tail_rows(url=None, tail_bytes=TAIL_BYTES, min_rows=TAIL_MIN_ROWS, header_cache=None):
+    """
+    hashprice_engine.fetch_tail() without pandas: Range-fetch the end of the
+    CSV, prepend the cached header, and grow the window until `min_rows`
+    derived rows survive. Falls back to fetch_rows() without Range support.
+    """
+    url = url or COINMETRICS_CSV
+    header_cache = header_cache or HEADER_CACHE
+
+    header = load_header(header_cache)
+    if header is None:
+        header = _fetch_header(url)
+        if header is None:
+            return fetch_rows(url)
+        save_header(header_cache, header)
+
+    header_refreshed = False
+    while True:
+        status, body, content_range = _range(url, f"-{tail_bytes}")
+        if status != 206:
+            return fetch_rows(url)
+        start = content_range_start(content_range)
+
+        body = body.split(b"\n", 1)[1] if b"\n" in body else b""
+
+        first_row = body.split(b"\n", 1)[0]
+        if first_row and first_row.count(b",") != header.count(b","):
+            if header_refreshed:
+                raise RuntimeError("Coin Metrics header does not match the CSV rows")
+            header = _fetch_header(url)
+            if header is None:
+                return fetch_rows(url)
+            save_header(header_cache, header)
+            header_refreshed = True
+            continue
+
+        text = (header + body).decode("utf-8")
+        rows = derive(*read_columns(io.StringIO(text, newline="")))
+        if len(rows) >= min_rows or start == 0:
+            return rows
+        tail_bytes *= 4
+
+
+def _get_json(url, timeout):
+    with _get(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def _fetch_price_from(name, url, timeout):
+    from hashprice_breaker import breaker
+
+    with breaker(name):
+        return parse_price(_get_json(url, timeout))
+
+
+def fetch_price(pool, sources=None, timeout=PRICE_TIMEOUT):
+    """
+    First valid quote from the price providers, queried concurrently.
+    Providers whose circuit breaker is open are not queried.
+    """
+    from concurrent.futures import TimeoutError as FutureTimeout, as_completed
+    from hashprice_breaker import CircuitOpenError, breaker
+
+    sources = [source for source in (sources or PRICE_SOURCES) if breaker(source[0]).available()]
+    if not sources:
+        raise CircuitOpenError("every price provider circuit is open")
+
+    futures = [pool.submit(_fetch_price_from, name, url, timeout) for name, url in sources]
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            if future.exception() is None:
+                return future.result()
+    except FutureTimeout:
+        pass
+    raise RuntimeError("Live price sources unavailable")
+
+
+def fetch_data(mode=None):
+    """
+    fetch_tail_rows() or fetch_rows() through the "coinmetrics" circuit
+    breaker hashprice_engine uses. Raises when no row survives.
+    """
+    from hashprice_breaker import breaker
+
+    with breaker("coinmetrics"):
+        rows = fetch_tail_rows() if mode == "tail" else fetch_rows()
+        if not rows:
+            raise RuntimeError("Coin Metrics returned no complete rows")
+    return rows
+
+
+def last_good_rows():
+    """
+    (derive() rows, saved epoch) of hashprice_engine's last-known-good Coin
+    Metrics file, or None.
+    """
+    try:
+        fetched = os.path.getmtime(LAST_GOOD_DATA)
+        with open(LAST_GOOD_DATA, newline="") as f:
+            rows = derive(*read_columns(f))
+    except (OSError, ValueError, StopIteration):
+        return None
+    return (rows, fetched) if rows else None
+
+
+def fetch_network(pool, metrics=("hashrate_ph", "fee_btc_per_block")):
+    """
+    hashprice_providers.fetch_network() over urllib: every registered
+    provider for `metrics` at once, the first in registration order that
+    answers wins. {metric: {"value", "provider"}}. Providers sharing a URL
+    share one request.
+    """
+    from concurrent.futures import wait
+    from hashprice_providers import PROVIDERS
+
+    providers = [p for p in PROVIDERS if p.metric in metrics]
+    requests = {}
+    for p in providers:
+        if p.url not in requests:
+            requests[p.url] = pool.submit(_get_json, p.url, p.timeout)
+    futures = [(p, requests[p.url]) for p in providers]
+    if futures:
+        wait(requests.values(), timeout=max(p.timeout for p in providers))
+
+    result = {}
+    for p, future in futures:
+        if p.metric in result or not future.done() or future.exception() is not None:
+            continue
+        try:
+            value = p.parse(future.result())
+        except Exception:
+            continue
+        if value is not None:
+            result[p.metric] = {"value": float(value), "provider": p.name}
+    return result
+
+
+def _timestamp():
+    try:
+        from zoneinfo import ZoneInfo
+
+        tz = ZoneInfo("US/Pacific")
+    except Exception:
+        import pytz
+
+        tz = pytz.timezone("US/Pacific")
+    return datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S %Z")
+
+
+def process_age():
+    """
+    Wall-clock seconds since this process started, or None where /proc is
+    not available. The kernel records the start in clock ticks (usually
+    10 ms) rounded down, so this can read up to one tick high.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def calculate(mode=None, network=True):
+    """
+    The CLI subset of hashprice_engine.calculate(). CSV, price and network
+    are fetched concurrently; result["timings"] has the cold start, i.e.
+    the wall time from process start (interpreter + imports) to the first
+    request, and the wall time spent fetching and computing, in ms.
+    Without /proc the cold start falls back to the process CPU time and
+    "startup_clock" says "cpu" instead of "wall".
+
+    Like the engine, Coin Metrics and the price providers go through their
+    circuit breakers, and if either fails the last-known-good data / price
+    is used instead, with result["stale"] saying since when; raises only
+    when there is none. The fast path saves the price but never the data:
+    a tail fetch would overwrite the engine's full last-good frame.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    age = process_age()
+    startup_clock = "cpu" if age is None else "wall"
+    startup_ms = (time.process_time() if age is None else age) * 1000.0
+    start = time.perf_counter()
+
+    from hashprice_providers import PROVIDERS
+
+    # fetch_price / fetch_network submit their requests to the same pool
+    # from inside it, so size it for every request at once.
+    pool = ThreadPoolExecutor(max_workers=2 + len(PRICE_SOURCES) + len(PROVIDERS))
+    try:
+        price_job = pool.submit(fetch_price, pool)
+        network_job = pool.submit(fetch_network, pool) if network else None
+
+        stale = {}
+        try:
+            rows = fetch_data(mode)
+        except Exception:
+            saved = last_good_rows()
+            if saved is None:
+                raise
+            rows, stale["data"] = saved
+
+        try:
+            live_price = price_job.result()
+            save_price_file(LAST_GOOD_PRICE, live_price)
+        except Exception:
+            saved = load_price_file(LAST_GOOD_PRICE)
+            if saved is None:
+                raise
+            live_price, stale["price"] = saved
+
+        network = network_job.result() if network_job else {}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    last = rows[-1]
+
+    hashrate_ph = last["HashRate_PH"]
+    if "hashrate_ph" in network:
+        hashrate_ph = network["hashrate_ph"]["value"]
+    btc_revenue = last["btc_revenue"]
+    if "fee_btc_per_block" in network:
+        btc_revenue = last["IssTotNtv"] + network["fee_btc_per_block"]["value"] * BLOCKS_PER_DAY
+
+    realtime = (btc_revenue * live_price) / hashrate_ph
+
+    return {
+        "timestamp": _timestamp(),
+        "spot": live_price,
+        "hashprice_rt": realtime,
+        "hashprice_1d": last["hashprice_1d"],
+        "hashprice_7d": last["hashprice_7d"],
+        "pct_vs_7d": ((realtime / last["hashprice_7d"]) - 1.0) * 100.0,
+        "trend": [(row["time"], row["hashprice_1d"]) for row in rows],
+        "stale": stale,
+        "timings": {
+            "startup_ms": startup_ms,
+            "startup_clock": startup_clock,
+            "fetch_ms": (time.perf_counter() - start) * 1000.0,
+        },
+    }
@@ -0,0 +1,160 @@
+import io
+import math
+
+import numpy as np
+
+# Guard against accidental multi-gigabyte requests.
+MAX_CELLS = 2_000_000
+
+AXES = ("efficiency", "power_price", "uptime", "pool_fee")
+
+# Axes each result array is indexed by, in order.
+DIMS = {
+    "revenue": ("uptime", "pool_fee"),
+    "power_cost": ("efficiency", "power_price", "uptime"),
+    "profit": AXES,
+    "breakeven_power_price": ("efficiency", "uptime", "pool_fee"),
+}
+
+# Results are rounded to this many decimals (micro-dollars) before JSON/CSV
+# encoding, which keeps large grids cheap to serialize.
+DECIMALS = 6
+
+DEFAULTS = {
+    "efficiency": "18",
+    "power_price": "0.05",
+    "uptime": "1",
+    "pool_fee": "0",
+}
+
+
+def parse_axis(value, name=None):
+    """
+    Parse "15,18,21" (explicit values) or "15:30:0.5" (start:stop:step, stop
+    inclusive) into a float64 array of at most MAX_CELLS finite values.
+    Anything else raises ValueError, before any array is allocated.
+    """
+    value = str(value).strip()
+    label = name or "axis"
+    try:
+        if ":" in value:
+            start, stop, step = (float(v) for v in value.split(":"))
+            values = None
+        else:
+            values = [float(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError(f"{label}: expected a list (a,b,c) or range (start:stop:step)")
+
+    if values is None:
+        if not all(math.isfinite(v) for v in (start, stop, step)):
+            raise ValueError(f"{label}: values must be finite")
+        if step <= 0 or stop < start:
+            raise ValueError(f"{label}: expected start <= stop and a positive step")
+        # Counted as a plain float first: (stop - start) / step can be far
+        # beyond what np.arange could allocate, or overflow to inf.
+        span = (stop - start) / step
+        if not span < MAX_CELLS:
+            raise ValueError(f"{label}: range has more than {MAX_CELLS:,} values")
+        count = math.floor(span + 1e-9) + 1
+        return start + step * np.arange(count)
+
+    if not values:
+        raise ValueError(f"{label}: no values")
+    if len(values) > MAX_CELLS:
+        raise ValueError(f"{label}: more than {MAX_CELLS:,} values")
+    if not all(math.isfinite(v) for v in values):
+        raise ValueError(f"{label}: values must be finite")
+    return np.array(values, dtype="float64")
+
+
+def profitability_grid(hashprice, efficiency, power_price, uptime, pool_fee, ph=1.0):
+    """
+    Daily economics of `ph` PH/s over every combination of the four axes.
+
+    hashprice is USD / PH / day, efficiency J/TH, power_price $/kWh, uptime
+    and pool_fee fractions. profit is indexed [efficiency, power_price,
+    uptime, pool_fee]; the other results only carry the axes they depend on
+    (see DIMS), e.g. breakeven_power_price, the $/kWh at which profit is
+    zero, is indexed [efficiency, uptime, pool_fee].
+    """
+    if not (math.isfinite(hashprice) and math.isfinite(ph)):
+        raise ValueError("hashprice and ph must be finite")
+
+    eff = np.asarray(efficiency, dtype="float64")
+    price = np.asarray(power_price, dtype="float64")
+    up = np.asarray(uptime, dtype="float64")
+    fee = np.asarray(pool_fee, dtype="float64")
+
+    if np.any(eff <= 0):
+        raise ValueError("efficiency must be positive")
+    if np.any((up < 0) | (up > 1)) or np.any((fee < 0) | (fee > 1)):
+        raise ValueError("uptime and pool_fee are fractions between 0 and 1")
+
+    cells = eff.size * price.size * up.size * fee.size
+    if cells > MAX_CELLS:
+        raise ValueError(f"grid has {cells:,} cells; the limit is {MAX_CELLS:,}")
+
+    e = eff[:, None, None, None]
+    p = price[None, :, None, None]
+    u = up[None, None, :, None]
+    f = fee[None, None, None, :]
+
+    # 1 PH/s at e J/TH draws e kW (same convention as the page calculator).
+    kwh_per_day = e * ph * 24.0 * u
+    revenue = ph * hashprice * u * (1.0 - f)
+    power_cost = kwh_per_day * p
+    profit = revenue - power_cost
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakeven = (revenue / kwh_per_day)[:, 0, :, :]
+
+    return {
+        "hashprice": float(hashprice),
+        "ph": float(ph),
+        "axes": {"efficiency": eff, "power_price": price, "uptime": up, "pool_fee": fee},
+        "revenue": revenue[0, 0],
+        "power_cost": power_cost[:, :, :, 0],
+        "profit": profit,
+        "breakeven_power_price": np.broadcast_to(breakeven, (eff.size, up.size, fee.size)),
+    }
+
+
+def _finite_list(a):
+    # JSON has no inf/NaN (e.g. breakeven at 0% uptime).
+    a = np.round(np.asarray(a, dtype="float64"), DECIMALS)
+    if np.isfinite(a).all():
+        return a.tolist()
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def grid_to_json(grid):
+    return {
+        "hashprice": grid["hashprice"],
+        "ph": grid["ph"],
+        "axes": {k: v.tolist() for k, v in grid["axes"].items()},
+        "shape": list(grid["profit"].shape),
+        "dims": {k: list(v) for k, v in DIMS.items()},
+        **{k: _finite_list(grid[k]) for k in DIMS},
+    }
+
+
+def grid_to_csv(grid):
+    """
+    One row per cell: the four axis values followed by the results.
+    """
+    axes = grid["axes"]
+    shape = grid["profit"].shape
+    mesh = np.meshgrid(*(axes[name] for name in AXES), indexing="ij")
+
+    columns = [m.ravel() for m in mesh]
+    for name, dims in DIMS.items():
+        # Re-insert the axes this result does not depend on, then broadcast.
+        index = tuple(slice(None) if axis in dims else None for axis in AXES)
+        columns.append(np.broadcast_to(grid[name][index], shape).ravel())
+
+    table = np.round(np.column_stack(columns), DECIMALS)
+
+    out = io.StringIO()
+    out.write(",".join(AXES + tuple(DIMS)) + "\n")
+    np.savetxt(out, table, delimiter=",", fmt="%.10g")
+    return out.getvalue()
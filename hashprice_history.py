@@ -0,0 +1,135 @@
+import numpy as np
+
+from hashprice_rolling import metric_names
+
+# Columns of the fetch_data() frame that may be requested as series, plus
+# every hashprice_rolling window when a RollingMetrics frame is supplied.
+HISTORY_SERIES = ["hashprice_1d", "hashprice_7d", "PriceUSD", "HashRate_PH", "usd_revenue"]
+DEFAULT_SERIES = ["hashprice_1d", "hashprice_7d"]
+
+MAX_POINTS = 5000
+DEFAULT_POINTS = 500
+
+METHODS = ("lttb", "minmax")
+
+
+def history_arrays(df, metrics_frame=None):
+    """
+    Pull the history out of a fetch_data() frame as plain NumPy arrays:
+    "day" (datetime64[D]) plus one float64 array per HISTORY_SERIES column
+    and, given a row-aligned RollingMetrics.frame, per rolling metric.
+    """
+    arrays = {"day": df["time"].to_numpy().astype("datetime64[D]")}
+    for name in HISTORY_SERIES:
+        if name in df:
+            arrays[name] = df[name].to_numpy(dtype="float64")
+
+    if metrics_frame is not None and len(metrics_frame) == len(df):
+        for name in metric_names():
+            if name in metrics_frame and name not in arrays:
+                arrays[name] = metrics_frame[name].to_numpy(dtype="float64")
+
+    return arrays
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that keep
+    the visual shape of (x, y). Always keeps the first and last point.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets between the fixed first and last point; with
+    # threshold < n every bucket holds at least one point.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Bucket i is compared against the mean of bucket i + 1; the bucket after
+    # the last one is the final point itself. Precompute all means at once.
+    sizes = np.diff(np.append(edges, n))
+    avg_x = (np.add.reduceat(x, edges) / sizes)[1:]
+    avg_y = (np.add.reduceat(y, edges) / sizes)[1:]
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+
+        area = np.abs((ax - avg_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[i] - ay))
+
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax(y, threshold):
+    """
+    Min/max-per-bucket: split into threshold // 2 equal buckets and keep
+    the lowest and highest point of each, in time order.
+    """
+    n = len(y)
+    buckets = max(1, threshold // 2)
+    if threshold >= n:
+        return np.arange(n)
+
+    bucket = (np.arange(n) * buckets) // n
+
+    # Sorting by (bucket, value) puts each bucket's min first and max last.
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+
+    selected = np.unique(np.concatenate([order[starts], order[ends]]))
+    return selected
+
+
+def query(arrays, start=None, end=None, max_points=DEFAULT_POINTS, method="lttb", series=None):
+    """
+    Slice `arrays` (from history_arrays()) to [start, end] and downsample
+    every requested series to at most `max_points` points.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    max_points = int(max_points)
+    if not 3 <= max_points <= MAX_POINTS:
+        raise ValueError(f"max_points must be between 3 and {MAX_POINTS}")
+
+    series = series or DEFAULT_SERIES
+    unknown = [name for name in series if name not in arrays or name == "day"]
+    if unknown:
+        raise ValueError(f"unknown series: {', '.join(unknown)}")
+
+    day = arrays["day"]
+    lo = 0 if start is None else np.searchsorted(day, np.datetime64(start, "D"), side="left")
+    hi = len(day) if end is None else np.searchsorted(day, np.datetime64(end, "D"), side="right")
+
+    day = day[lo:hi]
+    x = day.astype("int64").astype("float64")
+    labels = np.datetime_as_string(day, unit="D")
+
+    result = {}
+    for name in series:
+        y = arrays[name][lo:hi]
+        # Rolling windows start with NaN until they fill up; JSON has no NaN
+        # and LTTB's bucket means would turn NaN with it, so drop them first.
+        finite = np.isfinite(y)
+        if finite.all():
+            xs, names = x, labels
+        else:
+            xs, y, names = x[finite], y[finite], labels[finite]
+        idx = lttb(xs, y, max_points) if method == "lttb" else minmax(y, max_points)
+        result[name] = {"time": names[idx].tolist(), "value": y[idx].tolist()}
+
+    return {
+        "start": str(labels[0]) if len(labels) else None,
+        "end": str(labels[-1]) if len(labels) else None,
+        "method": method,
+        "source_points": int(hi - lo),
+        "series": result,
+    }
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Server preference when the client accepts several encodings equally.
+ENCODING_PREFERENCE = ["br", "gzip", "identity"]
+
+
+def make_etag(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    tags = [t.strip() for t in header.split(",")]
+    return etag in tags or "W/" + etag in tags
+
+
+def compress_variants(body):
+    """
+    Pre-compute every Content-Encoding we can serve for `body`.
+    Done once per rendered page, so the highest compression levels are used.
+    """
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+
+def variant_etags(etag, variants):
+    """
+    One strong ETag per Content-Encoding in `variants`: `etag` for the
+    identity body and `etag` tagged with the coding for the others, since
+    differently encoded bodies are different representations.
+    """
+    return {
+        encoding: etag if encoding == "identity" else etag[:-1] + "-" + encoding + '"'
+        for encoding in variants
+    }
+
+
+def negotiate_encoding(accept_encoding, available):
+    """
+    Pick the best encoding in `available` for an Accept-Encoding header,
+    honouring q-values (q=0 excludes an encoding).
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    def weight(encoding):
+        if encoding in weights:
+            return weights[encoding]
+        if "*" in weights:
+            return weights["*"]
+        # identity is acceptable unless explicitly refused.
+        return 1.0 if encoding == "identity" else 0.0
+
+    candidates = [e for e in ENCODING_PREFERENCE if e in available and weight(e) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=lambda e: (weight(e), -ENCODING_PREFERENCE.index(e)))
@@ -0,0 +1,197 @@
+"""
+Local HTTP load test for the webapp.
+
+Serves webapp:app with uvicorn in a child process whose upstreams point at
+the hashprice_bench stand-in, then holds `--concurrency` keep-alive
+connections open from a single event loop for `--duration` seconds and
+reports throughput and latency percentiles per path:
+
+    python hashprice_loadtest.py                          # / and /api/v1/hashprice
+    python hashprice_loadtest.py -c 500 -d 20 /api/v1/history
+    python hashprice_loadtest.py --url http://127.0.0.1:8000 /   # existing server
+
+The client is a minimal HTTP/1.1 reader on asyncio streams so that it costs
+far less per request than the server it measures.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from hashprice_bench import FIXTURE_PATH, StandIn, ensure_fixture
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATHS = ["/", "/api/v1/hashprice"]
+READY_TIMEOUT = 120
+
+
+async def _get(reader, writer, request):
+    writer.write(request)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, paths, deadline, latencies, errors, offset):
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n".encode() for path in paths
+    ]
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            start = time.perf_counter()
+            try:
+                status = await _get(reader, writer, requests[i % len(paths)])
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors[path] = errors.get(path, 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            if status in (200, 304):
+                latencies[path].append(time.perf_counter() - start)
+            else:
+                errors[path] = errors.get(path, 0) + 1
+            i += 1
+    finally:
+        writer.close()
+
+
+async def load(url, paths, concurrency=100, duration=10.0):
+    """
+    {path: {"requests", "errors", "rps", "p50_ms", "p90_ms", "p99_ms"}}
+    plus "total", for `concurrency` connections over `duration` seconds.
+    """
+    parts = urlsplit(url)
+    latencies = {path: [] for path in paths}
+    errors = {}
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _worker(parts.hostname, parts.port or 80, paths, deadline, latencies, errors, n)
+        for n in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    def summary(samples, failed):
+        samples = sorted(samples)
+        q = (lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000.0) if samples else (lambda p: 0.0)
+        return {
+            "requests": len(samples),
+            "errors": failed,
+            "rps": len(samples) / elapsed,
+            "p50_ms": q(0.50),
+            "p90_ms": q(0.90),
+            "p99_ms": q(0.99),
+        }
+
+    results = {path: summary(latencies[path], errors.get(path, 0)) for path in paths}
+    results["total"] = summary([s for path in paths for s in latencies[path]], sum(errors.values()))
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(port, upstream):
+    """
+    Child process: webapp on 127.0.0.1:`port` with upstreams at `upstream`.
+    """
+    import uvicorn
+
+    from hashprice_bench import isolate, point_at
+
+    # Nothing the webapp persists may land in the production data/.
+    isolate(tempfile.mkdtemp(prefix="hashprice-loadtest-"))
+    point_at(upstream)
+
+    import webapp
+
+    uvicorn.run(webapp.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _wait_ready(url, proc):
+    import urllib.request
+
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("webapp exited during startup")
+        try:
+            with urllib.request.urlopen(url + "/api/v1/hashprice", timeout=5) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("webapp did not become ready")
+
+
+def report(results):
+    print(f"{'Path':<24} {'Requests':>9} {'Errors':>7} {'Req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    print("-" * 78)
+    for path, r in results.items():
+        print(
+            f"{path:<24} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.0f} "
+            f"{r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local load test for webapp:app")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS, help="paths to request, round-robin")
+    parser.add_argument("--url", help="test this running server instead of starting one")
+    parser.add_argument("-c", "--concurrency", type=int, default=100, help="open connections")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--fixture", default=FIXTURE_PATH, help="btc.csv served by the stand-in")
+    parser.add_argument("--serve", nargs=2, metavar=("PORT", "UPSTREAM"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1])
+        return
+
+    stand_in = proc = None
+    url = args.url
+    try:
+        if url is None:
+            stand_in = StandIn(ensure_fixture(args.fixture))
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--serve", str(port), stand_in.url],
+                cwd=REPO_DIR,
+            )
+            _wait_ready(url, proc)
+
+        print(f"{url}: {args.concurrency} connections, {args.duration:.0f}s")
+        report(asyncio.run(load(url, args.paths, args.concurrency, args.duration)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if stand_in is not None:
+            stand_in.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a ~1 ms cached page up to a slow full CSV download.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+ROWS_BUCKETS = (10, 100, 1000, 5000, 10000)
+
+
+def _format(value):
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """
+        Every registered metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name + self._labels(key), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name} {_format(value)}" for name, value in self._samples()]
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    A gauge set explicitly, or computed at scrape time by `fn`. fn returns a
+    number, or for labelled gauges a dict of label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, fn=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.fn is None:
+            return super()._samples()
+        value = self.fn()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [(self.name + self._labels(tuple(map(str, key))), v) for key, v in value.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the wall time of the with-block, including when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, list(counts), total, n) for key, (counts, total, n) in self._values.items()]
+
+        for key, counts, total, n in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _format(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {n}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+# Shared instruments. Stages: download / parse (inside load_raw), fetch_data,
+# store_fetch, fetch_live_price, calculate, render_pages, dashboard.
+STAGE_SECONDS = Histogram(
+    "hashprice_stage_duration_seconds",
+    "Wall time of each pipeline stage.",
+    ["stage"],
+)
+CSV_BYTES = Histogram(
+    "hashprice_csv_bytes",
+    "Bytes of Coin Metrics CSV read per parse.",
+    buckets=BYTES_BUCKETS,
+)
+CSV_ROWS = Histogram(
+    "hashprice_csv_rows",
+    "Rows parsed per Coin Metrics CSV read, before incomplete rows are dropped.",
+    buckets=ROWS_BUCKETS,
+)
+PRICE_REQUESTS = Counter(
+    "hashprice_price_requests_total",
+    "Live price requests by provider and result (ok / fail).",
+    ["provider", "result"],
+)
+PRICE_SECONDS = Histogram(
+    "hashprice_price_request_duration_seconds",
+    "Latency of successful live price requests by provider.",
+    ["provider"],
+)
+CACHE_REQUESTS = Counter(
+    "hashprice_cache_requests_total",
+    "Cache lookups by cache and result (hit / miss).",
+    ["cache", "result"],
+)
+
+
+def cache_hit_ratios():
+    """
+    {(cache,): hits / lookups} from CACHE_REQUESTS, for a scrape-time gauge.
+    """
+    totals = {}
+    with CACHE_REQUESTS._lock:
+        for (cache, result), n in CACHE_REQUESTS._values.items():
+            hits, lookups = totals.get(cache, (0, 0))
+            totals[cache] = (hits + (n if result == "hit" else 0), lookups + n)
+    return {(cache,): hits / lookups for cache, (hits, lookups) in totals.items() if lookups}
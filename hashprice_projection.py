@@ -0,0 +1,261 @@
+"""
+Monte Carlo projection of hashprice over the next days to years.
+
+Each path simulates, per day ahead:
+
+    price     spot * exp(cumulative daily log returns), either resampled
+              from history ("bootstrap") or drawn from a normal with the
+              historical mean and volatility ("gbm")
+    hashrate  the current hashrate grown by 30-day log growth rates of the
+              7-day mean HashRate, resampled from history per 30-day segment
+    fees      a fee share of block revenue resampled from history per
+              segment, on top of
+    subsidy   the schedule at the expected height of that day, so a
+              halving inside the horizon halves the subsidy on its day
+
+and hashprice = (subsidy + fees) * price / hashrate in USD / PH / day. The
+history window is LOOKBACK_DAYS (about one halving cycle).
+
+Paths are simulated as (paths, days) NumPy arrays in chunks of
+CHUNK_PATHS, each with its own seed spawned from `seed`, so results do not
+depend on how chunks are spread over processes. Only the report days are
+kept from each chunk, and percentile bands are taken over all paths.
+Runs of PARALLEL_MIN_PATHS or more go to a process pool.
+
+Simulated hashprice is proportional to spot / hashrate, so the paths are
+simulated relative to a unit start (simulate_relative(), which needs only
+the history and the block height) and scaled to the current spot and
+hashrate afterwards (summarize()). A new spot price only costs the
+summary, not another simulation.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from hashprice_difficulty import BLOCKS_PER_DAY, COIN, HALVING_INTERVAL, block_subsidy, estimate_height
+
+MODELS = ("bootstrap", "gbm")
+PERCENTILES = (5, 25, 50, 75, 95)
+HORIZON_MARKS = (30, 90, 180, 365)
+
+LOOKBACK_DAYS = 4 * 365
+SEGMENT_DAYS = 30
+REPORT_STEP_DAYS = 7
+
+DEFAULT_PATHS = 100_000
+MAX_PATHS = 1_000_000
+DEFAULT_HORIZON = 365
+MAX_HORIZON = 730
+DEFAULT_SEED = 20090103
+
+CHUNK_PATHS = 10_000
+PARALLEL_MIN_PATHS = 50_000
+PROCESSES = int(os.getenv("HASHPRICE_PROJECTION_PROCESSES", "0")) or os.cpu_count() or 1
+
+_POOL = None
+
+
+def inputs_from_frame(df, data, lookback_days=LOOKBACK_DAYS):
+    """
+    The model inputs from a fetch_data() frame (or HashpriceSeries) and the
+    calculate() / snapshot result priced on it: historical samples as plain
+    arrays plus the starting state.
+    """
+    tail = df.tail(lookback_days + 7 + SEGMENT_DAYS)
+    price = tail["PriceUSD"].to_numpy(dtype="float64")
+    hashrate_7d = tail["HashRate_PH"].rolling(7).mean().to_numpy(dtype="float64")[6:]
+    fees = tail["FeeTotNtv"].to_numpy(dtype="float64")
+    revenue = tail["btc_revenue"].to_numpy(dtype="float64")
+
+    returns = np.diff(np.log(price))[-lookback_days:]
+    growth = np.log(hashrate_7d[SEGMENT_DAYS:] / hashrate_7d[:-SEGMENT_DAYS])[-lookback_days:]
+    fee_share = (fees / revenue)[-lookback_days:]
+
+    returns = returns[np.isfinite(returns)]
+    growth = growth[np.isfinite(growth)]
+    fee_share = fee_share[np.isfinite(fee_share) & (fee_share >= 0) & (fee_share < 1)]
+    if not len(returns) or not len(growth) or not len(fee_share):
+        raise ValueError("not enough history for a projection")
+
+    return dict(start_state(df, data), returns=returns, growth=growth, fee_share=fee_share)
+
+
+def start_state(df, data):
+    """
+    The starting point of a projection: spot, realtime hashrate and
+    hashprice from the calculate() / snapshot result, the block height and
+    the first projected day (the day after the frame's last row).
+    """
+    today = np.datetime64(df["time"].iloc[-1], "D") + 1
+    height = data.get("network_height") or estimate_height(today)
+
+    return {
+        "spot": float(data["spot"]),
+        "hashrate_ph": float(data["realtime_inputs"]["hashrate_ph"]),
+        "hashprice": float(data["hashprice_rt"]),
+        "height": int(height),
+        "today": str(today),
+    }
+
+
+def report_days(horizon):
+    days = np.arange(REPORT_STEP_DAYS, horizon + 1, REPORT_STEP_DAYS)
+    marks = [d for d in HORIZON_MARKS if d <= horizon]
+    return np.unique(np.concatenate([[1], days, marks, [horizon]])).astype(int)
+
+
+def subsidy_per_day(height, horizon):
+    """
+    BTC / day issued on each day 1..horizon at the expected heights.
+    """
+    heights = height + BLOCKS_PER_DAY * np.arange(1, horizon + 1)
+    halvings = heights // HALVING_INTERVAL
+    subsidy = np.array([block_subsidy(h * HALVING_INTERVAL) for h in range(int(halvings.max()) + 1)])
+    return subsidy[halvings] * BLOCKS_PER_DAY / COIN
+
+
+def simulate(inputs, paths, horizon, model="bootstrap", seed=None):
+    """
+    Hashprice on report_days(horizon) for `paths` paths, relative to a
+    spot price and hashrate of 1 (multiply by spot / hashrate_ph for USD /
+    PH / day): float32 array of shape (paths, len(report_days)).
+    """
+    rng = np.random.default_rng(seed)
+    days = report_days(horizon) - 1
+    segments = -(-horizon // SEGMENT_DAYS)
+
+    returns = inputs["returns"]
+    if model == "gbm":
+        steps = rng.normal(returns.mean(), returns.std(), (paths, horizon))
+    else:
+        steps = returns[rng.integers(0, len(returns), (paths, horizon))]
+    price = np.exp(np.cumsum(steps, axis=1, out=steps)[:, days])
+    del steps
+
+    # Log growth after k days: every whole segment so far plus the elapsed
+    # fraction of the current one, evaluated at the report days only.
+    growth = inputs["growth"][rng.integers(0, len(inputs["growth"]), (paths, segments))]
+    whole = np.zeros((paths, segments + 1))
+    np.cumsum(growth, axis=1, out=whole[:, 1:])
+    elapsed = days + 1
+    current = np.minimum(elapsed // SEGMENT_DAYS, segments - 1)
+    log_growth = whole[:, elapsed // SEGMENT_DAYS] + growth[:, current] * (elapsed % SEGMENT_DAYS / SEGMENT_DAYS)
+    hashrate = np.exp(log_growth)
+
+    share = inputs["fee_share"][rng.integers(0, len(inputs["fee_share"]), (paths, segments))]
+    share = share[:, days // SEGMENT_DAYS]
+    subsidy = subsidy_per_day(inputs["height"], horizon)[days]
+
+    # fees = subsidy * share / (1 - share), so revenue = subsidy / (1 - share).
+    btc_per_day = subsidy / (1.0 - share)
+    return (btc_per_day * price / hashrate).astype("float32")
+
+
+def _chunk(args):
+    inputs, paths, horizon, model, seed = args
+    return simulate(inputs, paths, horizon, model, seed)
+
+
+def _pool():
+    global _POOL
+    if _POOL is None:
+        # Spawned, not forked: callers such as the webapp have threads.
+        _POOL = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=get_context("spawn"))
+    return _POOL
+
+
+def simulate_relative(inputs, paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON, model="bootstrap",
+                      seed=DEFAULT_SEED, processes=None):
+    """
+    Run the simulation for summarize(): relative percentile bands on the
+    report days and the sorted relative hashprice at the horizon. Depends
+    on the history and the height in `inputs`, not on spot or hashrate.
+    `processes` caps the pool (1: run in this process).
+    """
+    if model not in MODELS:
+        raise ValueError(f"model must be one of {', '.join(MODELS)}")
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS:,}")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON} days")
+
+    start = time.perf_counter()
+    sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS)
+    if paths % CHUNK_PATHS:
+        sizes.append(paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(inputs, n, horizon, model, s) for n, s in zip(sizes, seeds)]
+
+    processes = min(processes or PROCESSES, len(jobs))
+    if paths >= PARALLEL_MIN_PATHS and processes > 1:
+        values = np.concatenate(list(_pool().map(_chunk, jobs)))
+    else:
+        values = np.concatenate([_chunk(job) for job in jobs])
+
+    return {
+        "model": model,
+        "paths": paths,
+        "horizon_days": horizon,
+        "seed": seed,
+        "height": inputs["height"],
+        "days": report_days(horizon),
+        "bands": np.percentile(values, PERCENTILES, axis=0),
+        "final": np.sort(values[:, -1]),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def summarize(relative, start):
+    """
+    Percentile bands in USD / PH / day for a simulate_relative() result and
+    a start_state().
+
+    Returns {"days", "dates", "bands": {"p5": [...], ...}, "horizons":
+    {"30": {"p5", ..., "p95"}, ...}, "prob_below_current", "halving",
+    "start", ...}.
+    """
+    scale = start["spot"] / start["hashrate_ph"]
+    days = relative["days"]
+    bands = relative["bands"] * scale
+    today = np.datetime64(start["today"], "D")
+    height = relative["height"]
+
+    next_halving = (height // HALVING_INTERVAL + 1) * HALVING_INTERVAL
+    halving_days = -(-(next_halving - height) // BLOCKS_PER_DAY)
+    final = relative["final"]
+
+    return {
+        "model": relative["model"],
+        "paths": relative["paths"],
+        "horizon_days": relative["horizon_days"],
+        "seed": relative["seed"],
+        "start": {k: start[k] for k in ("spot", "hashrate_ph", "hashprice", "height", "today")},
+        "days": days.tolist(),
+        "dates": [str(today + int(d)) for d in days],
+        "bands": {f"p{p}": [round(float(v), 4) for v in band] for p, band in zip(PERCENTILES, bands)},
+        "horizons": {
+            str(d): {f"p{p}": round(float(bands[i][list(days).index(d)]), 4) for i, p in enumerate(PERCENTILES)}
+            for d in HORIZON_MARKS if d <= relative["horizon_days"]
+        },
+        "prob_below_current": float(np.searchsorted(final, start["hashprice"] / scale) / len(final)),
+        "halving": {
+            "height": int(next_halving),
+            "days": int(halving_days),
+            "date": str(today + int(halving_days)),
+            "in_horizon": bool(halving_days <= relative["horizon_days"]),
+        },
+        "seconds": relative["seconds"],
+    }
+
+
+def project(inputs, paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON, model="bootstrap", seed=DEFAULT_SEED,
+            processes=None):
+    """
+    Percentile bands of simulated hashprice for `horizon` days ahead:
+    summarize() of simulate_relative() for the inputs' own start.
+    """
+    return summarize(simulate_relative(inputs, paths, horizon, model, seed, processes), inputs)
@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from hashprice_breaker import breaker
+from hashprice_metrics import Counter, STAGE_SECONDS
+
+# A cached value is reused for its provider's ttl; if refreshing it fails it
+# is still served for up to STALE_FACTOR * ttl before the metric is dropped.
+STALE_FACTOR = 4
+
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider")
+
+# Created on first fetch: the registry itself is also read by the
+# pandas/requests-free hashprice_fast path.
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _SESSION = requests.Session()
+            _SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        return _SESSION
+
+
+class Provider:
+    """
+    One upstream source for one realtime network metric.
+
+    `parse` turns the decoded JSON into the metric value (raising, or
+    returning None, when the payload is unusable). Several providers may
+    serve the same metric; the first in registration order that answers
+    wins.
+    """
+
+    def __init__(self, name, metric, url, parse, ttl=60.0, timeout=5.0):
+        self.name = name
+        self.metric = metric
+        self.url = url
+        self.parse = parse
+        self.ttl = ttl
+        self.timeout = timeout
+
+    def fetch(self, documents=None):
+        with breaker(self.name):
+            if documents is None:
+                data = _get_json(self.url, self.timeout)
+            else:
+                data = documents.get(self.url, self.timeout)
+            value = self.parse(data)
+            if value is None:
+                raise ValueError(f"{self.name}: no {self.metric} in payload")
+            return float(value)
+
+
+def _get_json(url, timeout):
+    r = _session().get(url, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+class _Documents:
+    """
+    The JSON documents fetched during one fetch_network() call, by URL.
+
+    Providers that parse different metrics out of the same endpoint (the
+    mempool hashrate endpoint serves both difficulty and hashrate) share a
+    single request: the first to ask fetches it, the others wait for that
+    fetch and reuse its payload, or its error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, url, timeout):
+        with self._lock:
+            entry = self._entries.setdefault(url, {"lock": threading.Lock()})
+        with entry["lock"]:
+            if "data" not in entry and "error" not in entry:
+                try:
+                    entry["data"] = _get_json(url, timeout)
+                except Exception as exc:
+                    entry["error"] = exc
+        if "error" in entry:
+            raise entry["error"]
+        return entry["data"]
+
+
+PROVIDERS = []
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+PROVIDER_REQUESTS = Counter(
+    "hashprice_provider_requests_total",
+    "Realtime network provider requests by provider and result (ok / fail).",
+    ["provider", "result"],
+)
+
+
+def register(provider):
+    PROVIDERS.append(provider)
+    return provider
+
+
+def _mempool_difficulty(data):
+    if not isinstance(data, dict):
+        return None
+    return data.get("currentDifficulty") or data.get("difficulty")
+
+
+def _mempool_hashrate(data):
+    # H/s -> PH/s
+    return data["currentHashrate"] / 1e15
+
+
+def _hashrateindex_hashrate(data):
+    # Luxor reports EH/s -> PH/s
+    return float(data["hashrate_1d"]) * 1000
+
+
+def _mempool_fee_per_block(data):
+    # Average projected fees (BTC) of the next three blocks.
+    blocks = data[:3]
+    if not blocks:
+        return None
+    return sum(b["blockVSize"] * b["medianFee"] for b in blocks) / len(blocks) / 100_000_000
+
+
+register(Provider(
+    "mempool-difficulty", "difficulty",
+    "https://mempool.space/api/v1/mining/hashrate/3d", _mempool_difficulty, ttl=600,
+))
+register(Provider(
+    "hashrateindex-hashrate", "hashrate_ph",
+    "https://data.hashrateindex.com/api/network-data/bitcoin/hashrate", _hashrateindex_hashrate, ttl=300,
+))
+register(Provider(
+    "mempool-hashrate", "hashrate_ph",
+    "https://mempool.space/api/v1/mining/hashrate/3d", _mempool_hashrate, ttl=300,
+))
+register(Provider(
+    "mempool-height", "height",
+    "https://mempool.space/api/blocks/tip/height", int, ttl=60,
+))
+register(Provider(
+    "mempool-fees", "fee_btc_per_block",
+    "https://mempool.space/api/v1/fees/mempool-blocks", _mempool_fee_per_block, ttl=60,
+))
+
+# Deployments without outbound access to these hosts can turn them off.
+if os.getenv("HASHPRICE_NETWORK_PROVIDERS", "on") == "off":
+    PROVIDERS.clear()
+
+
+def _fetch_one(provider, documents=None):
+    try:
+        value = provider.fetch(documents)
+    except Exception:
+        PROVIDER_REQUESTS.inc(provider=provider.name, result="fail")
+        raise
+    PROVIDER_REQUESTS.inc(provider=provider.name, result="ok")
+    with _CACHE_LOCK:
+        _CACHE[provider.name] = (value, time.time())
+    return value
+
+
+def fetch_network(metrics=None, providers=None):
+    """
+    Latest value of every realtime network metric:
+    {metric: {"value", "provider", "fetched"}}.
+
+    Providers whose cached value is older than their ttl are all queried at
+    once, so the call costs the slowest timeout rather than the sum; open
+    breakers are skipped, and providers sharing a URL share one request. A metric none of its providers can supply is left
+    out, and callers fall back to the Coin Metrics daily row.
+    """
+    providers = [
+        p for p in (PROVIDERS if providers is None else providers)
+        if metrics is None or p.metric in metrics
+    ]
+    now = time.time()
+
+    with STAGE_SECONDS.time(stage="fetch_network"):
+        with _CACHE_LOCK:
+            cached = {p.name: _CACHE.get(p.name) for p in providers}
+        due = [p for p in providers if not cached[p.name] or now - cached[p.name][1] >= p.ttl]
+        due = [p for p in due if breaker(p.name).available()]
+
+        documents = _Documents()
+        futures = {p.name: _POOL.submit(_fetch_one, p, documents) for p in due}
+        if futures:
+            wait(futures.values(), timeout=max(p.timeout for p in due))
+
+    # Per metric: the first provider with a current value, else the first
+    # with one still inside its stale window.
+    result = {}
+    with _CACHE_LOCK:
+        for limit in (1, STALE_FACTOR):
+            for p in providers:
+                entry = _CACHE.get(p.name)
+                if p.metric not in result and entry and now - entry[1] < p.ttl * limit:
+                    result[p.metric] = {"value": entry[0], "provider": p.name, "fetched": entry[1]}
+    return result
@@ -0,0 +1,219 @@
+import math
+from collections import deque
+
+# Smoothing windows, in days, maintained by RollingMetrics.
+WINDOWS = (7, 30, 90, 365)
+
+
+class RollingMean:
+    """
+    Fixed-window running mean that reproduces pandas' Series.rolling(w).mean()
+    bit for bit: the same Kahan-compensated add/remove sums, the same
+    min_periods == window rule, the same treatment of +/-inf as missing, and
+    the same clamping pandas applies to all-positive / all-negative /
+    constant windows.
+
+    Each push() is O(1) and returns the mean for the window ending at the
+    pushed value (NaN until the window is full).
+    """
+
+    __slots__ = (
+        "window", "values", "count", "nobs", "sum_x", "neg_ct",
+        "comp_add", "comp_remove", "same_count", "prev_value",
+    )
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self._reset(math.nan)
+
+    def _reset(self, prev_value):
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = prev_value
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+
+        if val == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def push(self, val):
+        val = float(val)
+        if math.isinf(val):
+            # pandas hands rolling aggregations inf as NaN: a missing value.
+            val = math.nan
+        # pandas re-seeds the sums whenever the new window no longer overlaps
+        # the previous one (always at i == 0, every step when window == 1).
+        if self.count == 0 or self.window == 1:
+            self._reset(val)
+        elif len(self.values) == self.window:
+            self._remove(self.values[0])
+
+        self.values.append(val)
+        self._add(val)
+        self.count += 1
+        return self.mean()
+
+    def mean(self):
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+
+        result = self.sum_x / self.nobs
+        if self.same_count >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+
+def divide(a, b):
+    """
+    a / b with NumPy semantics (inf / nan) rather than ZeroDivisionError, as
+    pandas gives; shared with the pandas-free hashprice_fast path.
+    """
+    if b == 0:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def metric_names(windows=WINDOWS):
+    """
+    hashprice_{w}d is the hashrate-weighted value (mean revenue over mean
+    hashrate, the historical definition of hashprice_7d); hashprice_{w}d_mean
+    is the plain mean of the daily hashprice_1d.
+    """
+    names = []
+    for w in windows:
+        names += [f"hashprice_{w}d", f"hashprice_{w}d_mean"]
+    return names
+
+
+class RollingMetrics:
+    """
+    All smoothing windows over a fetch_data()-style frame.
+
+    from_frame() computes every window in one vectorized pandas pass.
+    append() then extends them by one day in O(1) per window using
+    RollingMean running sums, whose results match re-running .rolling()
+    over the extended frame exactly. The running sums are seeded lazily on
+    the first append by replaying the history once.
+    """
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = tuple(windows)
+        self._frame = None
+        self._appended = []
+        self._inputs = None
+        self._means = None
+        self._latest = {}
+
+    @property
+    def frame(self):
+        """
+        Every metric per day ("time" + metric_names()), including appended days.
+        """
+        if self._appended:
+            import pandas as pd
+
+            extra = pd.DataFrame(self._appended)
+            self._frame = pd.concat([self._frame, extra], ignore_index=True)
+            self._appended = []
+        return self._frame
+
+    @classmethod
+    def from_frame(cls, df, windows=WINDOWS):
+        import pandas as pd
+
+        metrics = cls(windows)
+        revenue = df["usd_revenue"].astype("float64")
+        hashrate = df["HashRate_PH"].astype("float64")
+        daily = df["hashprice_1d"].astype("float64")
+
+        columns = {}
+        for w in metrics.windows:
+            columns[f"hashprice_{w}d"] = revenue.rolling(w).mean() / hashrate.rolling(w).mean()
+            columns[f"hashprice_{w}d_mean"] = daily.rolling(w).mean()
+
+        frame = pd.DataFrame(columns)
+        frame.insert(0, "time", df["time"])
+        metrics._frame = frame.reset_index(drop=True)
+        metrics._inputs = (revenue.to_numpy(), hashrate.to_numpy(), daily.to_numpy())
+        if len(frame):
+            metrics._latest = frame.iloc[-1].drop("time").astype(float).to_dict()
+        return metrics
+
+    def _seed(self):
+        self._means = {
+            w: (RollingMean(w), RollingMean(w), RollingMean(w)) for w in self.windows
+        }
+        if self._inputs is None:
+            return
+        for revenue, hashrate, daily in zip(*self._inputs):
+            for rev_mean, hr_mean, daily_mean in self._means.values():
+                rev_mean.push(revenue)
+                hr_mean.push(hashrate)
+                daily_mean.push(daily)
+        self._inputs = None
+
+    def append(self, usd_revenue, hashrate_ph, hashprice_1d=None, time=None):
+        """
+        Add one day and return the new value of every metric.
+        """
+        if self._means is None:
+            self._seed()
+        if hashprice_1d is None:
+            hashprice_1d = divide(usd_revenue, hashrate_ph)
+
+        latest = {}
+        for w, (rev_mean, hr_mean, daily_mean) in self._means.items():
+            latest[f"hashprice_{w}d"] = divide(rev_mean.push(usd_revenue), hr_mean.push(hashrate_ph))
+            latest[f"hashprice_{w}d_mean"] = daily_mean.push(hashprice_1d)
+
+        self._latest = latest
+        self._appended.append(dict(latest, time=time))
+        return dict(latest)
+
+    def extend(self, df, start):
+        """
+        Append rows df.iloc[start:] of a fetch_data()-style frame.
+        """
+        rows = df.iloc[start:]
+        for t, revenue, hashrate, daily in zip(
+            rows["time"], rows["usd_revenue"], rows["HashRate_PH"], rows["hashprice_1d"]
+        ):
+            self.append(revenue, hashrate, daily, time=t)
+
+    def latest(self):
+        return dict(self._latest)
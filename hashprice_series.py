@@ -0,0 +1,183 @@
+"""
+Compact binary export of the fetch_data() series.
+
+A loaded frame holds Python-level timestamps and an index per process;
+this format stores the same rows as fixed-width little-endian arrays that
+numpy.memmap maps in place, so loading costs a header read rather than a
+parse, and the pages are shared by every process mapping the file.
+
+Layout:
+
+    magic    8s   b"HPSERIES"
+    format   u16  FORMAT_VERSION
+    ncols    u16  number of float64 columns
+    rows     u64
+    names    ncols x 16s, NUL-padded ASCII column names
+
+then, each starting on an 8-byte boundary, the days as int32 days since
+1970-01-01 and one float64 array per column.
+
+load_series() returns a HashpriceSeries, which supports the frame
+operations build_result(), calculate(), history_arrays() and
+RollingMetrics.from_frame() use (len, column lookup, tail), so it can be
+passed wherever a fetch_data() frame is expected.
+"""
+
+import argparse
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from hashprice_sources import DATA_DIR
+
+MAGIC = b"HPSERIES"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHQ")
+NAME_BYTES = 16
+ALIGN = 8
+
+SERIES_PATH = os.getenv("HASHPRICE_SERIES", os.path.join(DATA_DIR, "hashprice.series"))
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def write_series(df, path=None):
+    """
+    Write a fetch_data() frame to `path` (atomically). Every column other
+    than "time" is stored as float64. `path` defaults to SERIES_PATH.
+    """
+    path = path or SERIES_PATH
+    names = [c for c in df.columns if c != "time"]
+    for name in names:
+        if len(name.encode("ascii")) > NAME_BYTES:
+            raise ValueError(f"column name {name!r} is longer than {NAME_BYTES} bytes")
+
+    days = df["time"].to_numpy().astype("datetime64[D]").astype("int64")
+    if len(days) and (days.min() < np.iinfo("int32").min or days.max() > np.iinfo("int32").max):
+        raise ValueError("days out of int32 range")
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(df))
+    header += b"".join(name.encode("ascii").ljust(NAME_BYTES, b"\0") for name in names)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for block in [header, days.astype("<i4").tobytes()] + [
+            df[name].to_numpy(dtype="<f8").tobytes() for name in names
+        ]:
+            f.write(block + b"\0" * (_aligned(len(block)) - len(block)))
+    os.replace(tmp, path)
+
+
+def load_series(path=None):
+    """
+    Map a write_series() file. No data is read until it is used.
+    """
+    path = path or SERIES_PATH
+    raw = np.memmap(path, dtype="uint8", mode="r")
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path}: truncated series header")
+    magic, version, ncols, rows = HEADER.unpack(raw[:HEADER.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a hashprice series file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported series format {version}")
+
+    names_end = HEADER.size + ncols * NAME_BYTES
+    names = [
+        raw[start:start + NAME_BYTES].tobytes().rstrip(b"\0").decode("ascii")
+        for start in range(HEADER.size, names_end, NAME_BYTES)
+    ]
+
+    offset = _aligned(names_end)
+    if len(raw) < offset + _aligned(rows * 4) + ncols * rows * 8:
+        raise ValueError(f"{path}: truncated series data")
+    days = raw[offset:offset + rows * 4].view("<i4")
+    offset += _aligned(rows * 4)
+
+    columns = {}
+    for name in names:
+        columns[name] = raw[offset:offset + rows * 8].view("<f8")
+        offset += rows * 8
+
+    return HashpriceSeries(days, columns)
+
+
+class HashpriceSeries:
+    """
+    Read-only, memory-mapped fetch_data() series.
+
+    `days` is the int32 epoch-day array and `arrays` maps column names to
+    float64 arrays, all views on the file. series[name] wraps one of them
+    in a pandas Series without copying ("time" is converted from days);
+    tail(n) and to_frame() build DataFrames of the last n / all rows.
+    """
+
+    def __init__(self, days, arrays):
+        self.days = days
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(self.days)
+
+    def __contains__(self, name):
+        return name == "time" or name in self.arrays
+
+    @property
+    def columns(self):
+        return ["time"] + list(self.arrays)
+
+    def _times(self, start=0):
+        return self.days[start:].astype("datetime64[D]").astype("datetime64[us]")
+
+    def __getitem__(self, name):
+        if name == "time":
+            return pd.Series(self._times(), name="time")
+        return pd.Series(self.arrays[name], name=name, copy=False)
+
+    def tail(self, n=5):
+        start = max(0, len(self) - n)
+        frame = {"time": self._times(start)}
+        frame.update((name, np.array(array[start:])) for name, array in self.arrays.items())
+        return pd.DataFrame(frame, index=pd.RangeIndex(start, len(self)))
+
+    def to_frame(self):
+        return self.tail(len(self))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect the compact hashprice series file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="fetch the Coin Metrics series and write it")
+    export.add_argument("path", nargs="?", default=SERIES_PATH)
+    export.add_argument("--tail", action="store_true", help="only the recent rows (Range fetch)")
+
+    info = sub.add_parser("info", help="print the rows and columns of a series file")
+    info.add_argument("path", nargs="?", default=SERIES_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from hashprice_engine import fetch_data
+
+        df = fetch_data("tail" if args.tail else "full")
+        write_series(df, args.path)
+        print(f"wrote {len(df)} rows to {args.path} ({os.path.getsize(args.path) / 1e3:.1f} kB)")
+        return
+
+    series = load_series(args.path)
+    first = series.days[0].astype("datetime64[D]") if len(series) else "—"
+    last = series.days[-1].astype("datetime64[D]") if len(series) else "—"
+    print(f"{args.path}: {len(series)} rows, {first} .. {last}")
+    print("columns:", ", ".join(series.arrays))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+One shared snapshot for every worker process on a host.
+
+Run with several uvicorn / gunicorn workers, each SnapshotCache would
+download, parse and hold its own copy of the Coin Metrics frame.
+SharedSnapshotCache elects the refresher with an fcntl lock instead: the
+worker holding the lock fetches upstream and publishes its inputs (frame
+columns, spot price, network metrics, fetch times) to a memory-mapped
+file; the others wait on the lock, then map that file and build their
+snapshot on top of it without copying the frame.
+
+A publish writes a new file and renames it over the old one, so readers
+always map one complete version, and mappings of the previous version
+stay valid until they are dropped.
+
+File layout (little-endian):
+
+    magic    8s   b"HPSNAP1\\0"
+    version  u64  +1 per publish; used as the snapshot version everywhere
+    meta     u64  length of the JSON metadata following the header
+
+then the metadata, zero padding to an 8-byte boundary, and each frame
+column as a raw array at the offset recorded in the metadata.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): every process refreshes for itself.
+    fcntl = None
+
+from hashprice_snapshot import SnapshotCache
+
+# Unset: each worker keeps its own SnapshotCache.
+SHARED_PATH = os.getenv("HASHPRICE_SHARED_SNAPSHOT", "")
+
+MAGIC = b"HPSNAP1\0"
+HEADER = struct.Struct("<8sQQ")
+ALIGN = 8
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+class Published:
+    """
+    One version read from the shared file. frame() returns a DataFrame
+    whose columns are read-only views on the mapping.
+    """
+
+    def __init__(self, version, meta, buffer, data_start):
+        self.version = version
+        self.meta = meta
+        self._buffer = buffer
+        self._data_start = data_start
+
+    def frame(self):
+        rows = self.meta["rows"]
+        columns = {
+            name: np.frombuffer(self._buffer, dtype=np.dtype(dtype), count=rows, offset=self._data_start + offset)
+            for name, dtype, offset in self.meta["columns"]
+        }
+        return pd.DataFrame(columns, copy=False)
+
+
+class SharedSnapshotFile:
+    """
+    The published file plus the refresher lock next to it (`path`.lock).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def lock(self):
+        """
+        Hold the refresher lock, blocking until it is free. Yields the
+        attempt record kept in the lock file ({"data", "price": epoch of the
+        last fetch attempt, "error": why it failed or None}); changes the
+        holder makes to it are written back on release.
+        """
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                attempts = json.loads(os.pread(fd, 65536, 0) or b"{}")
+            except ValueError:
+                attempts = {}
+            before = dict(attempts)
+            try:
+                yield attempts
+            finally:
+                if attempts != before:
+                    body = json.dumps(attempts).encode()
+                    os.ftruncate(fd, 0)
+                    os.pwrite(fd, body, 0)
+        finally:
+            # Closing the descriptor releases the flock.
+            os.close(fd)
+
+    def version(self):
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, _ = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return 0
+        return version if magic == MAGIC else 0
+
+    def read(self, known=0):
+        """
+        The latest Published version, or None if nothing is published or
+        it is still version `known`.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, meta_len = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version == known:
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None
+
+        meta = json.loads(buffer[HEADER.size:HEADER.size + meta_len])
+        return Published(version, meta, buffer, _aligned(HEADER.size + meta_len))
+
+    def write(self, df, meta):
+        """
+        Publish `df` and the JSON-serializable `meta` as the next version,
+        atomically. Call with the lock held. Returns the new version.
+        """
+        version = self.version() + 1
+
+        arrays, columns, offset = [], [], 0
+        for name in df.columns:
+            array = np.ascontiguousarray(df[name].to_numpy())
+            array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            arrays.append(array)
+            columns.append([name, array.dtype.str, offset])
+            offset += _aligned(array.nbytes)
+
+        body = json.dumps(dict(meta, rows=len(df), columns=columns)).encode()
+        padding = _aligned(HEADER.size + len(body)) - HEADER.size - len(body)
+
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, version, len(body)))
+            f.write(body + b"\0" * padding)
+            for array in arrays:
+                f.write(array.tobytes())
+                f.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+        os.replace(tmp, self.path)
+        return version
+
+
+class SharedSnapshotCache(SnapshotCache):
+    """
+    SnapshotCache whose upstream fetches are shared by every process using
+    the same `path`.
+
+    Each refresh takes the lock and first adopts whatever another worker
+    published since; a part (data / price) is fetched only if no worker
+    has fetched or tried it within its interval, so one fetch serves all
+    workers. A failed attempt is recorded in the lock file and the others
+    report it instead of retrying immediately. Snapshot versions come from
+    the file, so every worker serves the same version (and ETag) for the
+    same inputs.
+    """
+
+    def __init__(self, path=SHARED_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.shared = SharedSnapshotFile(path)
+        self.shared_version = 0
+        self._frame_id = 0
+
+    def _due(self, part, fetched, interval, attempts, now):
+        return now - max(fetched, attempts.get(part, 0)) >= interval
+
+    def _refresh(self, data, price):
+        with self.shared.lock() as attempts:
+            published = self.shared.read(self.shared_version)
+            if published is not None:
+                self._adopt(published)
+
+            now = time.time()
+            data = self._df is None or (
+                data and self._due("data", self._data_fetched, self.data_interval, attempts, now)
+            )
+            price = self._price is None or (
+                price and self._due("price", self._price_fetched, self.price_interval, attempts, now)
+            )
+
+            if not data and not price:
+                if attempts.get("error"):
+                    raise RuntimeError(f"shared refresh failed: {attempts['error']}")
+                self.last_error = None
+                self.last_error_at = None
+                return
+
+            error = None
+            try:
+                super()._refresh(data, price)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                if data:
+                    attempts["data"] = now
+                if price:
+                    attempts["price"] = now
+                attempts["error"] = error
+
+    def _adopt(self, published):
+        meta = published.meta
+        df = self._df
+        if df is None or meta["frame"] != self._frame_id:
+            df = published.frame()
+        self._frame_id = meta["frame"]
+        self.shared_version = published.version
+        self._publish(
+            df, meta["price"], meta["network"], meta["data_fetched"], meta["price_fetched"],
+            meta["stale"], version=published.version,
+        )
+
+    def _publish(self, df, live_price, network, data_fetched, price_fetched, stale, version=None):
+        if version is None:
+            # Fetched by this process: share it first, so the snapshot
+            # carries the shared version number.
+            frame_id = self._frame_id + 1 if df is not self._df else self._frame_id
+            version = self.shared.write(df, {
+                "frame": frame_id,
+                "price": float(live_price),
+                "network": network or {},
+                "data_fetched": data_fetched,
+                "price_fetched": price_fetched,
+                "stale": stale or {},
+                "published": time.time(),
+            })
+            self._frame_id = frame_id
+            self.shared_version = version
+        super()._publish(df, live_price, network, data_fetched, price_fetched, stale, version)
@@ -0,0 +1,388 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+import numpy as np
+
+from hashprice_engine import build_result, fetch_data, fetch_live_price, last_good_price
+from hashprice_providers import fetch_network
+from hashprice_rolling import RollingMetrics
+
+# The Coin Metrics CSV only gains one row per day, so the dataset is refreshed
+# rarely; the spot price moves constantly and is refreshed on its own, shorter
+# interval. Both can be tuned per deployment.
+DATA_INTERVAL = float(os.getenv("HASHPRICE_DATA_INTERVAL", "3600"))
+PRICE_INTERVAL = float(os.getenv("HASHPRICE_PRICE_INTERVAL", "30"))
+
+
+class Snapshot:
+    """
+    One immutable, fully computed view of the dashboard numbers.
+
+    `data` is the calculate()-style dict (read-only), `version` increases by one
+    every time a new snapshot is published.
+    """
+
+    __slots__ = ("version", "data", "created", "data_fetched", "price_fetched")
+
+    def __init__(self, version, data, created, data_fetched, price_fetched):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "data", MappingProxyType(dict(data)))
+        object.__setattr__(self, "created", created)
+        object.__setattr__(self, "data_fetched", data_fetched)
+        object.__setattr__(self, "price_fetched", price_fetched)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is immutable")
+
+    @property
+    def age(self):
+        return time.time() - self.created
+
+
+class SnapshotCache:
+    """
+    In-process stale-while-revalidate cache around build_result().
+
+    A background thread refreshes the Coin Metrics frame every `data_interval`
+    seconds and the spot price every `price_interval` seconds. Readers call
+    get() and always receive the latest published Snapshot; they only block
+    when nothing has been published yet, and concurrent cold-start readers
+    share a single refresh (single-flight). A reader that finds the snapshot
+    due for a refresh gets it immediately and starts one refresh in the
+    background, which later readers join instead of starting their own. When
+    a refresh fails the previous snapshot keeps being served and
+    `last_error` records why.
+
+    If a fetch fails before anything has been fetched in this process,
+    `last_good_data` / `last_good_price` (callables returning (value,
+    fetched epoch) or None) supply the persisted last-known-good value, so a
+    cold start during an upstream outage still serves, flagged stale.
+
+    Realtime network metrics (`fetch_network`, TTL-cached per provider) are
+    refreshed alongside the price; all fetches of one refresh run
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        data_interval=DATA_INTERVAL,
+        price_interval=PRICE_INTERVAL,
+        fetch_data=fetch_data,
+        fetch_price=fetch_live_price,
+        last_good_data=None,
+        last_good_price=last_good_price,
+        fetch_network=fetch_network,
+    ):
+        self.data_interval = data_interval
+        self.price_interval = price_interval
+        self._fetch_data = fetch_data
+        self._fetch_price = fetch_price
+        self._last_good_data = last_good_data
+        self._last_good_price = last_good_price
+        self._fetch_network = fetch_network
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="snapshot-fetch")
+
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._snapshot = None
+        self._df = None
+        # A frame fetched while no price was available (df, fetched, stale),
+        # kept so the retry only has to fetch the price.
+        self._kept = None
+        self._metrics = None
+        self._price = None
+        self._network = {}
+        self._data_fetched = 0.0
+        self._price_fetched = 0.0
+
+        # Bumped only when the Coin Metrics frame itself changes, so caches of
+        # frame-derived results survive price-only refreshes.
+        self.data_version = 0
+
+        self.last_error = None
+        self.last_error_at = None
+
+        self._listeners = []
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, fn):
+        """
+        Call fn(snapshot) from the refresh thread whenever a new snapshot is
+        published. Listener errors are swallowed so they cannot stall refreshes.
+        """
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def frame(self):
+        return self._df
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    def is_stale(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        if snapshot is None:
+            return True
+        if self.last_error_at is not None and self.last_error_at > snapshot.created:
+            return True
+        if snapshot.data.get("stale"):
+            return True
+        return snapshot.age > 2 * self.price_interval
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.revalidate()
+            return snapshot
+        return self.refresh()
+
+    async def aget(self):
+        """
+        get() for coroutines. Returns the published snapshot immediately; on
+        a cold start the refresh runs in the loop's executor, so upstream
+        I/O never blocks the event loop. That goes through get(), not
+        refresh(): callers queued behind a busy executor then pick up the
+        snapshot the first refresh published instead of refreshing again.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.revalidate()
+            return snapshot
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+    def revalidate(self):
+        """
+        Start a background refresh of whatever is due, unless one is already
+        in flight or the last attempt failed less than a price interval ago
+        (the refresh thread retries on that schedule). Returns the refresh
+        thread, or None when none was started.
+        """
+        now = time.time()
+        data = now >= self._data_fetched + self.data_interval
+        price = now >= self._price_fetched + self.price_interval
+        if not (data or price):
+            return None
+        if self.last_error_at is not None and now - self.last_error_at < self.price_interval:
+            return None
+
+        event, leader = self._claim()
+        if not leader:
+            return None
+
+        def run():
+            try:
+                self._lead(event, data, price)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="hashprice-revalidate", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self, data=True, price=True):
+        """
+        Refresh the requested parts and publish a new snapshot.
+
+        Only one refresh runs at a time; callers arriving while one is in
+        flight wait for it and receive its result instead of starting another.
+        Raises only when there is no previous snapshot to fall back on.
+        """
+        event, leader = self._claim()
+        if not leader:
+            event.wait()
+            if self._snapshot is None:
+                raise RuntimeError(f"Snapshot refresh failed: {self.last_error}")
+            return self._snapshot
+
+        self._lead(event, data, price)
+        return self._snapshot
+
+    def _claim(self):
+        """
+        Join the refresh in flight, or become its leader: returns (event,
+        leader); the leader must pass the event to _lead().
+        """
+        with self._lock:
+            event = self._inflight
+            if event is not None:
+                return event, False
+            event = self._inflight = threading.Event()
+            return event, True
+
+    def _lead(self, event, data, price):
+        try:
+            self._refresh(data, price)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.last_error_at = time.time()
+            if self._snapshot is None:
+                raise
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def _refresh(self, data, price):
+        df, live_price, network = self._df, self._price, self._network
+        data_fetched, price_fetched = self._data_fetched, self._price_fetched
+        errors = []
+        stale = {}
+        fresh = False
+
+        kept, self._kept = self._kept, None
+        if kept is not None:
+            df, data_fetched, kept_stale = kept
+            data = data and kept_stale
+
+        # Everything due is fetched concurrently. The two halves fail
+        # independently: a Coin Metrics outage should not freeze the spot
+        # price, and vice versa. A half that failed is served from its
+        # previous value, flagged with when that was fetched.
+        data_job = self._pool.submit(self._fetch_data) if data or df is None else None
+        price_job = self._pool.submit(self._fetch_price) if price or live_price is None else None
+        network_job = self._pool.submit(self._fetch_network) if price_job and self._fetch_network else None
+
+        if data_job:
+            try:
+                df = data_job.result()
+                data_fetched = time.time()
+                fresh = True
+            except Exception as e:
+                errors.append(e)
+                if df is None and self._last_good_data:
+                    saved = self._last_good_data()
+                    if saved is not None:
+                        df, data_fetched = saved
+                        fresh = True
+                if df is not None:
+                    stale["data"] = data_fetched
+        elif kept is not None and kept_stale:
+            stale["data"] = data_fetched
+        if price_job:
+            try:
+                live_price = price_job.result()
+                price_fetched = time.time()
+                fresh = True
+            except Exception as e:
+                errors.append(e)
+                if live_price is None and self._last_good_price:
+                    saved = self._last_good_price()
+                    if saved is not None:
+                        live_price, price_fetched = saved
+                        fresh = True
+                if live_price is not None:
+                    stale["price"] = price_fetched
+        if network_job:
+            try:
+                network = network_job.result()
+            except Exception:
+                pass
+
+        if fresh and df is not None and live_price is not None:
+            self._publish(df, live_price, network, data_fetched, price_fetched, stale)
+        elif df is not None and df is not self._df:
+            self._kept = (df, data_fetched, "data" in stale)
+
+        if errors:
+            raise errors[0]
+
+        self.last_error = None
+        self.last_error_at = None
+
+    def _publish(self, df, live_price, network, data_fetched, price_fetched, stale, version=None):
+        """
+        Build and publish the snapshot for these inputs. `version` defaults
+        to the next local version number.
+        """
+        metrics = self._metrics
+        if df is not self._df:
+            metrics = self._update_metrics(df)
+
+        result = build_result(df, live_price, metrics, stale, network)
+        if version is None:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+
+        if df is not self._df:
+            self.data_version += 1
+        self._df, self._price, self._metrics, self._network = df, live_price, metrics, network
+        self._data_fetched, self._price_fetched = data_fetched, price_fetched
+        self._snapshot = Snapshot(version, result, time.time(), data_fetched, price_fetched)
+        self._notify(self._snapshot)
+
+    def _update_metrics(self, df):
+        """
+        Extend the rolling metrics in O(1) per day when `df` is the previous
+        frame plus new rows; recompute them in one pass otherwise (first
+        load, or revised history).
+        """
+        old, metrics = self._df, self._metrics
+        if metrics is not None and old is not None and len(df) > len(old) > 0:
+            n = len(old)
+            unchanged = all(
+                np.array_equal(df[col].to_numpy()[:n], old[col].to_numpy())
+                for col in ("time", "usd_revenue", "HashRate_PH")
+            )
+            if unchanged:
+                metrics.extend(df, n)
+                return metrics
+        return RollingMetrics.from_frame(df)
+
+    def _notify(self, snapshot):
+        for fn in list(self._listeners):
+            try:
+                fn(snapshot)
+            except Exception:
+                pass
+
+    def _next_due(self):
+        return min(
+            self._data_fetched + self.data_interval,
+            self._price_fetched + self.price_interval,
+        )
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.time()
+            data_due = now >= self._data_fetched + self.data_interval
+            price_due = now >= self._price_fetched + self.price_interval
+            if data_due or price_due:
+                try:
+                    self.refresh(data=data_due, price=price_due)
+                except Exception:
+                    pass
+
+            # A failed refresh leaves the fetch timestamps untouched, so wait a
+            # full price interval before retrying instead of spinning.
+            if self.last_error:
+                wait = self.price_interval
+            else:
+                wait = max(0.5, self._next_due() - time.time())
+            self._stop.wait(wait)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hashprice-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
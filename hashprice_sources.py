@@ -0,0 +1,99 @@
+import json
+import os
+import time
+
+# Upstream endpoints and the small helpers shared by hashprice_engine and the
+# pandas-free hashprice_fast path. Standard library only, so importing it
+# costs nothing.
+
+COINMETRICS_CSV = "https://raw.githubusercontent.com/coinmetrics/data/master/csv/btc.csv"
+
+# Where everything the app persists lives by default: the Coin Metrics store,
+# last-known-good values, the cached CSV header, alert subscriptions and the
+# binary series. Each file can still be moved with its own variable. Tests and
+# benchmarks point this elsewhere so they never touch production state.
+DATA_DIR = os.getenv("HASHPRICE_DATA_DIR", "data")
+
+# The only Coin Metrics columns the dashboard reads.
+COLUMNS = ["time", "PriceUSD", "HashRate", "IssTotNtv", "FeeTotNtv"]
+
+# Tail fetch: calculate() only needs the last 14 derived rows, i.e. ~21 raw
+# days once the 7-day window is warmed up. Real Coin Metrics rows are a few
+# KB wide, so start with 64 KB and grow as needed.
+TAIL_BYTES = 64 * 1024
+TAIL_MIN_ROWS = 14
+HEADER_PROBE_BYTES = 16 * 1024
+HEADER_CACHE = os.getenv("HASHPRICE_HEADER_CACHE", os.path.join(DATA_DIR, "coinmetrics_header.csv"))
+
+PRICE_SOURCES = [
+    ("CoinGecko", "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"),
+    ("Coinbase", "https://api.coinbase.com/v2/prices/spot?currency=USD"),
+]
+PRICE_TIMEOUT = 8
+
+# Last-known-good values, persisted after every successful fetch and served
+# (flagged stale) when upstream is unavailable. hashprice_engine writes both;
+# the fast path reads both and writes the price.
+LAST_GOOD_PRICE = os.getenv("HASHPRICE_LAST_GOOD_PRICE", os.path.join(DATA_DIR, "last_good_price.json"))
+LAST_GOOD_DATA = os.getenv("HASHPRICE_LAST_GOOD_DATA", os.path.join(DATA_DIR, "last_good_coinmetrics.csv"))
+
+
+def parse_price(data):
+    if "bitcoin" in data and "usd" in data["bitcoin"]:
+        return float(data["bitcoin"]["usd"])
+    if "data" in data and "amount" in data["data"]:
+        return float(data["data"]["amount"])
+    raise ValueError("unrecognised price payload")
+
+
+def load_header(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def save_header(path, header):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(header)
+
+
+def content_range_start(value):
+    # "bytes 123-456/789"
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def write_atomic(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save_price_file(path, price):
+    try:
+        write_atomic(path, json.dumps({"price": price, "fetched": time.time()}).encode())
+    except OSError:
+        pass
+
+
+def load_price_file(path):
+    """
+    (price, fetched epoch) written by save_price_file(), or None.
+    """
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        return float(saved["price"]), float(saved["fetched"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
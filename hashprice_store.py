@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+
+import pandas as pd
+import requests
+
+import hashprice_engine
+from hashprice_engine import COLUMNS, add_derived, load_raw
+from hashprice_metrics import CACHE_REQUESTS, STAGE_SECONDS
+from hashprice_sources import DATA_DIR
+
+STORE_PATH = os.getenv("HASHPRICE_STORE", os.path.join(DATA_DIR, "coinmetrics.sqlite"))
+
+# Coin Metrics occasionally revises the most recent days after publishing
+# them, so rows this close to the newest stored day are re-written on update.
+REVISION_DAYS = 7
+
+TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    time TEXT PRIMARY KEY,
+    PriceUSD REAL NOT NULL,
+    HashRate REAL NOT NULL,
+    IssTotNtv REAL NOT NULL,
+    FeeTotNtv REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class CoinMetricsStore:
+    """
+    Persistent, column-pruned copy of the Coin Metrics history.
+
+    fetch() revalidates against upstream with If-None-Match /
+    If-Modified-Since. A 304 returns the in-memory frame without touching the
+    network body, the parser or the derived columns; a 200 is parsed, only
+    rows newer than the stored tail are upserted, and the derived columns are
+    recomputed. The store survives restarts, so a fresh process also starts
+    with a conditional request instead of a full download.
+    """
+
+    def __init__(self, path=None, url=None, session=None):
+        self.path = path or STORE_PATH
+        self.url = url
+        self.session = session or requests.Session()
+        self.last_status = None
+
+        self._lock = threading.Lock()
+        self._raw = None
+        self._frame = None
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _read_meta(self, conn):
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def _read_raw(self, conn):
+        df = pd.read_sql_query(f"SELECT {', '.join(COLUMNS)} FROM daily ORDER BY time", conn)
+        df["time"] = pd.to_datetime(df["time"])
+        return df
+
+    def _set_meta(self, conn, **values):
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, None if v is None else str(v)) for k, v in values.items()],
+        )
+
+    def _conditional_headers(self, meta):
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _merge(self, conn, raw, fresh):
+        """
+        Upsert the rows of `fresh` that are new (or recent enough to have been
+        revised) and return the merged pruned history.
+        """
+        if raw is not None and len(raw):
+            cutoff = raw["time"].iloc[-1] - timedelta(days=REVISION_DAYS)
+            fresh = fresh[fresh["time"] > cutoff]
+            raw = raw[raw["time"] <= cutoff]
+        else:
+            raw = None
+
+        rows = fresh.assign(time=fresh["time"].dt.strftime("%Y-%m-%d"))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO daily ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+            rows[COLUMNS].itertuples(index=False, name=None),
+        )
+
+        merged = fresh if raw is None else pd.concat([raw, fresh])
+        return merged.reset_index(drop=True)
+
+    def fetch(self):
+        """
+        Return the derived frame (same shape as hashprice_engine.fetch_data()).
+        """
+        with STAGE_SECONDS.time(stage="store_fetch"):
+            return self._fetch()
+
+    def _fetch(self):
+        with self._lock:
+            with closing(self._connect()) as conn, conn:
+                if self._raw is None:
+                    self._raw = self._read_raw(conn)
+                    if len(self._raw):
+                        self._frame = add_derived(self._raw)
+
+                meta = self._read_meta(conn)
+                headers = self._conditional_headers(meta) if self._frame is not None else {}
+
+                with hashprice_engine.COINMETRICS_BREAKER:
+                    r = self.session.get(
+                        self.url or hashprice_engine.COINMETRICS_CSV,
+                        headers=headers,
+                        timeout=TIMEOUT,
+                        stream=True,
+                    )
+                    try:
+                        if r.status_code == 304:
+                            CACHE_REQUESTS.inc(cache="coinmetrics", result="hit")
+                            self._set_meta(conn, validated=time.time())
+                            self.last_status = "not-modified"
+                            return self._frame
+                        r.raise_for_status()
+                        CACHE_REQUESTS.inc(cache="coinmetrics", result="miss")
+
+                        r.raw.decode_content = True
+                        fresh = load_raw(r.raw)
+                    finally:
+                        r.close()
+
+                self._raw = self._merge(conn, self._raw, fresh)
+                self._set_meta(
+                    conn,
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified"),
+                    validated=time.time(),
+                )
+
+            self._frame = add_derived(self._raw)
+            self.last_status = "updated"
+            return self._frame
+
+    def last_good(self):
+        """
+        (derived frame, epoch it was last validated upstream) from the stored
+        history, or None when the store is empty. For serving during an
+        upstream outage.
+        """
+        with self._lock:
+            with closing(self._connect()) as conn:
+                if self._raw is None:
+                    self._raw = self._read_raw(conn)
+                    if len(self._raw):
+                        self._frame = add_derived(self._raw)
+                if self._frame is None:
+                    return None
+                validated = self._read_meta(conn).get("validated")
+            return self._frame, float(validated) if validated else os.path.getmtime(self.path)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+# Per-client backlog. A client that falls this far behind has its queue
+# replaced by a single full-state message instead of growing without bound.
+QUEUE_SIZE = 16
+
+KEEPALIVE_SECONDS = 20
+
+
+def sse_message(payload, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Broadcaster:
+    """
+    Server-Sent Events fan-out for snapshot updates.
+
+    publish() is called from the snapshot refresh thread with the formatted
+    fields of a new snapshot. Only the fields that changed since the previous
+    publish are encoded, once, and the same string is handed to every
+    connected client's queue on the event loop, so the per-client cost of an
+    update is a queue put.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._clients = set()
+        self._fields = {}
+        self._extra = {}
+        self._version = 0
+
+    def bind(self, loop):
+        self._loop = loop
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def full_message(self):
+        payload = dict(self._extra, version=self._version, fields=self._fields)
+        return sse_message(payload, self._version)
+
+    def publish(self, version, fields, **extra):
+        changed = {k: v for k, v in fields.items() if self._fields.get(k) != v}
+        self._fields = dict(fields)
+        self._extra = extra
+        self._version = version
+
+        if not changed or self._loop is None:
+            return
+
+        message = sse_message(dict(extra, version=version, fields=changed), version)
+        self._loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message):
+        for queue in self._clients:
+            if queue.full():
+                # Partial updates can't be dropped individually without losing
+                # fields, so collapse the backlog into one full-state message.
+                while not queue.empty():
+                    queue.get_nowait()
+                message_for_client = self.full_message()
+            else:
+                message_for_client = message
+            queue.put_nowait(message_for_client)
+
+    async def events(self):
+        """
+        Async generator of SSE frames for one client: the full current state
+        first, then diffs, with comment keep-alives while idle.
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._clients.add(queue)
+        try:
+            yield "retry: 5000\n" + self.full_message()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            self._clients.discard(queue)
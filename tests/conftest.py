@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Before any repo module is imported: nothing a test persists (last-known-good
+# values, stores, header cache) may land in the real data/ directory.
+os.environ["HASHPRICE_DATA_DIR"] = tempfile.mkdtemp(prefix="hashprice-tests-")
+
+from hashprice_bench import StandIn  # noqa: E402
+
+FILLER_COLUMNS = 40
+
+
+def write_coinmetrics_csv(path, days=150, seed=3):
+    """
+    A small Coin Metrics-shaped btc.csv: the engine's five columns spread
+    among filler columns (rows ~800 bytes wide) and a first week without a
+    price, like the start of the real file.
+    """
+    rng = random.Random(seed)
+    names = [f"Filler{i:03d}" for i in range(FILLER_COLUMNS)]
+    for at, name in zip((3, 11, 19, 27), ("PriceUSD", "HashRate", "IssTotNtv", "FeeTotNtv")):
+        names.insert(at, name)
+
+    start = date(2024, 1, 1)
+    lines = [",".join(["time"] + names)]
+    for n in range(days):
+        values = {name: repr(rng.random() * 1000) for name in names}
+        values["PriceUSD"] = repr(60000 * (1 + rng.gauss(0, 0.03))) if n >= 7 else ""
+        values["HashRate"] = repr(6e8 * (1 + rng.gauss(0, 0.05)))
+        values["IssTotNtv"] = repr(450 * (1 + rng.gauss(0, 0.02)))
+        values["FeeTotNtv"] = repr(rng.random() * 20)
+        lines.append(",".join([(start + timedelta(days=n)).isoformat()] + [values[name] for name in names]))
+
+    with open(path, "w", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.fixture
+def btc_csv(tmp_path):
+    return write_coinmetrics_csv(str(tmp_path / "btc.csv"))
+
+
+@pytest.fixture
+def range_server(btc_csv):
+    server = StandIn(btc_csv, ranges=True)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def plain_server(btc_csv):
+    server = StandIn(btc_csv)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def webapp_client(monkeypatch, range_server):
+    """
+    A TestClient for webapp.app with every upstream pointed at a stand-in.
+    The webapp's snapshot is shared by all tests; it is not refreshed on
+    its own while a test runs.
+    """
+    import hashprice_engine
+    import hashprice_fast
+    from hashprice_providers import PROVIDERS
+
+    url = range_server.url
+    for module in (hashprice_engine, hashprice_fast):
+        monkeypatch.setattr(module, "COINMETRICS_CSV", url + "/btc.csv")
+        monkeypatch.setattr(module, "PRICE_SOURCES", [("CoinGecko", url + "/coingecko"), ("Coinbase", url + "/coinbase")])
+    paths = {}
+    for provider in PROVIDERS:
+        monkeypatch.setattr(provider, "url", f"{url}/network/{paths.setdefault(provider.url, provider.name)}")
+
+    import webapp
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(webapp.SNAPSHOT, "data_interval", 3600)
+    monkeypatch.setattr(webapp.SNAPSHOT, "price_interval", 3600)
+    return TestClient(webapp.app)
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import hashprice_alerts
+import hashprice_breaker
+from hashprice_alerts import AlertEngine, AlertStore, WebhookDispatcher
+
+
+class Dispatcher:
+    def __init__(self):
+        self.events = []
+
+    def dispatch(self, events):
+        self.events += events
+        return []
+
+
+def _snapshot(version, hashprice):
+    return SimpleNamespace(version=version, data={
+        "timestamp": "2026-01-01 00:00:00",
+        "hashprice_rt": hashprice,
+        "hashprice_7d": 50.0,
+        "pct_vs_7d": (hashprice / 50.0 - 1) * 100,
+    })
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = AlertEngine(AlertStore(str(tmp_path / "alerts.sqlite")), Dispatcher())
+    reloads = []
+    reload = engine.reload
+    monkeypatch.setattr(engine, "reload", lambda: (reloads.append(1), reload()))
+    engine.reloads = reloads
+    return engine
+
+
+def test_own_writes_do_not_reload(engine):
+    sub = engine.subscribe("http://hook", "hashprice_rt", "above", 55.0)
+    engine.on_snapshot(_snapshot(1, 50.0))
+    engine.unsubscribe(engine.subscribe("http://hook", "hashprice_rt", "below", 40.0).id)
+    engine.on_snapshot(_snapshot(2, 56.0))
+
+    assert engine.reloads == []
+    assert [e["subscription"] for e in engine.dispatcher.events] == [sub.id]
+
+
+def test_other_workers_writes_reload(engine, tmp_path):
+    engine.on_snapshot(_snapshot(1, 50.0))
+    other = AlertStore(str(tmp_path / "alerts.sqlite")).add("http://hook", "hashprice_rt", "above", 55.0)
+
+    engine.on_snapshot(_snapshot(2, 56.0))
+
+    assert engine.reloads == [1]
+    assert [e["subscription"] for e in engine.dispatcher.events] == [other.id]
+
+
+class Receiver:
+    """
+    A local webhook receiver. Each POST is recorded as (path, body) and
+    answered with the next status in `statuses` (200 once they run out).
+    """
+
+    def __init__(self, statuses=()):
+        self.posts = []
+        self.statuses = list(statuses)
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.posts.append((self.path, json.loads(body)))
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def receiver(monkeypatch):
+    monkeypatch.setattr(hashprice_breaker, "_BREAKERS", {})
+    receiver = Receiver()
+    yield receiver
+    receiver.close()
+
+
+def _events(url, n, start=0):
+    return [{"url": url, "subscription": start + i, "value": 50.0 + i} for i in range(n)]
+
+
+def test_dispatch_batches_events_per_url(receiver):
+    dispatcher = WebhookDispatcher(workers=4, batch_size=2)
+
+    futures = dispatcher.dispatch(_events(receiver.url + "/a", 3) + _events(receiver.url + "/b", 1, start=3))
+
+    assert [f.result(5) for f in futures] == [True, True, True]
+    batches = sorted((path, [e["subscription"] for e in body["events"]]) for path, body in receiver.posts)
+    assert batches == [("/a", [0, 1]), ("/a", [2]), ("/b", [3])]
+    assert all("url" not in e for _, body in receiver.posts for e in body["events"])
+
+
+def test_retries_on_server_errors(receiver):
+    receiver.statuses = [503, 500]
+    dispatcher = WebhookDispatcher(workers=1)
+
+    [future] = dispatcher.dispatch(_events(receiver.url + "/hook", 2))
+
+    assert future.result(5) is True
+    assert len(receiver.posts) == hashprice_alerts.RETRIES + 1
+    assert all(body == receiver.posts[0][1] for _, body in receiver.posts)
+
+
+def test_open_breaker_refuses_without_posting(receiver):
+    receiver.statuses = [500] * 10
+    dispatcher = WebhookDispatcher(workers=1)
+
+    # One batch retried to exhaustion trips the host's breaker...
+    [failed] = dispatcher.dispatch(_events(receiver.url + "/hook", 1))
+    assert failed.result(5) is False
+    posted = len(receiver.posts)
+    assert posted == hashprice_alerts.RETRIES + 1
+    host = hashprice_breaker.breaker(f"webhook:127.0.0.1:{receiver.server.server_port}")
+    assert host.state == hashprice_breaker.OPEN
+
+    # ...and while it is open, batches to that host are dropped unsent.
+    [refused] = dispatcher.dispatch(_events(receiver.url + "/other", 1))
+    assert refused.result(5) is False
+    assert len(receiver.posts) == posted
+
+
+@pytest.mark.skipif(hashprice_alerts.fcntl is None, reason="needs fcntl")
+def test_only_the_lock_holder_delivers(tmp_path):
+    path = str(tmp_path / "alerts.sqlite")
+    first = AlertEngine(AlertStore(path), Dispatcher())
+    second = AlertEngine(AlertStore(path), Dispatcher())
+    first.subscribe("http://hook", "hashprice_rt", "above", 55.0)
+
+    assert first.is_leader() and first.is_leader()
+    assert not second.is_leader()
+    for engine in (first, second):
+        engine.on_snapshot(_snapshot(1, 50.0))
+        engine.on_snapshot(_snapshot(2, 56.0))
+    assert len(first.dispatcher.events) == 1
+    assert second.dispatcher.events == []
+
+    # The lock goes with the leader, e.g. when its worker exits.
+    os.close(first._leader_fd)
+    assert second.is_leader()
+
+
+def test_without_fcntl_every_worker_leads(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashprice_alerts, "fcntl", None)
+    path = str(tmp_path / "alerts.sqlite")
+
+    assert AlertEngine(AlertStore(path), Dispatcher()).is_leader()
+    assert AlertEngine(AlertStore(path), Dispatcher()).is_leader()
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from hashprice_bench import FIXTURE_PRICE
+
+
+@pytest.fixture
+def api(webapp_client):
+    def get(**headers):
+        return webapp_client.get("/api/v1/hashprice", headers=headers)
+    return get
+
+
+def test_json_carries_etag_and_cache_control(api):
+    r = api()
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    payload = json.loads(r.content)
+    assert payload["spot"] == FIXTURE_PRICE
+    assert len(payload["trend"]["time"]) == 14
+    assert r.headers["etag"].startswith('"')
+    assert r.headers["cache-control"].startswith("public, max-age=")
+
+
+def test_matching_etag_is_not_modified(api):
+    etag = api().headers["etag"]
+
+    for header in (etag, "W/" + etag, f'"other", {etag}', "*"):
+        r = api(**{"If-None-Match": header})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+
+def test_other_etag_gets_the_body(api):
+    r = api(**{"If-None-Match": '"not-it"'})
+
+    assert r.status_code == 200
+    assert json.loads(r.content)["spot"] == FIXTURE_PRICE
+
+
+def test_new_snapshot_changes_the_etag(api, webapp_client):
+    import webapp
+
+    old = api().headers["etag"]
+    webapp.SNAPSHOT.refresh(data=False)
+
+    r = api(**{"If-None-Match": old})
+
+    assert r.status_code == 200
+    assert r.headers["etag"] != old
+    assert json.loads(r.content)["version"] == webapp.SNAPSHOT.snapshot.version
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+
+import hashprice_breaker
+from hashprice_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(hashprice_breaker, "time", clock)
+    # No jitter: an open period is exactly the full backoff.
+    monkeypatch.setattr(hashprice_breaker, "random", SimpleNamespace(uniform=lambda a, b: b))
+    return clock
+
+
+def _breaker():
+    return CircuitBreaker("test", failure_threshold=3, base_open_seconds=10, max_open_seconds=40)
+
+
+def _fail(b):
+    with pytest.raises(ConnectionError):
+        with b:
+            raise ConnectionError("down")
+
+
+def test_opens_after_consecutive_failures(clock):
+    b = _breaker()
+
+    _fail(b)
+    _fail(b)
+    assert b.state == CLOSED
+    _fail(b)
+
+    assert b.state == OPEN
+    assert not b.allow()
+    with pytest.raises(CircuitOpenError):
+        with b:
+            pytest.fail("an open breaker must not run the call")
+    # Refused calls are not failures of the provider.
+    assert b.failures == 3
+
+
+def test_success_resets_the_failure_count(clock):
+    b = _breaker()
+
+    _fail(b)
+    _fail(b)
+    with b:
+        pass
+    _fail(b)
+    _fail(b)
+
+    assert b.state == CLOSED
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    b = _breaker()
+    for _ in range(3):
+        _fail(b)
+
+    clock.now += 9.9
+    assert not b.available()
+    clock.now += 0.1
+    assert b.available()
+
+    assert b.allow()
+    assert b.state == HALF_OPEN
+    assert not b.allow()
+    assert not b.available()
+
+
+def test_successful_probe_closes(clock):
+    b = _breaker()
+    for _ in range(3):
+        _fail(b)
+    clock.now += 10
+
+    with b:
+        pass
+
+    assert b.state == CLOSED
+    assert b.allow()
+    assert b.status() == {"state": CLOSED, "failures": 0, "retry_in": 0.0}
+
+
+def test_failed_probe_reopens_with_growing_backoff(clock):
+    b = _breaker()
+    for _ in range(3):
+        _fail(b)
+
+    waits = []
+    for _ in range(4):
+        waits.append(b.retry_in())
+        clock.now += waits[-1]
+        _fail(b)
+
+    assert waits == [10, 20, 40, 40]
+    assert b.state == OPEN
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+import hashprice_cli
+import hashprice_engine as engine
+from hashprice_series import write_series
+
+
+@pytest.mark.parametrize("flag", ["--fast", "--difficulty"])
+def test_watch_rejects_options_it_cannot_honour(flag, capsys):
+    with pytest.raises(SystemExit) as exit:
+        hashprice_cli.main(["--watch", flag])
+
+    assert exit.value.code == 2
+    assert f"--watch cannot be combined with {flag}" in capsys.readouterr().err
+
+
+def test_watch_reads_the_series(monkeypatch, tmp_path, btc_csv, plain_server, capsys):
+    from hashprice_providers import PROVIDERS
+
+    series = str(tmp_path / "btc.series")
+    write_series(engine.add_derived(engine.load_raw(btc_csv)), series)
+    monkeypatch.setattr(engine, "COINMETRICS_CSV", plain_server.url + "/btc.csv")
+    monkeypatch.setattr(engine, "PRICE_SOURCES", [("CoinGecko", plain_server.url + "/coingecko")])
+    for provider in PROVIDERS:
+        monkeypatch.setattr(provider, "url", f"{plain_server.url}/network/{provider.name}")
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    # Stop after the first draw.
+    monkeypatch.setattr(hashprice_cli, "time", SimpleNamespace(sleep=interrupt))
+    hashprice_cli.main(["--watch", "--series", series])
+
+    out = capsys.readouterr().out
+    assert "BITCOIN HASHPRICE DASHBOARD" in out
+    assert "Snapshot v1" in out
+    assert not any(path == "/btc.csv" for path, _ in plain_server.requests)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import hashprice_breaker
+import hashprice_engine as engine
+from hashprice_bench import FIXTURE_PRICE
+
+
+def _full_parse(path):
+    # fetch_data() before the pruned, chunked parse: every column, inferred
+    # dtypes, one frame.
+    df = pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    df = df[["time", "PriceUSD", "HashRate", "IssTotNtv", "FeeTotNtv"]].dropna()
+    df = df.sort_values("time")
+    df["HashRate_PH"] = df["HashRate"] / 1000.0
+    df["btc_revenue"] = df["IssTotNtv"] + df["FeeTotNtv"]
+    df["usd_revenue"] = df["btc_revenue"] * df["PriceUSD"]
+    df["hashprice_1d"] = df["usd_revenue"] / df["HashRate_PH"]
+    df["hashprice_7d"] = df["usd_revenue"].rolling(7).mean() / df["HashRate_PH"].rolling(7).mean()
+    return df.dropna()
+
+
+@pytest.mark.parametrize("chunk_rows", [16, engine.PARSE_CHUNK_ROWS])
+def test_pruned_parse_matches_full_parse(btc_csv, monkeypatch, chunk_rows):
+    monkeypatch.setattr(engine, "PARSE_CHUNK_ROWS", chunk_rows)
+
+    df = engine.add_derived(engine.load_raw(btc_csv))
+    expected = _full_parse(btc_csv)
+
+    assert list(df["time"]) == list(expected["time"])
+    for col in ("hashprice_1d", "hashprice_7d"):
+        assert np.array_equal(df[col].to_numpy(), expected[col].to_numpy())
+
+
+def test_pruned_parse_reads_only_the_engine_columns(btc_csv):
+    raw = engine.load_raw(btc_csv)
+
+    assert list(raw.columns) == engine.COLUMNS
+    assert all(raw[col].dtype == np.float64 for col in engine.COLUMNS[1:])
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path, range_server):
+    """
+    The engine pointed at a stand-in, with its own breakers and last-good
+    files. up(False) makes every upstream answer 404.
+    """
+    monkeypatch.setattr(hashprice_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(engine, "COINMETRICS_BREAKER", hashprice_breaker.breaker("coinmetrics"))
+    monkeypatch.setattr(engine, "LAST_GOOD_PRICE", str(tmp_path / "last_good_price.json"))
+    monkeypatch.setattr(engine, "LAST_GOOD_DATA", str(tmp_path / "last_good.csv"))
+    monkeypatch.setattr(engine, "fetch_network", lambda *args, **kwargs: {})
+
+    def up(available=True):
+        prefix = range_server.url + ("" if available else "/missing")
+        monkeypatch.setattr(engine, "COINMETRICS_CSV", prefix + "/btc.csv")
+        monkeypatch.setattr(engine, "PRICE_SOURCES", [("TestGecko", prefix + "/coingecko")])
+
+    up()
+    return up
+
+
+def test_calculate_saves_and_falls_back_to_last_good(upstream, btc_csv):
+    fresh = engine.calculate("full")
+    assert fresh["stale"] == {}
+    assert engine.last_good_price()[0] == FIXTURE_PRICE
+
+    upstream(False)
+    fallback = engine.calculate("full")
+
+    assert set(fallback["stale"]) == {"data", "price"}
+    assert fallback["spot"] == FIXTURE_PRICE
+    assert fallback["hashprice_rt"] == fresh["hashprice_rt"]
+    # The saved rows start after the fetched frame's 7-day warm-up, so the
+    # re-derived frame starts six days later, and its rolling sums start at a
+    # different row (last-ulp differences).
+    saved, _ = engine.last_good_frame()
+    expected = engine.add_derived(engine.load_raw(btc_csv)).iloc[6:]
+    assert list(saved["time"]) == list(expected["time"])
+    assert np.allclose(saved["hashprice_7d"], expected["hashprice_7d"], rtol=1e-12, atol=0)
+
+
+def test_calculate_without_last_good_raises(upstream):
+    upstream(False)
+
+    with pytest.raises(requests.HTTPError):
+        engine.calculate("full")
+
+
+def test_open_breaker_skips_the_upstream(upstream, range_server):
+    upstream(False)
+    for _ in range(hashprice_breaker.FAILURE_THRESHOLD):
+        with pytest.raises(requests.HTTPError):
+            engine.fetch_data("full")
+    sent = len(range_server.requests)
+
+    with pytest.raises(hashprice_breaker.CircuitOpenError):
+        engine.fetch_data("full")
+    assert len(range_server.requests) == sent
@@ -0,0 +1,115 @@
+import pytest
+
+import hashprice_breaker
+import hashprice_engine as engine
+import hashprice_fast
+from conftest import write_coinmetrics_csv
+from hashprice_bench import FIXTURE_PRICE
+from hashprice_sources import load_price_file, save_price_file
+
+
+@pytest.fixture
+def long_csv(tmp_path):
+    return write_coinmetrics_csv(str(tmp_path / "btc.csv"), days=1000)
+
+
+def test_fast_path_matches_engine(long_csv):
+    df = engine.add_derived(engine.load_raw(long_csv))
+    with open(long_csv, newline="") as f:
+        days, columns = hashprice_fast.read_columns(f)
+    rows = hashprice_fast.derive(days, columns, keep=len(days))
+
+    assert [r["time"] for r in rows] == [t.strftime("%Y-%m-%d") for t in df["time"]]
+    for name in ("hashprice_1d", "hashprice_7d"):
+        fast = [r[name] for r in rows]
+        # float() rounds correctly and pandas' default parser can be an ulp
+        # off, so the two agree to a few ulps and exactly as the CLI prints.
+        assert fast == pytest.approx(df[name].tolist(), rel=1e-12, abs=0)
+        assert [f"{v:.2f}" for v in fast] == [f"{v:.2f}" for v in df[name]]
+
+
+@pytest.fixture
+def fast(monkeypatch, tmp_path, plain_server):
+    """
+    hashprice_fast pointed at a stand-in, with its own breakers and
+    last-good files. up(False) makes the CSV and the price answer 404.
+    """
+    monkeypatch.setattr(hashprice_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(hashprice_fast, "LAST_GOOD_PRICE", str(tmp_path / "last_good_price.json"))
+    monkeypatch.setattr(hashprice_fast, "LAST_GOOD_DATA", str(tmp_path / "last_good.csv"))
+
+    def up(data=True, price=True):
+        url = plain_server.url
+        monkeypatch.setattr(hashprice_fast, "COINMETRICS_CSV", url + ("/btc.csv" if data else "/missing"))
+        monkeypatch.setattr(hashprice_fast, "PRICE_SOURCES", [("CoinGecko", url + ("/coingecko" if price else "/missing"))])
+
+    up()
+    return up
+
+
+def _save_last_good_frame(monkeypatch, path):
+    monkeypatch.setattr(engine, "LAST_GOOD_DATA", hashprice_fast.LAST_GOOD_DATA)
+    monkeypatch.setattr(engine, "_LAST_GOOD_SAVED", {"key": None})
+    engine.save_last_good_frame(engine.add_derived(engine.load_raw(path)))
+
+
+def test_calculate_saves_the_price(fast):
+    data = hashprice_fast.calculate(network=False)
+
+    assert data["stale"] == {}
+    assert data["spot"] == FIXTURE_PRICE
+    assert load_price_file(hashprice_fast.LAST_GOOD_PRICE)[0] == FIXTURE_PRICE
+
+
+def test_falls_back_to_last_good_data(fast, monkeypatch, btc_csv, plain_server):
+    live = hashprice_fast.calculate(network=False)
+    _save_last_good_frame(monkeypatch, btc_csv)
+    fast(data=False)
+
+    data = hashprice_fast.calculate(network=False)
+
+    assert set(data["stale"]) == {"data"}
+    # The saved CSV round-trips the raw columns to within an ulp.
+    assert [day for day, _ in data["trend"]] == [day for day, _ in live["trend"]]
+    assert [v for _, v in data["trend"]] == pytest.approx([v for _, v in live["trend"]], rel=1e-12, abs=0)
+    assert data["hashprice_rt"] == pytest.approx(live["hashprice_rt"], rel=1e-12, abs=0)
+
+
+def test_falls_back_to_last_good_price(fast):
+    save_price_file(hashprice_fast.LAST_GOOD_PRICE, 58000.0)
+    fast(price=False)
+
+    data = hashprice_fast.calculate(network=False)
+
+    assert set(data["stale"]) == {"price"}
+    assert data["spot"] == 58000.0
+
+
+def test_raises_without_last_good(fast):
+    fast(data=False)
+    with pytest.raises(Exception):
+        hashprice_fast.calculate(network=False)
+
+    fast(price=False)
+    with pytest.raises(RuntimeError, match="price sources unavailable"):
+        hashprice_fast.calculate(network=False)
+
+
+def test_open_breaker_skips_the_upstream(fast, monkeypatch, btc_csv, plain_server):
+    _save_last_good_frame(monkeypatch, btc_csv)
+    coinmetrics = hashprice_breaker.breaker("coinmetrics")
+    for _ in range(coinmetrics.failure_threshold):
+        coinmetrics.record_failure()
+
+    data = hashprice_fast.calculate(network=False)
+
+    assert set(data["stale"]) == {"data"}
+    assert not any(path == "/btc.csv" for path, _ in plain_server.requests)
+
+
+def test_no_complete_rows_is_a_clear_error(fast, tmp_path, plain_server):
+    empty = write_coinmetrics_csv(str(tmp_path / "empty.csv"), days=5)
+    plain_server.load(empty)
+
+    with pytest.raises(RuntimeError, match="no complete rows"):
+        hashprice_fast.calculate(network=False)
@@ -0,0 +1,92 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from hashprice_grid import MAX_CELLS, parse_axis, profitability_grid
+
+
+def test_parses_lists_and_inclusive_ranges():
+    assert parse_axis("15, 18,21").tolist() == [15.0, 18.0, 21.0]
+    assert parse_axis("0.04:0.06:0.01").tolist() == pytest.approx([0.04, 0.05, 0.06])
+    assert parse_axis("5:5:1").tolist() == [5.0]
+
+
+@pytest.mark.parametrize("value, message", [
+    ("1:1000000:0.001", "more than"),
+    ("1:2000001:1", "more than"),
+    ("-1e308:1e308:1", "more than"),
+    ("0:1e308:1e-300", "more than"),
+    ("0:inf:1", "finite"),
+    ("-inf:0:1", "finite"),
+    ("0:10:inf", "finite"),
+    ("nan:10:1", "finite"),
+    ("0:10:nan", "finite"),
+    ("15,nan,21", "finite"),
+    ("15,inf", "finite"),
+    ("0:10:0", "positive step"),
+    ("0:10:-1", "positive step"),
+    ("10:0:1", "positive step"),
+    ("1:2", "expected a list"),
+    ("a,b", "expected a list"),
+    (" , ", "no values"),
+])
+def test_rejects_bad_axes(value, message):
+    with pytest.raises(ValueError, match=message):
+        parse_axis(value, "efficiency")
+
+
+def test_huge_range_is_rejected_before_allocating():
+    tracemalloc.start()
+    try:
+        with pytest.raises(ValueError):
+            parse_axis("1:1000000:0.001")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 1_000_000
+
+
+def test_largest_allowed_range():
+    assert len(parse_axis(f"0:{MAX_CELLS - 1}:1")) == MAX_CELLS
+
+
+@pytest.mark.parametrize("hashprice, ph", [(float("nan"), 1.0), (50.0, float("inf"))])
+def test_grid_rejects_non_finite_scalars(hashprice, ph):
+    with pytest.raises(ValueError, match="finite"):
+        profitability_grid(hashprice, [18.0], [0.05], [1.0], [0.0], ph=ph)
+
+
+def test_grid_cell_limit():
+    axis = np.arange(1, 40, dtype="float64")
+    uptime = np.linspace(0, 1, 40)
+
+    with pytest.raises(ValueError, match="cells"):
+        profitability_grid(50.0, axis, axis, uptime, uptime)
+
+
+@pytest.mark.parametrize("query", [
+    "efficiency=1:1000000:0.001",
+    "efficiency=0:inf:1",
+    "efficiency=nan",
+    "power_price=0.05,nan",
+    "hashprice=nan",
+    "ph=inf",
+])
+def test_api_answers_bad_axes_with_400(webapp_client, query):
+    r = webapp_client.get(f"/api/v1/profitability?{query}")
+
+    assert r.status_code == 400
+
+
+def test_api_grid(webapp_client):
+    r = webapp_client.get("/api/v1/profitability?hashprice=50&efficiency=15:21:3&power_price=0.04,0.06")
+
+    assert r.status_code == 200
+    grid = json.loads(r.content)
+    assert grid["shape"] == [3, 2, 1, 1]
+    assert grid["axes"]["efficiency"] == [15.0, 18.0, 21.0]
+    # 1 PH/s at 15 J/TH draws 15 kW: 360 kWh/day at $0.04.
+    assert grid["profit"][0][0][0][0] == pytest.approx(50 - 360 * 0.04)
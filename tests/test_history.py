@@ -0,0 +1,32 @@
+import json
+
+import numpy as np
+
+from hashprice_history import query
+
+
+def _arrays(n=400):
+    day = np.datetime64("2020-01-01") + np.arange(n)
+    hashprice = 50 + np.sin(np.arange(n) / 20.0)
+    slow = hashprice.copy()
+    slow[:365] = np.nan  # a 365-day window before it fills
+    return {"day": day, "hashprice_1d": hashprice, "hashprice_365d": slow}
+
+
+def test_unfilled_rolling_points_are_dropped():
+    for method in ("lttb", "minmax"):
+        result = query(_arrays(), max_points=20, method=method, series=["hashprice_1d", "hashprice_365d"])
+        body = json.dumps(result, allow_nan=False)
+
+        slow = json.loads(body)["series"]["hashprice_365d"]
+        assert slow["time"][0] >= "2020-12-31"
+        assert len(slow["time"]) == len(slow["value"]) > 0
+
+
+def test_all_nan_series_is_empty():
+    arrays = _arrays()
+    arrays["hashprice_365d"][:] = np.nan
+
+    result = query(arrays, series=["hashprice_365d"])
+
+    assert result["series"]["hashprice_365d"] == {"time": [], "value": []}
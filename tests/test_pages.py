@@ -0,0 +1,77 @@
+import gzip
+
+import pytest
+
+import hashprice_http
+
+
+@pytest.fixture
+def page(webapp_client):
+    def get(encoding, if_none_match=None, path="/"):
+        headers = {"Accept-Encoding": encoding}
+        if if_none_match:
+            headers["If-None-Match"] = if_none_match
+        return webapp_client.get(path, headers=headers)
+    return get
+
+
+def test_each_encoding_has_its_own_etag(page):
+    plain = page("identity")
+    zipped = page("gzip")
+
+    assert plain.status_code == zipped.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert plain.headers["vary"] == zipped.headers["vary"] == "Accept-Encoding"
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    # The client decompresses: both carry the same page.
+    assert zipped.content == plain.content
+    assert b"<html>" in plain.content
+
+
+def test_matching_etag_for_the_negotiated_encoding_is_not_modified(page):
+    for encoding in ("identity", "gzip"):
+        etag = page(encoding).headers["etag"]
+
+        r = page(encoding, etag)
+
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+
+
+def test_etag_of_another_encoding_gets_the_body(page):
+    gzip_etag = page("gzip").headers["etag"]
+    identity_etag = page("identity").headers["etag"]
+
+    plain = page("identity", gzip_etag)
+    zipped = page("gzip", identity_etag)
+
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+    assert zipped.status_code == 200 and zipped.headers["content-encoding"] == "gzip"
+
+
+def test_themes_and_brand_paths_are_separate_pages(page, webapp_client):
+    import webapp
+
+    green = page("identity").headers["etag"]
+    other = next(t for t in webapp.THEMES if t != "green")
+    themed = webapp_client.get(f"/?theme={other}", headers={"Accept-Encoding": "identity"})
+    slug = webapp.BRANDS.default_slug()
+
+    assert themed.headers["etag"] != green
+    assert page("identity", path=f"/{slug}/").headers["etag"] == green
+    assert page("identity", path="/no-such-brand/").status_code == 404
+
+
+def test_compressed_variants_decode_to_the_page():
+    body = b"<html>" + b"hashprice " * 1000 + b"</html>"
+
+    variants = hashprice_http.compress_variants(body)
+    etags = hashprice_http.variant_etags('"abc"', variants)
+
+    assert gzip.decompress(variants["gzip"]) == body
+    assert etags["identity"] == '"abc"' and etags["gzip"] == '"abc-gzip"'
+    if hashprice_http.brotli is not None:
+        assert hashprice_http.brotli.decompress(variants["br"]) == body
+        assert etags["br"] == '"abc-br"'
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import hashprice_breaker
+import hashprice_fast
+import hashprice_providers
+from hashprice_providers import PROVIDERS, Provider, fetch_network
+
+
+@pytest.fixture
+def providers(monkeypatch, plain_server):
+    """
+    The registered providers' metrics and parsers, pointed at a stand-in
+    where the two mempool hashrate-endpoint providers share one URL.
+    """
+    monkeypatch.setattr(hashprice_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(hashprice_providers, "_CACHE", {})
+    by_name = {p.name: p for p in PROVIDERS}
+
+    def at(name, path):
+        p = by_name[name]
+        return Provider(p.name, p.metric, f"{plain_server.url}/network/{path}", p.parse, ttl=p.ttl)
+
+    return [
+        at("mempool-difficulty", "mempool-difficulty"),
+        at("mempool-hashrate", "mempool-difficulty"),
+        at("mempool-height", "mempool-height"),
+    ]
+
+
+def _network_requests(server):
+    return [path for path, _ in server.requests if path.startswith("/network/")]
+
+
+def test_registered_mempool_providers_share_a_url():
+    by_name = {p.name: p for p in PROVIDERS}
+
+    assert by_name["mempool-difficulty"].url == by_name["mempool-hashrate"].url
+
+
+def test_shared_url_is_fetched_once_per_refresh(providers, plain_server):
+    network = fetch_network(providers=providers)
+
+    assert network["difficulty"]["value"] == 1.2e14
+    assert network["hashrate_ph"]["value"] == 8.5e20 / 1e15
+    assert network["height"]["value"] == 920000
+    assert sorted(_network_requests(plain_server)) == ["/network/mempool-difficulty", "/network/mempool-height"]
+
+
+def test_failed_shared_fetch_fails_every_provider_on_it(providers, plain_server):
+    for p in providers[:2]:
+        p.url = plain_server.url + "/missing"
+
+    network = fetch_network(providers=providers)
+
+    assert set(network) == {"height"}
+    assert plain_server.requests.count(("/missing", None)) == 1
+    for p in providers[:2]:
+        assert hashprice_breaker.breaker(p.name).status()["failures"] == 1
+
+
+def test_fast_path_fetches_a_shared_url_once(providers, plain_server, monkeypatch):
+    monkeypatch.setattr(hashprice_providers, "PROVIDERS", providers)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        network = hashprice_fast.fetch_network(pool, metrics=("difficulty", "hashrate_ph"))
+
+    assert network["difficulty"]["value"] == 1.2e14
+    assert network["hashrate_ph"]["provider"] == "mempool-hashrate"
+    assert _network_requests(plain_server) == ["/network/mempool-difficulty"]
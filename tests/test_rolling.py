@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hashprice_rolling import RollingMean, RollingMetrics, metric_names
+
+WINDOWS = (1, 7, 30, 365)
+DAYS = 900
+
+
+def _identical(a, b):
+    # Bit for bit, treating every NaN as equal.
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    return a.shape == b.shape and bool(np.all((np.isnan(a) & np.isnan(b)) | (a.view("i8") == b.view("i8"))))
+
+
+def _values(seed, special=True):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(3.0, 0.4, DAYS)
+    values[100:140] = 25.0  # a constant run
+    if special:
+        values[[5, 6, 400, 401, 402]] = np.nan
+        values[600] = np.inf
+        values[700] = -np.inf
+        values[800:820] = -rng.random(20)
+        values[850:852] = 0.0
+    return values
+
+
+def _frame(seed, special=True):
+    rng = np.random.default_rng(seed + 1)
+    revenue = _values(seed, special) * 1e6
+    hashrate = rng.lognormal(13.0, 0.2, DAYS)
+    if special:
+        hashrate[300] = 0.0
+        hashrate[500] = np.nan
+    df = pd.DataFrame({
+        "time": pd.date_range("2020-01-01", periods=DAYS, freq="D"),
+        "usd_revenue": revenue,
+        "HashRate_PH": hashrate,
+    })
+    df["hashprice_1d"] = df["usd_revenue"] / df["HashRate_PH"]
+    return df
+
+
+def _expected(df):
+    columns = {}
+    for w in WINDOWS:
+        columns[f"hashprice_{w}d"] = df["usd_revenue"].rolling(w).mean() / df["HashRate_PH"].rolling(w).mean()
+        columns[f"hashprice_{w}d_mean"] = df["hashprice_1d"].rolling(w).mean()
+    return pd.DataFrame(columns)
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("special", [False, True], ids=["finite", "nan-inf"])
+def test_rolling_mean_matches_pandas(window, special):
+    values = _values(11, special)
+    mean = RollingMean(window)
+
+    pushed = [mean.push(v) for v in values]
+
+    assert _identical(pushed, pd.Series(values).rolling(window).mean())
+
+
+@pytest.mark.parametrize("special", [False, True], ids=["finite", "nan-inf"])
+def test_from_frame_matches_pandas(special):
+    df = _frame(5, special)
+
+    metrics = RollingMetrics.from_frame(df, WINDOWS)
+
+    expected = _expected(df)
+    for name in metric_names(WINDOWS):
+        assert _identical(metrics.frame[name], expected[name]), name
+    assert list(metrics.frame["time"]) == list(df["time"])
+
+
+@pytest.mark.parametrize("special", [False, True], ids=["finite", "nan-inf"])
+@pytest.mark.parametrize("start", [0, 1, 364, 450])
+def test_extend_matches_recomputing(special, start):
+    df = _frame(7, special)
+    head = df.iloc[:start]
+
+    metrics = RollingMetrics.from_frame(head, WINDOWS)
+    # Several incremental extends, as the snapshot refresher does daily.
+    for stop in (start + 1, start + 40, DAYS):
+        metrics.extend(df.iloc[:stop], len(metrics.frame))
+
+    expected = _expected(df)
+    for name in metric_names(WINDOWS):
+        assert _identical(metrics.frame[name], expected[name]), name
+        assert _identical(metrics.latest()[name], expected[name].iloc[-1]), name
+
+
+@pytest.mark.parametrize("special", [False, True], ids=["finite", "nan-inf"])
+def test_append_derives_the_daily_value_like_pandas(special):
+    df = _frame(9, special)
+    metrics = RollingMetrics.from_frame(df.iloc[:500], WINDOWS)
+
+    for revenue, hashrate in zip(df["usd_revenue"].iloc[500:], df["HashRate_PH"].iloc[500:]):
+        latest = metrics.append(revenue, hashrate)
+
+    expected = _expected(df).iloc[-1]
+    for name in metric_names(WINDOWS):
+        assert _identical(latest[name], expected[name]), name
+    assert len(metrics.frame) == DAYS
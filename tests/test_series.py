@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import hashprice_engine as engine
+import hashprice_series
+from hashprice_rolling import RollingMetrics
+from hashprice_series import load_series, write_series
+
+
+@pytest.fixture
+def frame(btc_csv):
+    return engine.add_derived(engine.load_raw(btc_csv)).reset_index(drop=True)
+
+
+@pytest.fixture
+def series_path(tmp_path):
+    return str(tmp_path / "hashprice.series")
+
+
+def test_round_trip_is_exact(frame, series_path):
+    write_series(frame, series_path)
+    series = load_series(series_path)
+
+    assert len(series) == len(frame)
+    assert series.columns == list(frame.columns)
+    assert list(series["time"]) == list(frame["time"])
+    for name in frame.columns[1:]:
+        assert np.array_equal(series[name].to_numpy(), frame[name].to_numpy()), name
+
+
+def test_columns_are_read_only_views_on_the_file(frame, series_path):
+    write_series(frame, series_path)
+    series = load_series(series_path)
+
+    array = series.arrays["hashprice_7d"]
+    assert isinstance(array.base, np.memmap)
+    assert not array.flags.writeable
+    assert np.shares_memory(series["hashprice_7d"].to_numpy(), array)
+
+
+def test_series_stands_in_for_the_frame(frame, series_path):
+    write_series(frame, series_path)
+    series = load_series(series_path)
+
+    from_series = engine.build_result(series, 60000.0, RollingMetrics.from_frame(series))
+    from_frame = engine.build_result(frame, 60000.0, RollingMetrics.from_frame(frame))
+
+    for key in ("hashprice_rt", "hashprice_1d", "hashprice_7d", "pct_vs_7d", "rolling"):
+        assert from_series[key] == from_frame[key], key
+    assert list(from_series["trend"]["time"]) == list(from_frame["trend"]["time"])
+    assert list(series.tail(3).index) == list(range(len(frame) - 3, len(frame)))
+
+
+def test_default_path(frame, tmp_path, monkeypatch):
+    monkeypatch.setattr(hashprice_series, "SERIES_PATH", str(tmp_path / "default.series"))
+
+    write_series(frame)
+
+    assert len(load_series()) == len(frame)
+
+
+def test_rejects_bad_files(frame, series_path):
+    write_series(frame, series_path)
+    with open(series_path, "rb") as f:
+        body = f.read()
+
+    with open(series_path, "wb") as f:
+        f.write(body[: len(body) // 2])
+    with pytest.raises(ValueError, match="truncated"):
+        load_series(series_path)
+
+    with open(series_path, "wb") as f:
+        f.write(b"NOTASERI" + body[8:])
+    with pytest.raises(ValueError, match="not a hashprice series"):
+        load_series(series_path)
+
+    with pytest.raises(ValueError, match="longer than"):
+        write_series(frame.rename(columns={"hashprice_7d": "a_very_long_column_name"}), series_path)
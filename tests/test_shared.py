@@ -0,0 +1,119 @@
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import hashprice_engine as engine
+import hashprice_shared
+from hashprice_shared import SharedSnapshotCache, SharedSnapshotFile
+
+
+@pytest.fixture
+def frame(btc_csv):
+    return engine.add_derived(engine.load_raw(btc_csv)).reset_index(drop=True)
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "snapshot.bin")
+
+
+class Counting:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def _worker(path, frame, price=60000.0):
+    fetch_data, fetch_price = Counting(frame), Counting(price)
+    cache = SharedSnapshotCache(
+        path,
+        fetch_data=fetch_data,
+        fetch_price=fetch_price,
+        fetch_network=None,
+        last_good_price=lambda: None,
+    )
+    return cache, fetch_data, fetch_price
+
+
+def test_file_round_trip_maps_the_columns(shared_path, frame):
+    shared = SharedSnapshotFile(shared_path)
+    with shared.lock():
+        version = shared.write(frame, {"price": 60000.0})
+
+    published = shared.read()
+    df = published.frame()
+
+    assert version == published.version == shared.version() == 1
+    assert published.meta["price"] == 60000.0
+    pd.testing.assert_frame_equal(df, frame)
+    assert not df["hashprice_7d"].to_numpy().flags.writeable
+    assert shared.read(known=1) is None
+
+
+def test_second_worker_adopts_instead_of_fetching(shared_path, frame):
+    first, first_data, first_price = _worker(shared_path, frame)
+    second, second_data, second_price = _worker(shared_path, frame)
+
+    published = first.refresh()
+    adopted = second.refresh()
+
+    assert (first_data.calls, first_price.calls) == (1, 1)
+    assert (second_data.calls, second_price.calls) == (0, 0)
+    assert adopted.version == published.version
+    assert adopted.data["hashprice_rt"] == published.data["hashprice_rt"]
+    # The adopted frame is a view on the mapping, not a copy.
+    assert not second.frame["HashRate_PH"].to_numpy().flags.writeable
+    assert np.array_equal(second.frame["hashprice_1d"], frame["hashprice_1d"])
+
+
+def test_price_refresh_is_shared_and_keeps_the_frame(shared_path, frame):
+    first, first_data, first_price = _worker(shared_path, frame)
+    second, _, second_price = _worker(shared_path, frame)
+    first.refresh()
+    second.refresh()
+    mapped = second.frame
+
+    first.price_interval = 0
+    first_price.value = 61000.0
+    republished = first.refresh(data=False)
+    adopted = second.refresh(data=False)
+
+    assert first_data.calls == 1
+    assert second_price.calls == 0
+    assert adopted.version == republished.version == 2
+    assert adopted.data["spot"] == 61000.0
+    assert second.frame is mapped
+
+
+@pytest.mark.skipif(hashprice_shared.fcntl is None, reason="needs fcntl")
+def test_lock_excludes_other_processes(shared_path):
+    holder = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import fcntl, os, sys, time\n"
+            f"fd = os.open({shared_path + '.lock'!r}, os.O_RDWR | os.O_CREAT)\n"
+            "fcntl.flock(fd, fcntl.LOCK_EX)\n"
+            "print('locked', flush=True)\n"
+            "time.sleep(0.5)\n"
+        )],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert holder.stdout.readline() == b"locked\n"
+        start = time.monotonic()
+        with SharedSnapshotFile(shared_path).lock() as attempts:
+            waited = time.monotonic() - start
+            attempts["data"] = 1.0
+    finally:
+        holder.wait()
+
+    assert waited > 0.3
+    with SharedSnapshotFile(shared_path).lock() as attempts:
+        assert attempts == {"data": 1.0}
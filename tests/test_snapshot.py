@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import hashprice_engine as engine
+from hashprice_snapshot import SnapshotCache
+
+
+@pytest.fixture
+def frame(btc_csv):
+    return engine.add_derived(engine.load_raw(btc_csv))
+
+
+class Upstream:
+    """Counting fetch functions; a fetch blocks while `gate` is clear."""
+
+    def __init__(self, df, prices):
+        self.df = df
+        self.prices = list(prices)
+        self.data_calls = 0
+        self.price_calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def fetch_data(self):
+        self.data_calls += 1
+        return self.df
+
+    def fetch_price(self):
+        self.price_calls += 1
+        self.gate.wait(5)
+        price = self.prices.pop(0) if len(self.prices) > 1 else self.prices[0]
+        if isinstance(price, Exception):
+            raise price
+        return price
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def _cache(upstream, **kwargs):
+    kwargs.setdefault("last_good_price", lambda: None)
+    return SnapshotCache(
+        fetch_data=upstream.fetch_data,
+        fetch_price=upstream.fetch_price,
+        fetch_network=None,
+        **kwargs,
+    )
+
+
+def test_stale_readers_get_snapshot_at_once_and_share_one_refresh(frame):
+    upstream = Upstream(frame, [60000.0, 61000.0])
+    cache = _cache(upstream, data_interval=3600, price_interval=0)
+    first = cache.refresh()
+    upstream.gate.clear()
+
+    async def readers():
+        return await asyncio.wait_for(asyncio.gather(*(cache.aget() for _ in range(20))), 1)
+
+    snapshots = asyncio.run(readers())
+
+    assert all(s is first for s in snapshots)
+    _wait_until(lambda: upstream.price_calls > 1)
+    time.sleep(0.05)  # room for a second refresh to show up, if one started
+    assert upstream.price_calls == 2
+    assert upstream.data_calls == 1
+
+    upstream.gate.set()
+    _wait_until(lambda: cache.snapshot is not first)
+    assert cache.snapshot.version == first.version + 1
+    assert cache.snapshot.data["spot"] == 61000.0
+    assert upstream.price_calls == 2
+
+
+def test_cold_start_refresh_runs_off_the_event_loop(frame):
+    upstream = Upstream(frame, [60000.0])
+    upstream.gate.clear()
+    cache = _cache(upstream)
+
+    async def main():
+        readers = asyncio.gather(*(cache.aget() for _ in range(10)))
+        # The loop keeps ticking while the refresh waits on upstream.
+        ticks = 0
+        while (upstream.price_calls == 0 or ticks < 5) and ticks < 500:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        upstream.gate.set()
+        return ticks, await asyncio.wait_for(readers, 5)
+
+    ticks, snapshots = asyncio.run(main())
+
+    assert 5 <= ticks < 500
+    assert all(s is snapshots[0] for s in snapshots)
+    assert (upstream.data_calls, upstream.price_calls) == (1, 1)
+
+
+def test_fresh_snapshot_is_not_revalidated(frame):
+    upstream = Upstream(frame, [60000.0])
+    cache = _cache(upstream, data_interval=3600, price_interval=3600)
+    cache.refresh()
+
+    assert cache.get() is cache.snapshot
+    assert cache.revalidate() is None
+    assert upstream.price_calls == 1
+
+
+def test_cold_start_keeps_the_frame_when_the_price_fails(frame):
+    upstream = Upstream(frame, [ConnectionError("price down"), 60000.0])
+    cache = _cache(upstream)
+
+    with pytest.raises(ConnectionError):
+        cache.refresh()
+    snapshot = cache.refresh()
+
+    assert snapshot.data["spot"] == 60000.0
+    assert upstream.data_calls == 1
+    assert snapshot.data["stale"] == {}
+
+
+def test_cold_start_falls_back_to_last_good_price(frame):
+    upstream = Upstream(frame, [ConnectionError("price down")])
+    cache = _cache(upstream, last_good_price=lambda: (58000.0, 1700000000.0))
+
+    snapshot = cache.refresh()
+
+    assert snapshot.data["spot"] == 58000.0
+    assert snapshot.data["stale"] == {"price": 1700000000.0}
+    assert cache.last_error.startswith("ConnectionError")
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import hashprice_engine as engine
+import hashprice_store
+from conftest import StandIn, write_coinmetrics_csv
+from hashprice_store import CoinMetricsStore
+
+
+@pytest.fixture
+def validating_server(btc_csv):
+    server = StandIn(btc_csv, validators=True)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "store.sqlite")
+
+
+def _no_parse(*args, **kwargs):
+    raise AssertionError("a 304 must not re-parse the CSV")
+
+
+def _expected(path):
+    return engine.add_derived(engine.load_raw(path)).reset_index(drop=True)
+
+
+def test_first_fetch_downloads_and_stores_validators(validating_server, store_path, btc_csv):
+    store = CoinMetricsStore(store_path, url=validating_server.url + "/btc.csv")
+
+    df = store.fetch()
+
+    assert store.last_status == "updated"
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), _expected(btc_csv))
+    with sqlite3.connect(store_path) as conn:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+    assert meta["etag"] == validating_server.etag
+    assert meta["last_modified"] == validating_server.last_modified
+
+
+def test_not_modified_returns_the_same_frame_without_parsing(validating_server, store_path, monkeypatch):
+    store = CoinMetricsStore(store_path, url=validating_server.url + "/btc.csv")
+    first = store.fetch()
+    monkeypatch.setattr(hashprice_store, "load_raw", _no_parse)
+
+    again = store.fetch()
+
+    assert store.last_status == "not-modified"
+    assert again is first
+
+
+def test_restarted_store_revalidates_instead_of_downloading(validating_server, store_path, btc_csv, monkeypatch):
+    CoinMetricsStore(store_path, url=validating_server.url + "/btc.csv").fetch()
+    monkeypatch.setattr(hashprice_store, "load_raw", _no_parse)
+
+    restarted = CoinMetricsStore(store_path, url=validating_server.url + "/btc.csv")
+    df = restarted.fetch()
+
+    assert restarted.last_status == "not-modified"
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), _expected(btc_csv))
+
+
+def test_appended_rows_are_merged(validating_server, store_path, tmp_path):
+    store = CoinMetricsStore(store_path, url=validating_server.url + "/btc.csv")
+    store.fetch()
+
+    # Same seed, ten more days: the first 150 rows are unchanged.
+    longer = write_coinmetrics_csv(str(tmp_path / "longer.csv"), days=160)
+    validating_server.load(longer)
+    df = store.fetch()
+
+    assert store.last_status == "updated"
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), _expected(longer))
+    with sqlite3.connect(store_path) as conn:
+        (rows,) = conn.execute("SELECT COUNT(*) FROM daily").fetchone()
+    assert rows == len(engine.load_raw(longer))
+    assert store.fetch() is df
+    assert store.last_status == "not-modified"
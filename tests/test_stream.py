@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+
+import hashprice_stream
+from hashprice_stream import Broadcaster
+
+
+def _payload(frame):
+    data = [line for line in frame.splitlines() if line.startswith("data: ")]
+    return json.loads(data[0][len("data: "):])
+
+
+async def _next(client):
+    return _payload(await asyncio.wait_for(client.__anext__(), 1))
+
+
+def test_clients_get_full_state_then_only_changed_fields():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        broadcaster.publish(1, {"rt": "$40.00", "spot": "$60,000"}, stale=False)
+
+        clients = [broadcaster.events() for _ in range(3)]
+        first = [await _next(c) for c in clients]
+        assert broadcaster.client_count == 3
+
+        # publish() runs on the snapshot refresh thread.
+        thread = threading.Thread(
+            target=broadcaster.publish, args=(2, {"rt": "$41.00", "spot": "$60,000"}), kwargs={"stale": False}
+        )
+        thread.start()
+        thread.join()
+        updates = [await _next(c) for c in clients]
+
+        for c in clients:
+            await c.aclose()
+        return first, updates, broadcaster.client_count
+
+    first, updates, remaining = asyncio.run(scenario())
+
+    assert first == [{"stale": False, "version": 1, "fields": {"rt": "$40.00", "spot": "$60,000"}}] * 3
+    assert updates == [{"stale": False, "version": 2, "fields": {"rt": "$41.00"}}] * 3
+    assert remaining == 0
+
+
+def test_disconnected_client_is_dropped():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        broadcaster.publish(1, {"rt": "$40.00"})
+
+        stays, leaves = broadcaster.events(), broadcaster.events()
+        await _next(stays)
+        await _next(leaves)
+        await leaves.aclose()
+        counts = [broadcaster.client_count]
+
+        broadcaster.publish(2, {"rt": "$41.00"})
+        update = await _next(stays)
+        await stays.aclose()
+        counts.append(broadcaster.client_count)
+        return counts, update
+
+    counts, update = asyncio.run(scenario())
+
+    assert counts == [1, 0]
+    assert update["fields"] == {"rt": "$41.00"}
+
+
+def test_slow_client_backlog_collapses_to_full_state(monkeypatch):
+    monkeypatch.setattr(hashprice_stream, "QUEUE_SIZE", 2)
+
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        broadcaster.publish(1, {"a": 1, "b": 1})
+        client = broadcaster.events()
+        await _next(client)
+
+        for version in range(2, 6):
+            broadcaster.publish(version, {"a": version, "b": 1})
+            await asyncio.sleep(0)
+
+        received = [await _next(client)]
+        while True:
+            try:
+                received.append(_payload(await asyncio.wait_for(client.__anext__(), 0.05)))
+            except asyncio.TimeoutError:
+                break
+        await client.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+
+    # Versions 2 and 3 filled the queue; 4 replaced them with the full state.
+    assert received == [
+        {"version": 4, "fields": {"a": 4, "b": 1}},
+        {"version": 5, "fields": {"a": 5}},
+    ]
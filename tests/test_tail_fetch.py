@@ -0,0 +1,157 @@
+"""
+fetch_data(mode="tail") against a local stand-in, for both the engine
+(hashprice_engine.fetch_tail) and the pandas-free path
+(hashprice_fast.fetch_tail_rows).
+"""
+
+import os
+
+import pytest
+
+import hashprice_engine as engine
+import hashprice_fast
+from conftest import StandIn, write_coinmetrics_csv
+
+TREND = 14
+
+
+def _engine_rows(df):
+    return [
+        (t.strftime("%Y-%m-%d"), a, b)
+        for t, a, b in zip(df["time"], df["hashprice_1d"], df["hashprice_7d"])
+    ][-TREND:]
+
+
+def _fast_rows(rows):
+    return [(r["time"], r["hashprice_1d"], r["hashprice_7d"]) for r in rows][-TREND:]
+
+
+def _same(rows, expected):
+    # The 7-day rolling sums start at a different row in the tail than in
+    # the full file, so hashprice_7d may differ in the last ulp or two.
+    return [r[0] for r in rows] == [r[0] for r in expected] and all(
+        r[1:] == pytest.approx(e[1:], rel=1e-12, abs=0) for r, e in zip(rows, expected)
+    )
+
+
+ENGINE = ("engine", lambda url, **kw: _engine_rows(engine.fetch_tail(url, **kw)),
+          lambda url: _engine_rows(engine.add_derived(engine.load_raw(url))))
+FAST = ("fast", lambda url, **kw: _fast_rows(hashprice_fast.fetch_tail_rows(url, **kw)),
+        lambda url: _fast_rows(hashprice_fast.fetch_rows(url)))
+
+
+@pytest.fixture(params=[ENGINE, FAST], ids=lambda p: p[0])
+def path(request):
+    return request.param
+
+
+@pytest.fixture
+def header_cache(tmp_path):
+    return str(tmp_path / "header.csv")
+
+
+def _ranges(server):
+    return [r for _, r in server.requests]
+
+
+def test_tail_matches_full_download(path, range_server, header_cache):
+    _, tail, full = path
+    url = range_server.url + "/btc.csv"
+
+    rows = tail(url, header_cache=header_cache)
+
+    assert _ranges(range_server) == ["bytes=0-16383", "bytes=-65536"]
+    assert _same(rows, full(url))
+    with open(header_cache, "rb") as f:
+        assert f.read().startswith(b"time,Filler000")
+
+
+def test_cached_header_is_not_fetched_again(path, range_server, header_cache):
+    _, tail, full = path
+    url = range_server.url + "/btc.csv"
+
+    tail(url, header_cache=header_cache)
+    del range_server.requests[:]
+    rows = tail(url, header_cache=header_cache)
+
+    assert _ranges(range_server) == ["bytes=-65536"]
+    assert _same(rows, full(url))
+
+
+def test_window_grows_until_enough_rows(path, range_server, header_cache):
+    _, tail, full = path
+    url = range_server.url + "/btc.csv"
+
+    # ~800-byte rows: 2 KB and 8 KB leave fewer than 14 rows after the
+    # 7-day warm-up, 32 KB does not.
+    rows = tail(url, tail_bytes=2048, header_cache=header_cache)
+
+    assert _ranges(range_server)[1:] == ["bytes=-2048", "bytes=-8192", "bytes=-32768"]
+    assert _same(rows, full(url))
+
+
+def test_window_larger_than_file_returns_everything(path, range_server, header_cache):
+    _, tail, full = path
+    url = range_server.url + "/btc.csv"
+
+    rows = tail(url, tail_bytes=1 << 20, min_rows=10_000, header_cache=header_cache)
+
+    assert _ranges(range_server)[1:] == ["bytes=-1048576"]
+    assert _same(rows, full(url))
+
+
+def test_falls_back_to_full_download_without_range(path, plain_server, header_cache):
+    _, tail, full = path
+    url = plain_server.url + "/btc.csv"
+
+    rows = tail(url, header_cache=header_cache)
+
+    assert _same(rows, full(url))
+    assert not os.path.exists(header_cache)
+
+
+def test_falls_back_when_range_ignored_with_cached_header(path, plain_server, header_cache, btc_csv):
+    _, tail, full = path
+    url = plain_server.url + "/btc.csv"
+    with open(btc_csv, "rb") as f:
+        header = f.readline()
+    with open(header_cache, "wb") as f:
+        f.write(header)
+
+    rows = tail(url, header_cache=header_cache)
+
+    assert _same(rows, full(url))
+    assert _ranges(plain_server)[0] == "bytes=-65536"
+
+
+def test_stale_header_is_refetched(path, range_server, header_cache, btc_csv):
+    _, tail, full = path
+    url = range_server.url + "/btc.csv"
+    with open(btc_csv, "rb") as f:
+        header = f.readline()
+    # A header cached before Coin Metrics added its last column.
+    with open(header_cache, "wb") as f:
+        f.write(header.rsplit(b",", 1)[0] + b"\n")
+
+    rows = tail(url, header_cache=header_cache)
+
+    assert _ranges(range_server) == ["bytes=-65536", "bytes=0-16383", "bytes=-65536"]
+    assert _same(rows, full(url))
+    with open(header_cache, "rb") as f:
+        assert f.read() == header
+
+
+def test_header_that_never_matches_raises(path, tmp_path, header_cache):
+    _, tail, _ = path
+    csv_path = write_coinmetrics_csv(str(tmp_path / "broken.csv"))
+    with open(csv_path, "rb") as f:
+        header, body = f.read().split(b"\n", 1)
+    with open(csv_path, "wb") as f:
+        f.write(header.rsplit(b",", 1)[0] + b"\n" + body)
+
+    server = StandIn(csv_path, ranges=True)
+    try:
+        with pytest.raises(RuntimeError, match="header does not match"):
+            tail(server.url + "/btc.csv", header_cache=header_cache)
+    finally:
+        server.close()
@@ -1,18 +1,74 @@
-import os
 import json
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from hashprice_engine import calculate
-
-BRAND = os.getenv("BRAND","beardminer")
-
-with open(f"brands/{BRAND}.json") as f:
-    BRAND_CONFIG=json.load(f)
-
-ASCII_HEADER=BRAND_CONFIG["ascii"]
-BRAND_NAME=BRAND_CONFIG["name"]
+import asyncio
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from hashprice_alerts import AlertEngine
+from hashprice_snapshot import SnapshotCache
+from hashprice_shared import SHARED_PATH, SharedSnapshotCache
+from hashprice_store import CoinMetricsStore
+from hashprice_stream import Broadcaster
+from hashprice_http import compress_variants, etag_matches, make_etag, negotiate_encoding, variant_etags
+from hashprice_brands import BrandRegistry
+from hashprice_history import DEFAULT_POINTS, history_arrays, query as query_history
+from hashprice_grid import AXES, DEFAULTS as GRID_DEFAULTS, grid_to_csv, grid_to_json, parse_axis, profitability_grid
+from hashprice_projection import DEFAULT_HORIZON, DEFAULT_PATHS, HORIZON_MARKS, MODELS, inputs_from_frame, simulate_relative, start_state, summarize
+from hashprice_metrics import CACHE_REQUESTS, CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, STAGE_SECONDS, Gauge, cache_hit_ratios
+
+# Every brands/*.json is served from this one process and shares the single
+# data snapshot below. BRAND only picks the default for unknown hosts.
+BRANDS=BrandRegistry()
+
+STORE=CoinMetricsStore()
+# Handlers are async and only read the published snapshot (SNAPSHOT.aget());
+# upstream I/O happens in the snapshot's refresh thread with the blocking
+# clients, so no request ever waits on Coin Metrics or a price provider.
+# With several workers, HASHPRICE_SHARED_SNAPSHOT=<path> makes them share one
+# upstream refresh and one memory-mapped copy of the frame.
+if SHARED_PATH:
+    SNAPSHOT=SharedSnapshotCache(SHARED_PATH,fetch_data=STORE.fetch,last_good_data=STORE.last_good)
+else:
+    SNAPSHOT=SnapshotCache(fetch_data=STORE.fetch,last_good_data=STORE.last_good)
+BROADCASTER=Broadcaster()
+
+# Threshold alerts (hashprice_alerts), evaluated on every snapshot. Enabled,
+# with the management API under /api/v1/alerts, when HASHPRICE_ALERTS_TOKEN
+# is set; requests must send it as a bearer token.
+ALERTS_TOKEN=os.getenv("HASHPRICE_ALERTS_TOKEN","")
+ALERTS=AlertEngine() if ALERTS_TOKEN else None
+
+def publish_snapshot(snapshot):
+
+    render_pages(snapshot)
+
+    BROADCASTER.publish(
+        snapshot.version,
+        format_fields(snapshot),
+        hashprice_rt=snapshot.data["hashprice_rt"],
+        created=snapshot.created,
+    )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    BROADCASTER.bind(asyncio.get_running_loop())
+    SNAPSHOT.add_listener(publish_snapshot)
+    if ALERTS is not None:
+        SNAPSHOT.add_listener(ALERTS.on_snapshot)
+    if SNAPSHOT.snapshot is not None:
+        publish_snapshot(SNAPSHOT.snapshot)
+    SNAPSHOT.start()
+    yield
+    SNAPSHOT.stop()
+    SNAPSHOT.remove_listener(publish_snapshot)
+    if ALERTS is not None:
+        SNAPSHOT.remove_listener(ALERTS.on_snapshot)
+
+app = FastAPI(lifespan=lifespan)
 
 THEMES = {
     "orange": {"accent":"#ff9900","bg":"#0b0b0b"},
@@ -48,13 +104,499 @@ def build_trend(data,width):
 
     return "\n".join(lines)
 
-@app.get("/",response_class=HTMLResponse)
-def dashboard(request:Request):
+def format_age(seconds):
+
+    seconds=int(seconds)
+
+    if seconds<60:
+        return f"{seconds}s"
+    if seconds<3600:
+        return f"{seconds//60}m {seconds%60:02d}s"
+
+    return f"{seconds//3600}h {seconds%3600//60:02d}m"
+
+def build_stale_note(snapshot):
+
+    if not SNAPSHOT.is_stale(snapshot):
+        return ""
+
+    stale=snapshot.data.get("stale") or {}
+    if stale:
+        now=time.time()
+        parts=[f"{name} from {format_age(now-fetched)} ago" for name,fetched in sorted(stale.items())]
+        return f" (STALE — upstream unavailable, serving last known good {', '.join(parts)})"
+
+    if SNAPSHOT.last_error:
+        return " (STALE — refresh failing, serving last good data)"
+
+    return " (STALE)"
+
+# Longer hashprice_rolling windows shown under the 7-day value.
+SMOOTHING_WINDOWS=(30,90,365)
+
+def format_fields(snapshot):
+
+    # Display strings shared by the rendered page and the /stream updates,
+    # keyed by the data-field attribute of the element they fill.
+    data=snapshot.data
+    marker="▲" if data["pct_vs_7d"]>=0 else "▼"
+
+    return {
+        "timestamp":data["timestamp"],
+        "stale":build_stale_note(snapshot),
+        "spot":f"${data['spot']:,.2f}",
+        "hashprice_rt":f"${data['hashprice_rt']:,.2f}",
+        "pct_vs_7d":f"{marker} {data['pct_vs_7d']:+.2f}% vs 7D",
+        "network_hashrate_ph":f"{data['network_hashrate_ph']:,.0f}",
+        "block_reward":f"{data['block_reward']:.3f}",
+        "fee_btc":f"{data['fee_btc']:.3f}",
+        "fee_pct":f"{data['fee_pct']:.2f}%",
+        "hashprice_1d":f"${data['hashprice_1d']:.2f}",
+        "hashprice_7d":f"${data['hashprice_7d']:.2f}",
+        **{
+            f"hashprice_{w}d":"n/a" if data["rolling"].get(f"hashprice_{w}d") is None
+            else f"${data['rolling'][f'hashprice_{w}d']:.2f}"
+            for w in SMOOTHING_WINDOWS
+        },
+    }
+
+API_CACHE={}
+
+def api_payload(snapshot):
+
+    data=snapshot.data
+    trend=data["trend"]
+
+    payload={k:v for k,v in data.items() if k!="trend"}
+    payload["trend"]={
+        "time":[t.strftime("%Y-%m-%d") for t in trend["time"]],
+        "hashprice_1d":[float(v) for v in trend["hashprice_1d"]],
+    }
+    payload["version"]=snapshot.version
+    payload["generated_at"]=snapshot.created
+
+    return payload
+
+def api_body(snapshot):
+
+    # Serialized once per snapshot; the ETag is a hash of exactly these bytes,
+    # so it only changes when the data does.
+    cached=API_CACHE.get("hashprice")
+    if cached and cached[0]==snapshot.version:
+        CACHE_REQUESTS.inc(cache="api",result="hit")
+        return cached[1],cached[2]
+
+    CACHE_REQUESTS.inc(cache="api",result="miss")
+
+    body=json.dumps(api_payload(snapshot),separators=(",",":")).encode()
+    etag=make_etag(body)
+    API_CACHE["hashprice"]=(snapshot.version,body,etag)
+
+    return body,etag
+
+@app.get("/api/v1/hashprice")
+async def api_hashprice(request:Request):
+
+    snapshot=await SNAPSHOT.aget()
+    body,etag=api_body(snapshot)
+
+    # Clients may reuse the response until the next scheduled price refresh.
+    max_age=max(0,int(SNAPSHOT.price_interval-snapshot.age))
+    headers={
+        "ETag":etag,
+        "Cache-Control":f"public, max-age={max_age}",
+        "X-Snapshot-Stale":"1" if SNAPSHOT.is_stale(snapshot) else "0",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"),etag):
+        return Response(status_code=304,headers=headers)
+
+    return Response(content=body,media_type="application/json",headers=headers)
+
+# Downsampled history responses keyed by (data version, query); the arrays
+# themselves are extracted from the frame once per data version.
+HISTORY_CACHE=OrderedDict()
+HISTORY_CACHE_SIZE=256
+HISTORY_ARRAYS={"version":None,"arrays":None}
+HISTORY_LOCK=threading.Lock()
+
+def history_body(data_version,frame,metrics,key):
+
+    with HISTORY_LOCK:
+
+        cache_key=(data_version,)+key
+        if cache_key in HISTORY_CACHE:
+            HISTORY_CACHE.move_to_end(cache_key)
+            CACHE_REQUESTS.inc(cache="history",result="hit")
+            return HISTORY_CACHE[cache_key]
+
+        CACHE_REQUESTS.inc(cache="history",result="miss")
+
+        if HISTORY_ARRAYS["version"]!=data_version:
+            HISTORY_ARRAYS["arrays"]=history_arrays(frame,metrics.frame if metrics else None)
+            HISTORY_ARRAYS["version"]=data_version
+
+        arrays=HISTORY_ARRAYS["arrays"]
+
+    start,end,max_points,method,series=key
+    payload=query_history(arrays,start,end,max_points,method,list(series) if series else None)
+    body=json.dumps(payload,separators=(",",":")).encode()
+    entry=(body,make_etag(body))
+
+    with HISTORY_LOCK:
+        HISTORY_CACHE[cache_key]=entry
+        while len(HISTORY_CACHE)>HISTORY_CACHE_SIZE:
+            HISTORY_CACHE.popitem(last=False)
+
+    return entry
+
+@app.get("/api/v1/history")
+async def api_history(request:Request):
+
+    params=request.query_params
+    series=params.get("series")
+
+    try:
+        key=(
+            params.get("start"),
+            params.get("end"),
+            int(params.get("max_points",DEFAULT_POINTS)),
+            params.get("method","lttb"),
+            tuple(s.strip() for s in series.split(",") if s.strip()) if series else None,
+        )
+        await SNAPSHOT.aget()
+        # Misses extract and downsample the full history; HISTORY_LOCK is a
+        # thread lock, so even a hit may wait on one. Both stay off the loop.
+        body,etag=await asyncio.get_running_loop().run_in_executor(
+            None,history_body,SNAPSHOT.data_version,SNAPSHOT.frame,SNAPSHOT.metrics,key,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+    headers={"ETag":etag,"Cache-Control":f"public, max-age={int(SNAPSHOT.data_interval)}"}
+
+    if etag_matches(request.headers.get("if-none-match"),etag):
+        return Response(status_code=304,headers=headers)
+
+    return Response(content=body,media_type="application/json",headers=headers)
+
+@app.get("/api/v1/profitability")
+async def api_profitability(request:Request):
+
+    # Sensitivity grid over efficiency (J/TH), power price ($/kWh), uptime and
+    # pool fee; each takes "a,b,c" or "start:stop:step". hashprice defaults
+    # to the current realtime value.
+    params=request.query_params
+
+    try:
+        if "hashprice" in params:
+            hashprice=float(params["hashprice"])
+        else:
+            hashprice=(await SNAPSHOT.aget()).data["hashprice_rt"]
+
+        # Up to grid.MAX_CELLS cells: computed and serialized off the event loop.
+        return await asyncio.get_running_loop().run_in_executor(None,profitability_response,params,hashprice)
+    except ValueError as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+def profitability_response(params,hashprice):
+
+    axes={name:parse_axis(params.get(name,GRID_DEFAULTS[name]),name) for name in AXES}
+    grid=profitability_grid(hashprice,ph=float(params.get("ph",1)),**axes)
+
+    if params.get("format")=="csv":
+        return Response(
+            content=grid_to_csv(grid),
+            media_type="text/csv",
+            headers={"Content-Disposition":'attachment; filename="profitability.csv"'},
+        )
+
+    return Response(content=json.dumps(grid_to_json(grid),separators=(",",":")),media_type="application/json")
+
+# Monte Carlo projections (hashprice_projection). The simulation depends on
+# the history and block height, not on the spot price, so it is cached per
+# (data version, height, horizon, paths, model) and only rescaled to each
+# snapshot. The API accepts a fixed set of horizons and at most
+# PROJECTION_MAX_PATHS paths, so each data version has a bounded number of
+# distinct runs; each runs at most once (later requests for the same key
+# await it) and PROJECTION_CONCURRENCY run at a time.
+PROJECTION_HORIZONS=HORIZON_MARKS
+PROJECTION_MAX_PATHS=DEFAULT_PATHS
+PROJECTION_CONCURRENCY=1
+PROJECTION_CACHE=OrderedDict()
+PROJECTION_CACHE_SIZE=32
+# Runs in progress by cache key. Like PROJECTION_CACHE, only touched from
+# the event loop.
+PROJECTION_PENDING={}
+PROJECTION_SLOTS=asyncio.Semaphore(PROJECTION_CONCURRENCY)
+
+def projection_params(params):
+
+    horizon=int(params.get("horizon",DEFAULT_HORIZON))
+    if horizon not in PROJECTION_HORIZONS:
+        raise ValueError(f"horizon must be one of {', '.join(map(str,PROJECTION_HORIZONS))}")
+    paths=int(params.get("paths",DEFAULT_PATHS))
+    if not 1<=paths<=PROJECTION_MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {PROJECTION_MAX_PATHS:,}")
+    model=params.get("model","bootstrap")
+    if model not in MODELS:
+        raise ValueError(f"model must be one of {', '.join(MODELS)}")
+
+    return horizon,paths,model
+
+def run_projection(frame,data,key):
+
+    horizon,paths,model=key
+    with STAGE_SECONDS.time(stage="projection"):
+        return simulate_relative(inputs_from_frame(frame,data),paths=paths,horizon=horizon,model=model)
+
+async def relative_projection(data_version,frame,data,start,key):
+
+    cache_key=(data_version,start["height"])+key
+    if cache_key in PROJECTION_CACHE:
+        PROJECTION_CACHE.move_to_end(cache_key)
+        CACHE_REQUESTS.inc(cache="projection",result="hit")
+        return PROJECTION_CACHE[cache_key]
+
+    CACHE_REQUESTS.inc(cache="projection",result="miss")
+
+    pending=PROJECTION_PENDING.get(cache_key)
+    if pending is None:
+
+        async def run():
+            try:
+                async with PROJECTION_SLOTS:
+                    relative=await asyncio.get_running_loop().run_in_executor(None,run_projection,frame,data,key)
+                PROJECTION_CACHE[cache_key]=relative
+                while len(PROJECTION_CACHE)>PROJECTION_CACHE_SIZE:
+                    PROJECTION_CACHE.popitem(last=False)
+                return relative
+            finally:
+                PROJECTION_PENDING.pop(cache_key,None)
+
+        pending=PROJECTION_PENDING[cache_key]=asyncio.ensure_future(run())
+
+    # Shielded: a client going away must not cancel the run others await.
+    return await asyncio.shield(pending)
+
+@app.get("/api/v1/projection")
+async def api_projection(request:Request):
+
+    # Percentile bands of hashprice over the next `horizon` days, simulated
+    # from the current snapshot.
+    try:
+        key=projection_params(request.query_params)
+        snapshot=await SNAPSHOT.aget()
+        frame=SNAPSHOT.frame
+        start=start_state(frame,snapshot.data)
+        relative=await relative_projection(SNAPSHOT.data_version,frame,snapshot.data,start,key)
+    except ValueError as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+    body=json.dumps(summarize(relative,start),separators=(",",":")).encode()
+    etag=make_etag(body)
+
+    max_age=max(0,int(SNAPSHOT.price_interval-snapshot.age))
+    headers={"ETag":etag,"Cache-Control":f"public, max-age={max_age}"}
+
+    if etag_matches(request.headers.get("if-none-match"),etag):
+        return Response(status_code=304,headers=headers)
+
+    return Response(content=body,media_type="application/json",headers=headers)
+
+def check_alerts_auth(request):
+
+    if ALERTS is None:
+        raise HTTPException(status_code=404,detail="Alerts are not enabled")
+
+    supplied=request.headers.get("authorization","").encode()
+    if not hmac.compare_digest(supplied,f"Bearer {ALERTS_TOKEN}".encode()):
+        raise HTTPException(status_code=401,detail="Invalid alerts token")
+
+def alert_response(sub,status_code=200):
+
+    return Response(content=json.dumps(sub.to_json()),status_code=status_code,media_type="application/json")
+
+@app.post("/api/v1/alerts")
+async def create_alert(request:Request):
+
+    # {"url", "metric": hashprice_rt | pct_vs_7d, "direction": above | below,
+    #  "threshold", optional "hysteresis"}
+    check_alerts_auth(request)
+
+    try:
+        body=await request.json()
+        sub=await asyncio.get_running_loop().run_in_executor(None,lambda:ALERTS.subscribe(
+            body["url"],body["metric"],body["direction"],body["threshold"],body.get("hysteresis"),
+        ))
+    except (ValueError,KeyError,TypeError) as e:
+        raise HTTPException(status_code=400,detail=f"Invalid subscription: {e}")
+
+    return alert_response(sub,201)
+
+@app.get("/api/v1/alerts/{sub_id}")
+async def get_alert(request:Request,sub_id:int):
+
+    check_alerts_auth(request)
+
+    sub=ALERTS.get(sub_id)
+    if sub is None:
+        raise HTTPException(status_code=404,detail="Unknown subscription")
+
+    return alert_response(sub)
+
+@app.delete("/api/v1/alerts/{sub_id}")
+async def delete_alert(request:Request,sub_id:int):
+
+    check_alerts_auth(request)
+
+    if not await asyncio.get_running_loop().run_in_executor(None,ALERTS.unsubscribe,sub_id):
+        raise HTTPException(status_code=404,detail="Unknown subscription")
+
+    return Response(status_code=204)
+
+@app.get("/stream")
+async def stream():
+
+    return StreamingResponse(
+        BROADCASTER.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control":"no-cache","X-Accel-Buffering":"no"},
+    )
+
+def snapshot_age():
+
+    snapshot=SNAPSHOT.snapshot
+    return snapshot.age if snapshot is not None else None
+
+def snapshot_stale():
+
+    snapshot=SNAPSHOT.snapshot
+    return int(SNAPSHOT.is_stale(snapshot)) if snapshot is not None else None
+
+Gauge("hashprice_snapshot_age_seconds","Seconds since the served snapshot was built.",fn=snapshot_age)
+Gauge("hashprice_snapshot_stale","1 when the served snapshot is past its refresh interval.",fn=snapshot_stale)
+Gauge("hashprice_cache_hit_ratio","Hits over lookups per cache since start.",["cache"],fn=cache_hit_ratios)
+Gauge("hashprice_stream_clients","Connected /stream clients.",fn=lambda:BROADCASTER.client_count)
+
+@app.get("/metrics")
+async def metrics():
+
+    return Response(content=REGISTRY.render(),media_type=METRICS_CONTENT_TYPE)
+
+# Every brand × theme variant of the page, rendered and compressed once per
+# (snapshot version, staleness, brand registry version) so a request is a
+# dict lookup.
+PAGE_CACHE={"key":None,"pages":{}}
+PAGE_LOCK=threading.Lock()
+# The render started by a request that missed the cache: (key, future).
+# Only touched from the event loop.
+PAGE_PENDING={"key":None,"future":None}
+
+def page_key(snapshot):
+
+    return (snapshot.version,SNAPSHOT.is_stale(snapshot),BRANDS.version)
+
+def render_pages(snapshot):
+
+    key=page_key(snapshot)
+
+    with PAGE_LOCK:
+
+        if PAGE_CACHE["key"]==key:
+            return PAGE_CACHE["pages"]
+        # A late render of an older snapshot must not replace a newer one.
+        if PAGE_CACHE["key"] is not None and PAGE_CACHE["key"][0]>key[0]:
+            return PAGE_CACHE["pages"]
+
+        pages={}
+
+        with STAGE_SECONDS.time(stage="render_pages"):
+            for slug,brand in BRANDS.brands.items():
+                pages[slug]={}
+                for theme_name in THEMES:
+                    body=render_dashboard(snapshot,theme_name,brand).encode()
+                    variants=compress_variants(body)
+                    pages[slug][theme_name]={"etags":variant_etags(make_etag(body),variants),"variants":variants}
+
+        PAGE_CACHE["pages"]=pages
+        PAGE_CACHE["key"]=key
+
+    return pages
+
+async def current_pages(snapshot,brand_slug):
+
+    key=page_key(snapshot)
+    pages=PAGE_CACHE["pages"]
+    if PAGE_CACHE["key"]==key:
+        CACHE_REQUESTS.inc(cache="page",result="hit")
+        return pages
+
+    CACHE_REQUESTS.inc(cache="page",result="miss")
+
+    # Rendering every brand x theme and compressing it takes tens of ms, so
+    # it runs in the executor, once per key. Usually the refresh thread is
+    # already rendering the new snapshot; either way the previous pages are
+    # served until it is done, unless there are none for this brand yet.
+    if PAGE_PENDING["key"]!=key or PAGE_PENDING["future"].done():
+        PAGE_PENDING["key"]=key
+        PAGE_PENDING["future"]=asyncio.get_running_loop().run_in_executor(None,render_pages,snapshot)
+
+    if brand_slug in pages:
+        return pages
+
+    return await asyncio.shield(PAGE_PENDING["future"])
+
+def serve_page(request,brand_slug,pages):
 
     theme_name=request.query_params.get("theme","green")
-    theme=THEMES.get(theme_name,THEMES["green"])
+    if theme_name not in THEMES:
+        theme_name="green"
+
+    if brand_slug not in pages:
+        raise HTTPException(status_code=404,detail="Unknown brand")
+
+    page=pages[brand_slug][theme_name]
+
+    # Each content-coding is its own representation with its own ETag, so
+    # If-None-Match is checked against the variant this client would get.
+    encoding=negotiate_encoding(request.headers.get("accept-encoding"),page["variants"])
+    etag=page["etags"][encoding]
+    headers={"ETag":etag,"Vary":"Accept-Encoding","Cache-Control":"no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"),etag):
+        return Response(status_code=304,headers=headers)
+
+    if encoding!="identity":
+        headers["Content-Encoding"]=encoding
 
-    data=calculate()
+    return Response(content=page["variants"][encoding],media_type="text/html; charset=utf-8",headers=headers)
+
+@app.get("/",response_class=HTMLResponse)
+async def dashboard(request:Request):
+
+    snapshot=await SNAPSHOT.aget()
+    brand_slug=BRANDS.resolve_host(request.headers.get("host"))
+    pages=await current_pages(snapshot,brand_slug)
+    with STAGE_SECONDS.time(stage="dashboard"):
+        return serve_page(request,brand_slug,pages)
+
+@app.get("/{brand}/",response_class=HTMLResponse)
+async def brand_dashboard(request:Request,brand:str):
+
+    # Path-prefix routing, e.g. /clutch/, for deployments without per-brand hosts.
+    BRANDS.maybe_reload()
+    snapshot=await SNAPSHOT.aget()
+    pages=await current_pages(snapshot,brand)
+    with STAGE_SECONDS.time(stage="dashboard"):
+        return serve_page(request,brand,pages)
+
+def render_dashboard(snapshot,theme_name,brand):
+
+    theme=THEMES[theme_name]
+
+    data=snapshot.data
+    fields=format_fields(snapshot)
 
     trend_desktop=build_trend(data,56)
     trend_mobile=build_trend(data,24)
@@ -65,7 +607,7 @@ def dashboard(request:Request):
 <html>
 <head>
 
-<meta http-equiv="refresh" content="60">
+<noscript><meta http-equiv="refresh" content="60"></noscript>
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 
 <style>
@@ -154,53 +696,55 @@ display:none;
 <body>
 
 <div>
-<a href="/?theme=orange" class="theme-btn">Orange</a>
-<a href="/?theme=green" class="theme-btn">Green</a>
-<a href="/?theme=blue" class="theme-btn">Blue</a>
-<a href="/?theme=white" class="theme-btn">White</a>
+<a href="?theme=orange" class="theme-btn">Orange</a>
+<a href="?theme=green" class="theme-btn">Green</a>
+<a href="?theme=blue" class="theme-btn">Blue</a>
+<a href="?theme=white" class="theme-btn">White</a>
 </div>
 
 <div class="box">
 
 <pre class="ascii-logo">
-{ASCII_HEADER}
+{brand["ascii"]}
 </pre>
 
-<div class="mobile-logo">{BRAND_NAME}</div>
+<div class="mobile-logo">{brand["name"]}</div>
 
 <div class="main-title">BITCOIN HASHPRICE DASHBOARD</div>
 
-Last Updated: {data["timestamp"]}
+Last Updated: <span data-field="timestamp">{fields["timestamp"]}</span><br>
+Snapshot Age: <span data-age="{snapshot.created}">{format_age(snapshot.age)}</span><span data-field="stale">{fields["stale"]}</span>
 
 </div>
 
 <div class="box">
 <strong>BTC Spot Price</strong><br><br>
-<div class="kpi">${data["spot"]:,.2f}</div>
+<div class="kpi" data-field="spot">{fields["spot"]}</div>
 </div>
 
 <div class="box">
 <strong>Realtime Hashprice (USD / PH / Day)</strong><br><br>
-<div class="kpi">${data["hashprice_rt"]:,.2f}</div>
-<div class="subtle">
-{"▲" if data["pct_vs_7d"]>=0 else "▼"} {data["pct_vs_7d"]:+.2f}% vs 7D
-</div>
+<div class="kpi" data-field="hashprice_rt">{fields["hashprice_rt"]}</div>
+<div class="subtle" data-field="pct_vs_7d">{fields["pct_vs_7d"]}</div>
 </div>
 
 <div class="box">
 
 <strong>Network State</strong><br><br>
 
-Network Hashrate: {data["network_hashrate_ph"]:,.0f} PH/s<br>
-Block Reward: {data["block_reward"]:.3f} BTC<br>
-Fees (BTC/day): {data["fee_btc"]:.3f}<br>
-Fee % (est): {data["fee_pct"]:.2f}%
+Network Hashrate: <span data-field="network_hashrate_ph">{fields["network_hashrate_ph"]}</span> PH/s<br>
+Block Reward: <span data-field="block_reward">{fields["block_reward"]}</span> BTC<br>
+Fees (BTC/day): <span data-field="fee_btc">{fields["fee_btc"]}</span><br>
+Fee % (est): <span data-field="fee_pct">{fields["fee_pct"]}</span>
 
 </div>
 
 <div class="box">
-1-Day Raw: ${data["hashprice_1d"]:.2f}<br>
-7-Day Smoothed: ${data["hashprice_7d"]:.2f}
+1-Day Raw: <span data-field="hashprice_1d">{fields["hashprice_1d"]}</span><br>
+7-Day Smoothed: <span data-field="hashprice_7d">{fields["hashprice_7d"]}</span><br>
+30-Day Smoothed: <span data-field="hashprice_30d">{fields["hashprice_30d"]}</span><br>
+90-Day Smoothed: <span data-field="hashprice_90d">{fields["hashprice_90d"]}</span><br>
+365-Day Smoothed: <span data-field="hashprice_365d">{fields["hashprice_365d"]}</span>
 </div>
 
 <div class="box">
@@ -265,13 +809,15 @@ Formula:
 
 <script>
 
+var HASHPRICE_RT={HASHPRICE_RT}
+
 function calc() {{
 
 let ph=parseFloat(document.getElementById("ph").value)
 let eff=parseFloat(document.getElementById("eff").value)
 let power=parseFloat(document.getElementById("power").value)
 
-let revenue=ph*{HASHPRICE_RT}
+let revenue=ph*HASHPRICE_RT
 let power_kw=ph*eff
 let power_cost=power_kw*24*power
 let profit=revenue-power_cost
@@ -283,10 +829,54 @@ document.getElementById("result").innerHTML=
 
 }}
 
+if (window.EventSource) {{
+
+let stream=new EventSource("/stream")
+
+stream.onmessage=function(e) {{
+
+let msg=JSON.parse(e.data)
+
+for (let key in msg.fields) {{
+document.querySelectorAll('[data-field="'+key+'"]').forEach(function(el) {{
+el.textContent=msg.fields[key]
+}})
+}}
+
+if (msg.hashprice_rt!==undefined) HASHPRICE_RT=msg.hashprice_rt
+
+if (msg.created!==undefined) {{
+document.querySelectorAll("[data-age]").forEach(function(el) {{
+el.setAttribute("data-age",msg.created)
+}})
+}}
+
+}}
+
+}}
+
+function formatAge(seconds) {{
+
+seconds=Math.max(0,Math.floor(seconds))
+
+if (seconds<60) return seconds+"s"
+if (seconds<3600) return Math.floor(seconds/60)+"m "+String(seconds%60).padStart(2,"0")+"s"
+
+return Math.floor(seconds/3600)+"h "+String(Math.floor(seconds%3600/60)).padStart(2,"0")+"m"
+
+}}
+
+// The page is pre-rendered per snapshot, so the age is ticked client-side.
+setInterval(function() {{
+document.querySelectorAll("[data-age]").forEach(function(el) {{
+el.textContent=formatAge(Date.now()/1000-parseFloat(el.getAttribute("data-age")))
+}})
+}},1000)
+
 </script>
 
 </body>
 </html>
 """
 
-    return HTMLResponse(content=html)
+    return html